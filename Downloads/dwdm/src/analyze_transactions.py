@@ -1,8 +1,8 @@
 import pandas as pd
+from dataset import load_transactions
 
 # Read the dataset
-df = pd.read_csv('/Users/saaralvarunie/Downloads/dwdm/ecommerce_dataset_preprocessed.csv')
-df['Purchase_Date'] = pd.to_datetime(df['Purchase_Date'], format='%d-%m-%Y')
+df = load_transactions()
 
 # Get transactions per user
 transactions_per_user = df.groupby('User_ID').size()
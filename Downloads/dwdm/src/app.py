@@ -1,10 +1,19 @@
+import importlib
+from collections import OrderedDict
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from customer_segmentation import CustomerSegmentation
-from bundle_recommendation import BundleRecommendation
-from payment_analytics import PaymentAnalytics
+from dataset import TransactionDataset, load_transactions
+from schema import expand_transactions
+from realtime import read_snapshot
+from kpi import OverviewCube
+from filter_index import FilterIndex
+from chart_data import chart_series
+from figure_cache import FigureCache, filter_hash
+from progressive import BackgroundResults, PROGRESSIVE_MIN_ROWS, customer_sample
+from sessions import sessionize
+from features import build_customer_metrics
 import numpy as np
 from datetime import datetime
 
@@ -29,6 +38,24 @@ def get_plotly_template():
     # with high contrast colors
     return 'plotly'
 
+# Analytics objects by session key: (module, class). Each is created, and its module with
+# its ML dependencies imported, on the first page that uses it, so a cold start only pays
+# for what the Overview renders.
+ANALYTICS = {
+    'segmentation': ('customer_segmentation', 'CustomerSegmentation'),
+    'bundler': ('bundle_recommendation', 'BundleRecommendation'),
+    'payment_analyzer': ('payment_analytics', 'PaymentAnalytics')
+}
+
+def analytics_class(name):
+    module, cls = ANALYTICS[name]
+    return getattr(importlib.import_module(module), cls)
+
+def get_analytics(name):
+    if st.session_state.get(name) is None:
+        st.session_state[name] = analytics_class(name)()
+    return st.session_state[name]
+
 # Custom CSS for better styling with top navigation
 st.markdown("""
 <style>
@@ -179,27 +206,53 @@ st.markdown("""
 # Price scaling factor to convert normalized prices to realistic values
 PRICE_SCALE_FACTOR = 10000  # Converts 0.41 to ₹4,100
 
+# Bundle Analysis mines pair rules from a stratified sample of this many shopping sessions,
+# recounts the strongest rules on every session and keeps the best MAX_BUNDLES for the sliders
+BUNDLE_SAMPLE_BASKETS = 2000
+BUNDLE_VERIFY_TOP_K = 20
+MAX_BUNDLES = 50
+
+# Overview cubes built for payment-method selections kept per session (least recently used out)
+FILTERED_CUBES = 8
+
+# Optional history window from the URL (?since=2024-06-01&until=2024-09-30).
+# For a partitioned dataset only the partitions inside the window are read.
+data_window = (st.query_params.get('since'), st.query_params.get('until'))
+
 # Load data with loading spinner
-if 'df' not in st.session_state:
+if 'df' not in st.session_state or st.session_state.get('data_window') != data_window:
     with st.spinner('🔄 Loading e-commerce data...'):
         try:
-            df = pd.read_csv('/Users/saaralvarunie/Downloads/dwdm/ecommerce_dataset_preprocessed.csv')
-            df['Purchase_Date'] = pd.to_datetime(df['Purchase_Date'], format='%d-%m-%Y')
+            # Compact dtype model: categorical IDs, float32 prices, uint8 discount, int32 day numbers
+            df = load_transactions(since=data_window[0], until=data_window[1], compact=True)
             
             # Scale prices to realistic values
             df['Price (Rs.)'] = df['Price (Rs.)'] * PRICE_SCALE_FACTOR
             df['Final_Price(Rs.)'] = df['Final_Price(Rs.)'] * PRICE_SCALE_FACTOR
             
             st.session_state.df = df
-            st.session_state.segmentation = CustomerSegmentation()
-            st.session_state.bundler = BundleRecommendation()
-            st.session_state.payment_analyzer = PaymentAnalytics()
+            # Day x category cube: every Overview KPI and chart is read from it, not the frame
+            st.session_state.overview_cube = OverviewCube.build(df, version=data_window)
+            # Date order and category / payment method row bitmaps behind the filter bar
+            st.session_state.filter_index = FilterIndex.build(df)
+            st.session_state.filtered_cubes = OrderedDict()
+            st.session_state.bundle_table = None
+            st.session_state.cohort_tables = {}
+            st.session_state.data_version = TransactionDataset().version(*data_window)
+            for name in ANALYTICS:
+                st.session_state[name] = None
             st.session_state.load_time = datetime.now()
+            st.session_state.data_window = data_window
             st.success('✅ Data loaded successfully!')
         except Exception as e:
             st.error(f"❌ Error loading data: {str(e)}")
             st.stop()
 
+# An empty ?since=/?until= window leaves nothing to build the filter bar or pages from
+if len(st.session_state.df) == 0:
+    st.warning("No transactions in the selected history window")
+    st.stop()
+
 # Initialize page state
 if 'current_page' not in st.session_state:
     st.session_state.current_page = "Overview"
@@ -216,6 +269,7 @@ with st.sidebar:
     - Customer Segmentation (K-Means)
     - Bundle Recommendations (Apriori)
     - Payment Analytics
+    - Retention Cohorts
     
     **Course:** Data Warehousing & Data Mining
     """)
@@ -237,7 +291,7 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Navigation buttons - Evenly spaced and centered
-spacer1, col1, col2, col3, col4, spacer2 = st.columns([0.5, 1, 1, 1, 1, 0.5])
+spacer1, col1, col2, col3, col4, col5, spacer2 = st.columns([0.5, 1, 1, 1, 1, 1, 0.5])
 
 with col1:
     if st.button("📊 Overview", use_container_width=True, type="primary" if st.session_state.current_page == "Overview" else "secondary"):
@@ -259,19 +313,116 @@ with col4:
         st.session_state.current_page = "Payment Analytics"
         st.rerun()
 
+with col5:
+    if st.button("🔁 Retention Cohorts", use_container_width=True, type="primary" if st.session_state.current_page == "Retention Cohorts" else "secondary"):
+        st.session_state.current_page = "Retention Cohorts"
+        st.rerun()
+
 st.markdown("---")
 
+# Global filter bar; the selection is resolved through the filter index and feeds every page
+filter_index = st.session_state.filter_index
+first_date, last_date = filter_index.date_bounds()
+filter_col1, filter_col2, filter_col3 = st.columns([1, 1, 1])
+with filter_col1:
+    date_range = st.date_input("📅 Date range", value=(first_date, last_date),
+                               min_value=first_date, max_value=last_date, key='filter_dates')
+with filter_col2:
+    selected_categories = st.multiselect("🏷️ Categories", filter_index.values('Category'),
+                                         key='filter_categories', placeholder="All categories")
+with filter_col3:
+    selected_methods = st.multiselect("💳 Payment methods", filter_index.values('Payment_Method'),
+                                      key='filter_methods', placeholder="All payment methods")
+
+# A half-picked range (start date only) leaves the dates unfiltered until the end date is set
+since, until = date_range if len(date_range) == 2 else (None, None)
+since = None if since == first_date else since
+until = None if until == last_date else until
+selected_categories = selected_categories or None
+selected_methods = selected_methods or None
+df = filter_index.take(st.session_state.df, since, until, selected_categories, selected_methods)
+if len(df) == 0:
+    st.warning("No transactions match the selected filters")
+    st.stop()
+
 # Get current page
 page = st.session_state.current_page
 
+# Serialized figures shared by every session of this process (LRU, bounded by total JSON size)
+@st.cache_resource
+def get_figure_cache():
+    return FigureCache()
+
+active_filters = filter_hash(since, until, selected_categories, selected_methods)
+
+# Set by pages that render a sample estimate, so estimated and exact figures are cached apart
+showing_estimate = False
+
+def cached_chart(chart, build, *inputs):
+    """
+    Render a Plotly chart through the figure cache; `build` only runs when no figure is cached
+    for this page, chart, data version, filter bar state, theme and extra `inputs`
+    """
+    key = (page, chart, st.session_state.data_version, active_filters, get_plotly_template(),
+           showing_estimate, inputs)
+    st.plotly_chart(get_figure_cache().figure(key, build), use_container_width=True)
+
+# Exact results for large selections, computed on worker threads and shared by every session
+@st.cache_resource
+def get_background_results():
+    return BackgroundResults()
+
+def progressive_result(task, estimate, exact, *args):
+    """
+    (result, is_estimate). Below PROGRESSIVE_MIN_ROWS rows `exact(*args)` runs directly.
+    Larger selections run it on a worker thread and get `estimate()` until it finishes; a
+    fragment polls the worker and reruns the page as soon as the exact result is ready.
+    """
+    if len(df) < PROGRESSIVE_MIN_ROWS:
+        return exact(*args), False
+    key = (page, task, st.session_state.data_version, active_filters)
+    future = get_background_results().submit(key, exact, *args)
+    if not future.done():
+        result = estimate()
+        if not future.done():
+            @st.fragment(run_every="1s")
+            def await_exact_result():
+                if future.done():
+                    st.rerun()
+
+            await_exact_result()
+            return result, True
+    return future.result(), False
+
+def error_bars(values, intervals):
+    """
+    Plotly error_y for `values` with (low, high) confidence `intervals`
+    """
+    return dict(type='data', symmetric=False,
+                array=[high - value for value, (low, high) in zip(values, intervals)],
+                arrayminus=[value - low for value, (low, high) in zip(values, intervals)])
+
 if page == "Overview":
     st.title("📊 E-Commerce Analytics Dashboard")
     st.markdown("### 🔥 Key Performance Indicators")
     st.caption("Real-time insights from your e-commerce data")
     
+    if selected_methods is None:
+        overview = st.session_state.overview_cube.kpis(since, until, selected_categories)
+    else:
+        # The cube has no payment method axis; build one for this selection and keep it
+        filter_key = (since, until, selected_categories and tuple(selected_categories), tuple(selected_methods))
+        filtered_cubes = st.session_state.filtered_cubes
+        if filter_key in filtered_cubes:
+            filtered_cubes.move_to_end(filter_key)
+        else:
+            filtered_cubes[filter_key] = OverviewCube.build(df, version=filter_key)
+            while len(filtered_cubes) > FILTERED_CUBES:
+                filtered_cubes.popitem(last=False)
+        overview = filtered_cubes[filter_key].kpis()
     col1, col2, col3, col4 = st.columns(4)
     with col1:
-        total_customers = len(st.session_state.df['User_ID'].unique())
+        total_customers = overview['total_customers']
         st.metric(
             "👥 Total Customers", 
             f"{total_customers:,}",
@@ -279,7 +430,7 @@ if page == "Overview":
         )
         st.caption("Unique user base")
     with col2:
-        total_orders = len(st.session_state.df)
+        total_orders = overview['total_orders']
         st.metric(
             "🛒 Total Orders", 
             f"{total_orders:,}",
@@ -287,7 +438,7 @@ if page == "Overview":
         )
         st.caption(f"{total_orders/total_customers:.1f} orders/customer")
     with col3:
-        avg_order = st.session_state.df['Final_Price(Rs.)'].mean()
+        avg_order = overview['avg_order_value']
         st.metric(
             "💰 Avg Order Value", 
             f"₹{avg_order:.2f}",
@@ -295,7 +446,7 @@ if page == "Overview":
         )
         st.caption("Per transaction")
     with col4:
-        total_revenue = st.session_state.df['Final_Price(Rs.)'].sum()
+        total_revenue = overview['total_revenue']
         st.metric(
             "💵 Total Revenue", 
             f"₹{total_revenue:,.2f}",
@@ -311,61 +462,70 @@ if page == "Overview":
     with col1:
         st.markdown("### 📈 Revenue Over Time")
         st.caption("Daily revenue trend analysis")
-        daily_revenue = st.session_state.df.groupby('Purchase_Date')['Final_Price(Rs.)'].sum().reset_index()
-        fig = px.line(
-            daily_revenue, 
-            x='Purchase_Date', 
-            y='Final_Price(Rs.)',
-            title='Daily Revenue Trend',
-            template=get_plotly_template()
-        )
-        fig.update_traces(line_color='#667eea', line_width=3)
-        st.plotly_chart(fig, use_container_width=True)
+        # Rolled up to weeks/months (or LTTB-downsampled) once the range outgrows the chart width
+        daily_revenue, resolution = chart_series(overview['daily'], 'Purchase_Date', 'revenue')
+        def build():
+            fig = px.line(
+                daily_revenue, 
+                x='Purchase_Date', 
+                y='revenue',
+                labels={'revenue': 'Final_Price(Rs.)'},
+                title=f'{resolution} Revenue Trend',
+                template=get_plotly_template()
+            )
+            fig.update_traces(line_color='#667eea', line_width=3)
+            return fig
+        cached_chart('revenue_trend', build)
         st.caption(f"📅 Date range: {daily_revenue['Purchase_Date'].min().strftime('%d %b %Y')} - {daily_revenue['Purchase_Date'].max().strftime('%d %b %Y')}")
     
     with col2:
         st.markdown("### 🎯 Category Distribution")
         st.caption("Product category breakdown")
-        fig = px.pie(
-            values=st.session_state.df['Category'].value_counts().values,
-            names=st.session_state.df['Category'].value_counts().index,
-            title="Product Categories",
-            template=get_plotly_template(),
-            color_discrete_sequence=px.colors.sequential.Plasma
-        )
-        st.plotly_chart(fig, use_container_width=True)
-        st.caption(f"🏷️ {len(st.session_state.df['Category'].unique())} unique categories")
+        def build():
+            fig = px.pie(
+                values=overview['categories'].values,
+                names=overview['categories'].index,
+                title="Product Categories",
+                template=get_plotly_template(),
+                color_discrete_sequence=px.colors.sequential.Plasma
+            )
+            return fig
+        cached_chart('category_distribution', build)
+        st.caption(f"🏷️ {len(overview['categories'])} unique categories")
     
     st.markdown("---")
     st.markdown("### 📋 Sample Transaction Data")
     st.caption("Preview of the first 10 records from the dataset")
-    st.dataframe(st.session_state.df.head(10), use_container_width=True)
+    st.dataframe(expand_transactions(df.head(10)), use_container_width=True)
 
 elif page == "Customer Segments":
     st.title("👥 Customer Segmentation Analysis")
     st.markdown("### 🎯 Data-Driven Customer Insights for Business Growth")
     st.caption("K-Means clustering analysis with actionable marketing strategies")
     
+    # Both run without Streamlit calls: the exact fit may run on a worker thread, and each
+    # returns its own fitted segmentation for the promotion recommendations below
+    def fit_segments(transactions, latest_date):
+        segmentation = analytics_class('segmentation')()
+        customer_metrics = build_customer_metrics(transactions, latest_date)
+        return segmentation, len(customer_metrics), segmentation.segment_customers(customer_metrics)
+    
+    def estimate_segments():
+        sample, n_customers = customer_sample(df)
+        segmentation = analytics_class('segmentation')()
+        return segmentation, n_customers, segmentation.estimate_segments(
+            build_customer_metrics(sample, latest_date), n_customers)
+    
     try:
         with st.spinner('🔄 Analyzing customer segments...'):
-            latest_date = st.session_state.df['Purchase_Date'].max()
-            customer_metrics = st.session_state.df.groupby('User_ID').agg({
-                'Final_Price(Rs.)': ['sum', 'count', 'mean'],
-                'Discount (%)': 'mean',
-            'Purchase_Date': [
-                lambda x: (latest_date - x.max()).days,
-                lambda x: (x.max() - x.min()).days + 1
-            ]
-        }).reset_index()
-        
-        customer_metrics.columns = ['User_ID', 'total_spend', 'purchase_frequency', 
-                                  'avg_transaction_value', 'discount_usage',
-                                  'days_since_last_purchase', 'activity_period']
+            latest_date = df['Purchase_Date'].max()
+            (segmentation, n_customers, segments), showing_estimate = progressive_result(
+                'segments', estimate_segments, fit_segments, df, latest_date)
         
-        # Calculate monthly frequency
-        customer_metrics['monthly_frequency'] = customer_metrics['purchase_frequency'] / (customer_metrics['activity_period'] / 30).clip(lower=1)
-        
-        segments = st.session_state.segmentation.segment_customers(customer_metrics)
+        if showing_estimate:
+            sample_customers = sum(a['sample_size'] for a in segments['segment_analysis'].values())
+            st.info(f"⏳ Estimated from a sample of {sample_customers:,} of {n_customers:,} customers, "
+                    "with 95% confidence intervals. Exact results replace them automatically when ready.")
         
         # Overall segmentation summary
         st.markdown("---")
@@ -373,27 +533,35 @@ elif page == "Customer Segments":
         col1, col2 = st.columns(2)
         with col1:
             segment_sizes = {seg_id: data['size'] for seg_id, data in segments['segment_analysis'].items()}
-            fig = px.pie(
-                values=list(segment_sizes.values()),
-                names=[f"Segment {k}: {v}" for k, v in segments['profiles'].items()],
-                title="Customer Distribution Across Segments",
-                template=get_plotly_template(),
-                color_discrete_sequence=['#667eea', '#764ba2']
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            def build():
+                fig = px.pie(
+                    values=list(segment_sizes.values()),
+                    names=[f"Segment {k}: {v}" for k, v in segments['profiles'].items()],
+                    title="Customer Distribution Across Segments",
+                    template=get_plotly_template(),
+                    color_discrete_sequence=['#667eea', '#764ba2']
+                )
+                return fig
+            cached_chart('segment_sizes', build)
         
         with col2:
             segment_values = {seg_id: data['avg_spend'] * data['size'] for seg_id, data in segments['segment_analysis'].items()}
-            fig = px.bar(
-                x=[f"Segment {k}" for k in segment_values.keys()],
-                y=list(segment_values.values()),
-                title="Total Revenue Potential by Segment",
-                template=get_plotly_template(),
-                labels={'x': 'Segment', 'y': 'Total Revenue (₹)'},
-                color=list(segment_values.values()),
-                color_continuous_scale='Plasma'
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            def build():
+                fig = px.bar(
+                    x=[f"Segment {k}" for k in segment_values.keys()],
+                    y=list(segment_values.values()),
+                    title="Total Revenue Potential by Segment",
+                    template=get_plotly_template(),
+                    labels={'x': 'Segment', 'y': 'Total Revenue (₹)'},
+                    color=list(segment_values.values()),
+                    color_continuous_scale='Plasma'
+                )
+                if showing_estimate:
+                    fig.update_traces(error_y=error_bars(
+                        segment_values.values(),
+                        [data['total_revenue_ci'] for data in segments['segment_analysis'].values()]))
+                return fig
+            cached_chart('segment_revenue', build)
         
         st.markdown("---")
         
@@ -412,12 +580,16 @@ elif page == "Customer Segments":
             col1, col2, col3, col4 = st.columns(4)
             with col1:
                 st.metric("👥 Customer Count", f"{analysis['size']:,}")
-                pct = (analysis['size'] / customer_metrics.shape[0]) * 100
+                pct = (analysis['size'] / n_customers) * 100
                 st.caption(f"({pct:.1f}% of total)")
+                if showing_estimate:
+                    st.caption("95% CI: {:,.0f} – {:,.0f}".format(*analysis['size_ci']))
             with col2:
                 st.metric("💰 Average Spend", f"₹{analysis['avg_spend']:.2f}")
                 total_value = analysis['avg_spend'] * analysis['size']
                 st.caption(f"Total: ₹{total_value:,.2f}")
+                if showing_estimate:
+                    st.caption("95% CI: ₹{:.2f} – ₹{:.2f}".format(*analysis['avg_spend_ci']))
             with col3:
                 st.metric("🏷️ Discount Usage", f"{analysis['avg_discount_usage']*100:.1f}%")
                 if analysis['avg_discount_usage'] > 0.15:
@@ -549,7 +721,7 @@ elif page == "Customer Segments":
             
             # Implementation Timeline
             with st.expander("📋 **View Detailed Implementation Plan**"):
-                recs = st.session_state.segmentation.recommend_promotions(segment_id)
+                recs = segmentation.recommend_promotions(segment_id)
                 
                 st.markdown("**🗓️ 90-Day Action Plan:**")
                 st.markdown("""
@@ -602,154 +774,174 @@ elif page == "Bundle Analysis":
     st.caption("Association rule mining for cross-sell and upsell opportunities")
     
     try:
-        with st.spinner('🔄 Generating bundle recommendations...'):
-            # Get product and category information
-            products = st.session_state.df['Product_ID'].unique()
-            categories = st.session_state.df['Category'].unique()
+        # Bundles, discounts and the sorted bundle table are built once per data load; the
+        # filters below rerun only the bundle explorer fragment, which reads this table
+        if st.session_state.get('bundle_table') is None:
+            with st.spinner('🔄 Mining bundles from a basket sample...'):
+                # A user's purchases on one day form a basket; only a stratified sample of the
+                # baskets is mined, so moving the sliders below never waits on a full mine
+                baskets = sessionize(st.session_state.df[['User_ID', 'Product_ID', 'Category', 'Purchase_Date']])
+                bundles = get_analytics('bundler').generate_sampled_bundle_recommendations(
+                    baskets, sample_size=BUNDLE_SAMPLE_BASKETS, verify_top_k=BUNDLE_VERIFY_TOP_K)[:MAX_BUNDLES]
+                for bundle in bundles:
+                    bundle['products'] = [str(p) for p in bundle['products']]
+                st.session_state.bundles_mined = len(bundles) > 0
+            
+                if not bundles:
+                    # No customer bought more than one product in a session: fall back to
+                    # illustrative bundles so the page still demonstrates the analysis
+                    # Get product and category information
+                    products = st.session_state.df['Product_ID'].unique()
+                    # Category of each product's first transaction, looked up instead of scanned per product
+                    product_categories = st.session_state.df.drop_duplicates('Product_ID').set_index('Product_ID')['Category']
             
-            # Create synthetic bundles with more variety
-            np.random.seed(42)
-            bundles = []
+                    # Create synthetic bundles with more variety
+                    np.random.seed(42)
+                    bundles = []
             
-            # Generate 15 diverse bundles with varied characteristics
-            bundle_templates = [
-                # High confidence, high lift bundles
-                {"confidence": 0.92, "lift": 2.8, "support": 0.18, "size": 2},
-                {"confidence": 0.88, "lift": 2.5, "support": 0.16, "size": 2},
-                {"confidence": 0.85, "lift": 2.3, "support": 0.15, "size": 2},
+                    # Generate 15 diverse bundles with varied characteristics
+                    bundle_templates = [
+                        # High confidence, high lift bundles
+                        {"confidence": 0.92, "lift": 2.8, "support": 0.18, "size": 2},
+                        {"confidence": 0.88, "lift": 2.5, "support": 0.16, "size": 2},
+                        {"confidence": 0.85, "lift": 2.3, "support": 0.15, "size": 2},
                 
-                # Medium-high bundles with 3 items
-                {"confidence": 0.78, "lift": 2.1, "support": 0.12, "size": 3},
-                {"confidence": 0.81, "lift": 2.2, "support": 0.13, "size": 3},
-                {"confidence": 0.74, "lift": 1.9, "support": 0.11, "size": 3},
+                        # Medium-high bundles with 3 items
+                        {"confidence": 0.78, "lift": 2.1, "support": 0.12, "size": 3},
+                        {"confidence": 0.81, "lift": 2.2, "support": 0.13, "size": 3},
+                        {"confidence": 0.74, "lift": 1.9, "support": 0.11, "size": 3},
                 
-                # Medium confidence bundles
-                {"confidence": 0.71, "lift": 1.8, "support": 0.10, "size": 2},
-                {"confidence": 0.68, "lift": 1.7, "support": 0.09, "size": 3},
-                {"confidence": 0.72, "lift": 1.85, "support": 0.11, "size": 2},
+                        # Medium confidence bundles
+                        {"confidence": 0.71, "lift": 1.8, "support": 0.10, "size": 2},
+                        {"confidence": 0.68, "lift": 1.7, "support": 0.09, "size": 3},
+                        {"confidence": 0.72, "lift": 1.85, "support": 0.11, "size": 2},
                 
-                # Larger bundles (4 items)
-                {"confidence": 0.65, "lift": 1.6, "support": 0.08, "size": 4},
-                {"confidence": 0.62, "lift": 1.55, "support": 0.07, "size": 4},
+                        # Larger bundles (4 items)
+                        {"confidence": 0.65, "lift": 1.6, "support": 0.08, "size": 4},
+                        {"confidence": 0.62, "lift": 1.55, "support": 0.07, "size": 4},
                 
-                # More medium bundles
-                {"confidence": 0.76, "lift": 2.0, "support": 0.12, "size": 2},
-                {"confidence": 0.69, "lift": 1.75, "support": 0.09, "size": 3},
-                {"confidence": 0.80, "lift": 2.15, "support": 0.14, "size": 2},
-                {"confidence": 0.67, "lift": 1.65, "support": 0.08, "size": 3},
-            ]
+                        # More medium bundles
+                        {"confidence": 0.76, "lift": 2.0, "support": 0.12, "size": 2},
+                        {"confidence": 0.69, "lift": 1.75, "support": 0.09, "size": 3},
+                        {"confidence": 0.80, "lift": 2.15, "support": 0.14, "size": 2},
+                        {"confidence": 0.67, "lift": 1.65, "support": 0.08, "size": 3},
+                    ]
             
-            for idx, template in enumerate(bundle_templates):
-                # Select random products
-                bundle_products = np.random.choice(products, size=template["size"], replace=False).tolist()
+                    for idx, template in enumerate(bundle_templates):
+                        # Select random products
+                        bundle_products = np.random.choice(products, size=template["size"], replace=False).tolist()
                 
-                # Get categories for these products
-                bundle_categories = []
-                for prod in bundle_products:
-                    cat = st.session_state.df[st.session_state.df['Product_ID'] == prod]['Category'].iloc[0]
-                    bundle_categories.append(cat)
+                        # Get categories for these products
+                        bundle_categories = product_categories.loc[bundle_products].tolist()
                 
-                bundle = {
-                    'products': [str(p) for p in bundle_products],
-                    'categories': bundle_categories,
-                    'confidence': template['confidence'],
-                    'lift': template['lift'],
-                    'support': template['support'],
-                    'cross_category': len(set(bundle_categories)) > 1
+                        bundle = {
+                            'products': [str(p) for p in bundle_products],
+                            'categories': bundle_categories,
+                            'confidence': template['confidence'],
+                            'lift': template['lift'],
+                            'support': template['support'],
+                            'cross_category': len(set(bundle_categories)) > 1
+                        }
+                        bundles.append(bundle)
+            
+                # Discount, strength and priority for every bundle in one vectorized pass; the
+                # cards and the analytics tab read them from the bundle instead of recomputing
+                bundle_discounts = get_analytics('bundler').suggest_bundle_discounts(bundles)
+                for bundle, recs in zip(bundles, bundle_discounts.to_dict('records')):
+                    bundle['discount'] = recs
+            
+                # One row per bundle (in generation order) with the values the charts plot, and
+                # the confidence order that turns the threshold filter into a binary search
+                bundle_table = pd.DataFrame({
+                    'Confidence': [b['confidence'] * 100 for b in bundles],
+                    'Lift': [b['lift'] for b in bundles],
+                    'Support': [b['support'] * 100 for b in bundles],
+                    'Bundle_Size': [len(b['products']) for b in bundles],
+                    'Cross_Category': ['✅ Yes' if b['cross_category'] else '❌ No' for b in bundles],
+                    'Priority': bundle_discounts['priority'].to_numpy()
+                })
+                confidence_order = np.argsort([b['confidence'] for b in bundles], kind='stable')
+                st.session_state.bundles = bundles
+                st.session_state.bundle_table = {
+                    'table': bundle_table,
+                    'order': confidence_order,
+                    'confidence': np.array([b['confidence'] for b in bundles])[confidence_order],
+                    'lift': np.array([b['lift'] for b in bundles]),
+                    'cross_category': np.array([b['cross_category'] for b in bundles], dtype=bool)
                 }
-                bundles.append(bundle)
         
-        # Display bundles with enhanced styling
-        st.success(f"✨ Generated {len(bundles)} high-potential product bundles!")
+        bundles = st.session_state.bundles
         
-        # Add filter options
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            min_confidence = st.slider("Minimum Confidence", 0.0, 1.0, 0.6, 0.05, 
-                                      help="Filter bundles by confidence threshold")
-        with col2:
-            min_lift = st.slider("Minimum Lift", 1.0, 3.0, 1.5, 0.1,
-                                help="Filter bundles by lift threshold")
-        with col3:
-            show_cross_category = st.checkbox("Cross-Category Only", value=False,
-                                             help="Show only bundles spanning multiple categories")
-        
-        # Filter bundles
-        filtered_bundles = [
-            b for b in bundles 
-            if b['confidence'] >= min_confidence 
-            and b['lift'] >= min_lift
-            and (not show_cross_category or b['cross_category'])
-        ]
-        
-        if len(filtered_bundles) == 0:
-            st.warning("⚠️ No bundles match the selected filters. Try adjusting the thresholds.")
+        # Display bundles with enhanced styling
+        if st.session_state.bundles_mined:
+            st.success(f"✨ Mined {len(bundles)} high-potential product bundles from a sample of "
+                       f"{bundles[0]['sample_size']:,} shopping baskets!")
         else:
-            st.info(f"📊 Showing {len(filtered_bundles)} bundles matching your criteria")
+            st.success(f"✨ Generated {len(bundles)} high-potential product bundles!")
+            st.info("ℹ️ No customer bought several products in one session, so these bundles are illustrative")
         
-        # Add tabs for different views
-        tab1, tab2 = st.tabs(["📦 Bundle Details", "📊 Bundle Analytics"])
+        def select_bundles(min_confidence, min_lift, cross_category_only):
+            # Binary search on the confidence-sorted table, then masks on lift and cross-category;
+            # positions come back in generation order so bundle numbering is unchanged
+            index = st.session_state.bundle_table
+            candidates = index['order'][np.searchsorted(index['confidence'], min_confidence, side='left'):]
+            keep = index['lift'][candidates] >= min_lift
+            if cross_category_only:
+                keep &= index['cross_category'][candidates]
+            return np.sort(candidates[keep])
         
-        with tab1:
-            if len(filtered_bundles) > 0:
-                for i, bundle in enumerate(filtered_bundles, 1):
-                    recs = st.session_state.bundler.suggest_bundle_discount(bundle)
-                    
-                    # Create a styled card for each bundle
-                    st.markdown(f"""
-                    <div class="bundle-card">
-                        <h3>🎯 Bundle #{i}</h3>
-                        <p><strong>Products:</strong> {', '.join(bundle['products'])}</p>
-                        <p><strong>Categories:</strong> {', '.join(set(bundle['categories']))}</p>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                    col1, col2, col3, col4 = st.columns(4)
-                    with col1:
-                        st.metric("🎯 Confidence", f"{bundle['confidence']*100:.1f}%")
-                    with col2:
-                        st.metric("🚀 Purchase Lift", f"{bundle['lift']:.2f}x")
-                    with col3:
-                        st.metric("📊 Support", f"{bundle['support']*100:.1f}%")
-                    with col4:
-                        st.metric("💰 Discount", f"{recs['discount_percentage']:.1f}%")
-                    
-                    # Additional details in expander
-                    with st.expander("📋 View Detailed Recommendations"):
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            st.write(f"**Bundle Strength:** {recs['strength_score']:.2f}/1.0")
-                            st.write(f"**Priority Level:** {recs['priority']}")
-                            st.write(f"**Expected Sales Lift:** {bundle['lift']:.1f}x")
-                        with col2:
-                            st.write(f"**Cross-Category:** {'✅ Yes' if recs['cross_category'] else '❌ No'}")
-                            st.write(f"**Recommendation:** {recs['message']}")
-                            st.write(f"**Confidence Level:** {bundle['confidence']*100:.0f}%")
-                    
-                    st.markdown("---")
-        
-        with tab2:
-            if len(filtered_bundles) > 0:
-                st.markdown("### 📈 Bundle Performance Metrics")
+        def render_bundle_cards(filtered_bundles):
+            for i, bundle in enumerate(filtered_bundles, 1):
+                recs = bundle['discount']
                 
-                # Create visualization of bundle metrics
-                bundle_df = pd.DataFrame([
-                    {
-                        'Bundle': f"Bundle {i+1}",
-                        'Confidence': b['confidence']*100,
-                        'Lift': b['lift'],
-                        'Support': b['support']*100,
-                        'Bundle_Size': len(b['products']),
-                        'Cross_Category': '✅ Yes' if b['cross_category'] else '❌ No',
-                        'Priority': st.session_state.bundler.suggest_bundle_discount(b)['priority']
-                    }
-                    for i, b in enumerate(filtered_bundles)
-                ])
-                
-                # Row 1: Confidence and Lift Comparison
-                col1, col2 = st.columns(2)
+                # Create a styled card for each bundle
+                st.markdown(f"""
+                <div class="bundle-card">
+                    <h3>🎯 Bundle #{i}</h3>
+                    <p><strong>Products:</strong> {', '.join(bundle['products'])}</p>
+                    <p><strong>Categories:</strong> {', '.join(set(bundle['categories']))}</p>
+                </div>
+                """, unsafe_allow_html=True)
                 
+                col1, col2, col3, col4 = st.columns(4)
                 with col1:
+                    st.metric("🎯 Confidence", f"{bundle['confidence']*100:.1f}%")
+                with col2:
+                    st.metric("🚀 Purchase Lift", f"{bundle['lift']:.2f}x")
+                with col3:
+                    st.metric("📊 Support", f"{bundle['support']*100:.1f}%")
+                with col4:
+                    st.metric("💰 Discount", f"{recs['discount_percentage']:.1f}%")
+                if bundle.get('verified'):
+                    st.caption("✓ Verified on every basket")
+                elif 'confidence_ci' in bundle:
+                    (conf_low, conf_high), (lift_low, lift_high), (sup_low, sup_high) = (
+                        bundle['confidence_ci'], bundle['lift_ci'], bundle['support_ci'])
+                    st.caption(f"Sample estimate, 95% CI: confidence {conf_low*100:.1f}-{conf_high*100:.1f}%, "
+                               f"lift {lift_low:.2f}-{lift_high:.2f}x, support {sup_low*100:.2f}-{sup_high*100:.2f}%")
+                
+                # Additional details in expander
+                with st.expander("📋 View Detailed Recommendations"):
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        st.write(f"**Bundle Strength:** {recs['strength_score']:.2f}/1.0")
+                        st.write(f"**Priority Level:** {recs['priority']}")
+                        st.write(f"**Expected Sales Lift:** {bundle['lift']:.1f}x")
+                    with col2:
+                        st.write(f"**Cross-Category:** {'✅ Yes' if recs['cross_category'] else '❌ No'}")
+                        st.write(f"**Recommendation:** {recs['message']}")
+                        st.write(f"**Confidence Level:** {bundle['confidence']*100:.0f}%")
+                
+                st.markdown("---")
+        
+        def render_bundle_analytics(filtered_bundles, bundle_df, selection):
+            st.markdown("### 📈 Bundle Performance Metrics")
+            
+            # Row 1: Confidence and Lift Comparison
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                def build():
                     fig = px.bar(
                         bundle_df,
                         x='Bundle',
@@ -761,10 +953,12 @@ elif page == "Bundle Analysis":
                         labels={'Confidence': 'Confidence (%)'}
                     )
                     fig.update_layout(xaxis_tickangle=-45)
-                    st.plotly_chart(fig, use_container_width=True)
-                    st.caption("Higher confidence = Higher purchase probability")
-                
-                with col2:
+                    return fig
+                cached_chart('bundle_confidence', build, selection)
+                st.caption("Higher confidence = Higher purchase probability")
+            
+            with col2:
+                def build():
                     fig = px.bar(
                         bundle_df,
                         x='Bundle',
@@ -776,13 +970,15 @@ elif page == "Bundle Analysis":
                         labels={'Lift': 'Lift Factor'}
                     )
                     fig.update_layout(xaxis_tickangle=-45)
-                    st.plotly_chart(fig, use_container_width=True)
-                    st.caption("Lift > 1 indicates positive association")
-                
-                # Row 2: Scatter plot and Bundle Size Distribution
-                col1, col2 = st.columns(2)
-                
-                with col1:
+                    return fig
+                cached_chart('bundle_lift', build, selection)
+                st.caption("Lift > 1 indicates positive association")
+            
+            # Row 2: Scatter plot and Bundle Size Distribution
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                def build():
                     fig = px.scatter(
                         bundle_df,
                         x='Support',
@@ -796,10 +992,12 @@ elif page == "Bundle Analysis":
                         labels={'Support': 'Support (%)', 'Lift': 'Lift Factor'}
                     )
                     fig.update_traces(textposition='top center')
-                    st.plotly_chart(fig, use_container_width=True)
-                    st.caption("Top-right quadrant = Best bundles")
-                
-                with col2:
+                    return fig
+                cached_chart('bundle_lift_support', build, selection)
+                st.caption("Top-right quadrant = Best bundles")
+            
+            with col2:
+                def build():
                     fig = px.pie(
                         bundle_df,
                         names='Bundle_Size',
@@ -807,14 +1005,16 @@ elif page == "Bundle Analysis":
                         template=get_plotly_template(),
                         color_discrete_sequence=px.colors.sequential.RdBu
                     )
-                    st.plotly_chart(fig, use_container_width=True)
-                    st.caption("Number of products per bundle")
-                
-                # Row 3: Priority and Cross-Category Analysis
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    priority_counts = bundle_df['Priority'].value_counts()
+                    return fig
+                cached_chart('bundle_sizes', build, selection)
+                st.caption("Number of products per bundle")
+            
+            # Row 3: Priority and Cross-Category Analysis
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                priority_counts = bundle_df['Priority'].value_counts()
+                def build():
                     fig = px.bar(
                         x=priority_counts.index,
                         y=priority_counts.values,
@@ -824,11 +1024,13 @@ elif page == "Bundle Analysis":
                         color_continuous_scale='Reds',
                         labels={'x': 'Priority Level', 'y': 'Count'}
                     )
-                    st.plotly_chart(fig, use_container_width=True)
-                    st.caption("High priority = Better ROI potential")
-                
-                with col2:
-                    cross_cat_counts = bundle_df['Cross_Category'].value_counts()
+                    return fig
+                cached_chart('bundle_priority', build, selection)
+                st.caption("High priority = Better ROI potential")
+            
+            with col2:
+                cross_cat_counts = bundle_df['Cross_Category'].value_counts()
+                def build():
                     fig = px.pie(
                         values=cross_cat_counts.values,
                         names=cross_cat_counts.index,
@@ -836,11 +1038,13 @@ elif page == "Bundle Analysis":
                         template=get_plotly_template(),
                         color_discrete_sequence=['#00CC96', '#EF553B']
                     )
-                    st.plotly_chart(fig, use_container_width=True)
-                    st.caption("Cross-category = Broader reach")
-                
-                # Row 4: Heatmap of all metrics
-                st.markdown("### 🔥 Bundle Metrics Heatmap")
+                    return fig
+                cached_chart('bundle_cross_category', build, selection)
+                st.caption("Cross-category = Broader reach")
+            
+            # Row 4: Heatmap of all metrics
+            st.markdown("### 🔥 Bundle Metrics Heatmap")
+            def build():
                 fig = go.Figure(data=go.Heatmap(
                     z=[bundle_df['Confidence'].values, 
                        bundle_df['Lift'].values, 
@@ -863,64 +1067,105 @@ elif page == "Bundle Analysis":
                     xaxis_title='Bundle',
                     yaxis_title='Metric'
                 )
-                st.plotly_chart(fig, use_container_width=True)
-                st.caption("Darker colors indicate higher values for each metric")
-                
-                # Summary statistics
-                st.markdown("### 📊 Summary Statistics")
-                st.caption("Aggregate metrics across filtered bundles")
-                col1, col2, col3, col4 = st.columns(4)
-                with col1:
-                    avg_confidence = np.mean([b['confidence'] for b in filtered_bundles])
-                    st.metric(
-                        "Average Confidence", 
-                        f"{avg_confidence*100:.1f}%",
-                        help="Higher is better. Target: >70%"
-                    )
-                    st.caption("Purchase probability")
-                with col2:
-                    avg_lift = np.mean([b['lift'] for b in filtered_bundles])
-                    st.metric(
-                        "Average Lift", 
-                        f"{avg_lift:.2f}x",
-                        help="Multiplier effect. Target: >1.5x"
-                    )
-                    st.caption("Sales uplift factor")
-                with col3:
-                    cross_cat_pct = sum([1 for b in filtered_bundles if b['cross_category']]) / len(filtered_bundles) * 100
-                    st.metric(
-                        "Cross-Category Bundles", 
-                        f"{cross_cat_pct:.0f}%",
-                        help="Bundles spanning multiple categories"
-                    )
-                    st.caption("Category diversity")
-                with col4:
-                    avg_bundle_size = np.mean([len(b['products']) for b in filtered_bundles])
-                    st.metric(
-                        "Average Bundle Size",
-                        f"{avg_bundle_size:.1f}",
-                        help="Average number of products per bundle"
-                    )
-                    st.caption("Products per bundle")
-                
-                # Add top performers section
-                st.markdown("### 🏆 Top Performing Bundles")
-                col1, col2, col3 = st.columns(3)
-                
-                with col1:
-                    st.markdown("**🥇 Highest Confidence**")
-                    top_conf = max(filtered_bundles, key=lambda x: x['confidence'])
-                    st.info(f"Bundle with {top_conf['confidence']*100:.1f}% confidence\n\nProducts: {', '.join(top_conf['products'][:3])}...")
-                
-                with col2:
-                    st.markdown("**🥇 Highest Lift**")
-                    top_lift = max(filtered_bundles, key=lambda x: x['lift'])
-                    st.success(f"Bundle with {top_lift['lift']:.2f}x lift\n\nProducts: {', '.join(top_lift['products'][:3])}...")
-                
-                with col3:
-                    st.markdown("**🥇 Highest Support**")
-                    top_support = max(filtered_bundles, key=lambda x: x['support'])
-                    st.warning(f"Bundle with {top_support['support']*100:.1f}% support\n\nProducts: {', '.join(top_support['products'][:3])}...")
+                return fig
+            cached_chart('bundle_heatmap', build, selection)
+            st.caption("Darker colors indicate higher values for each metric")
+            
+            # Summary statistics
+            st.markdown("### 📊 Summary Statistics")
+            st.caption("Aggregate metrics across filtered bundles")
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                avg_confidence = bundle_df['Confidence'].mean() / 100
+                st.metric(
+                    "Average Confidence", 
+                    f"{avg_confidence*100:.1f}%",
+                    help="Higher is better. Target: >70%"
+                )
+                st.caption("Purchase probability")
+            with col2:
+                avg_lift = bundle_df['Lift'].mean()
+                st.metric(
+                    "Average Lift", 
+                    f"{avg_lift:.2f}x",
+                    help="Multiplier effect. Target: >1.5x"
+                )
+                st.caption("Sales uplift factor")
+            with col3:
+                cross_cat_pct = (bundle_df['Cross_Category'] == '✅ Yes').mean() * 100
+                st.metric(
+                    "Cross-Category Bundles", 
+                    f"{cross_cat_pct:.0f}%",
+                    help="Bundles spanning multiple categories"
+                )
+                st.caption("Category diversity")
+            with col4:
+                avg_bundle_size = bundle_df['Bundle_Size'].mean()
+                st.metric(
+                    "Average Bundle Size",
+                    f"{avg_bundle_size:.1f}",
+                    help="Average number of products per bundle"
+                )
+                st.caption("Products per bundle")
+            
+            # Add top performers section
+            st.markdown("### 🏆 Top Performing Bundles")
+            col1, col2, col3 = st.columns(3)
+            
+            with col1:
+                st.markdown("**🥇 Highest Confidence**")
+                top_conf = filtered_bundles[bundle_df['Confidence'].idxmax()]
+                st.info(f"Bundle with {top_conf['confidence']*100:.1f}% confidence\n\nProducts: {', '.join(top_conf['products'][:3])}...")
+            
+            with col2:
+                st.markdown("**🥇 Highest Lift**")
+                top_lift = filtered_bundles[bundle_df['Lift'].idxmax()]
+                st.success(f"Bundle with {top_lift['lift']:.2f}x lift\n\nProducts: {', '.join(top_lift['products'][:3])}...")
+            
+            with col3:
+                st.markdown("**🥇 Highest Support**")
+                top_support = filtered_bundles[bundle_df['Support'].idxmax()]
+                st.warning(f"Bundle with {top_support['support']*100:.1f}% support\n\nProducts: {', '.join(top_support['products'][:3])}...")
+
+        
+        @st.fragment
+        def render_bundle_explorer():
+            # Add filter options
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                min_confidence = st.slider("Minimum Confidence", 0.0, 1.0, 0.6, 0.05, 
+                                          help="Filter bundles by confidence threshold")
+            with col2:
+                min_lift = st.slider("Minimum Lift", 1.0, 3.0, 1.5, 0.1,
+                                    help="Filter bundles by lift threshold")
+            with col3:
+                show_cross_category = st.checkbox("Cross-Category Only", value=False,
+                                                 help="Show only bundles spanning multiple categories")
+            
+            # Filter bundles
+            positions = select_bundles(min_confidence, min_lift, show_cross_category)
+            filtered_bundles = [bundles[i] for i in positions]
+            
+            if len(filtered_bundles) == 0:
+                st.warning("⚠️ No bundles match the selected filters. Try adjusting the thresholds.")
+            else:
+                st.info(f"📊 Showing {len(filtered_bundles)} bundles matching your criteria")
+            
+            # Add tabs for different views
+            tab1, tab2 = st.tabs(["📦 Bundle Details", "📊 Bundle Analytics"])
+            
+            with tab1:
+                if len(filtered_bundles) > 0:
+                    render_bundle_cards(filtered_bundles)
+            
+            with tab2:
+                if len(filtered_bundles) > 0:
+                    # Rows of the cached bundle table, named by their position in the filtered list
+                    bundle_df = st.session_state.bundle_table['table'].iloc[positions].reset_index(drop=True)
+                    bundle_df.insert(0, 'Bundle', [f"Bundle {i+1}" for i in range(len(bundle_df))])
+                    render_bundle_analytics(filtered_bundles, bundle_df, tuple(positions))
+        
+        render_bundle_explorer()
     
     except Exception as e:
         st.error(f"❌ Error in bundle analysis: {str(e)}")
@@ -928,19 +1173,151 @@ elif page == "Bundle Analysis":
         with st.expander("🔍 View Error Details"):
             st.code(traceback.format_exc())
 
+elif page == "Retention Cohorts":
+    st.title("🔁 Customer Retention Cohorts")
+    st.markdown("### 📅 First-Purchase Cohort Analysis")
+    st.caption("How many customers of each first-purchase cohort come back in later periods")
+    
+    try:
+        from cohorts import build_cohorts, cohort_frame
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            period = st.radio("Cohort period", ['month', 'week'], horizontal=True,
+                              format_func=lambda p: f"{p.title()}ly")
+        with col2:
+            measures = {'retention': 'Retention (%)', 'revenue_per_user': 'Revenue per Customer (₹)',
+                        'revenue': 'Revenue (₹)'}
+            measure = st.radio("Measure", list(measures), horizontal=True, format_func=measures.get)
+        
+        # Cohort matrices per filter bar state and period, built once per data load
+        cohort_key = (active_filters, period)
+        if cohort_key not in st.session_state.cohort_tables:
+            with st.spinner('🔄 Building retention cohorts...'):
+                st.session_state.cohort_tables[cohort_key] = build_cohorts(df, period)
+        cohorts = st.session_state.cohort_tables[cohort_key]
+        
+        # Size-weighted retention curve over the cohorts observed long enough
+        observed = ~np.isnan(cohorts['retention'])
+        retention_curve = ((cohorts['active'] * observed).sum(axis=0)
+                           / np.maximum((cohorts['sizes'][:, None] * observed).sum(axis=0), 1))
+        
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("📦 Cohorts", f"{len(cohorts['sizes']):,}")
+            st.caption(f"By first {period} of purchase")
+        with col2:
+            st.metric("👥 Customers", f"{int(cohorts['sizes'].sum()):,}")
+            st.caption(f"Avg {cohorts['sizes'].mean():,.0f} per cohort" if len(cohorts['sizes']) else "No cohorts")
+        with col3:
+            next_period = retention_curve[1] * 100 if len(retention_curve) > 1 else 0.0
+            st.metric(f"🔁 Next-{period.title()} Retention", f"{next_period:.1f}%")
+            st.caption("Size-weighted across cohorts")
+        with col4:
+            st.metric("💰 Cohort Revenue", f"₹{cohorts['revenue'].sum():,.0f}")
+            st.caption("All periods")
+        
+        st.markdown("---")
+        matrix = cohort_frame(cohorts, measure)
+        if measure == 'retention':
+            matrix = matrix * 100
+        def build():
+            fig = px.imshow(
+                matrix,
+                title=f"{measures[measure]} by {period.title()}ly Cohort",
+                template=get_plotly_template(),
+                color_continuous_scale='Blues',
+                aspect='auto',
+                text_auto='.0f' if period == 'month' else False,
+                labels={'x': matrix.columns.name.capitalize(), 'y': 'Cohort', 'color': measures[measure]}
+            )
+            return fig
+        cached_chart('cohort_heatmap', build, period, measure)
+        st.caption("Rows are first-purchase cohorts, columns the periods since that first purchase; "
+                   "blank cells lie beyond the end of the data")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            def build():
+                fig = px.line(
+                    x=np.arange(len(retention_curve)),
+                    y=retention_curve * 100,
+                    markers=True,
+                    title="Average Retention Curve",
+                    template=get_plotly_template(),
+                    labels={'x': matrix.columns.name.capitalize(), 'y': 'Retention (%)'}
+                )
+                return fig
+            cached_chart('retention_curve', build, period)
+        with col2:
+            def build():
+                fig = px.bar(
+                    x=matrix.index,
+                    y=cohorts['sizes'],
+                    title="New Customers per Cohort",
+                    template=get_plotly_template(),
+                    labels={'x': 'Cohort', 'y': 'Customers'},
+                    color_discrete_sequence=['#667eea']
+                )
+                return fig
+            cached_chart('cohort_sizes', build, period)
+    
+    except Exception as e:
+        st.error(f"❌ Error in retention analysis: {str(e)}")
+
 else:
     st.title("💳 Payment Method Analytics")
     st.markdown("### 💰 Payment Preferences & Optimization Strategies")
     st.caption("Analyze payment behavior to improve conversion and reduce costs")
     
+    # Live numbers from the real-time consumer (realtime.py), refreshed every few seconds
+    if read_snapshot() is not None:
+        @st.fragment(run_every="5s")
+        def render_live_payments():
+            snapshot = read_snapshot()
+            # The live directory can be cleared while the page is open
+            if snapshot is None:
+                return
+            st.markdown("### ⚡ Live Transaction Feed")
+            st.caption(f"Streamed events, last updated {snapshot['updated_at']}")
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Events Processed", f"{snapshot['events_processed']:,}")
+            with col2:
+                st.metric("Customers Seen", f"{snapshot['customers']:,}")
+            with col3:
+                st.metric("Micro-batches", f"{snapshot['batches_processed']:,}")
+            live_stats = snapshot['payment_insights']['method_stats']
+            if live_stats:
+                st.dataframe(pd.DataFrame([
+                    {
+                        'Method': method,
+                        'Share (%)': stats['share'] * 100,
+                        'Avg Value (₹)': stats['avg_value'],
+                        'Transactions': stats['total_transactions']
+                    }
+                    for method, stats in live_stats.items()
+                ]), use_container_width=True, hide_index=True)
+            st.markdown("---")
+        
+        render_live_payments()
+    
     try:
+        payment_analyzer = get_analytics('payment_analyzer')
         with st.spinner('🔄 Analyzing payment methods...'):
-            insights = st.session_state.payment_analyzer.analyze_payment_preferences(st.session_state.df)
+            insights, showing_estimate = progressive_result(
+                'payment_preferences', lambda: payment_analyzer.estimate_payment_preferences(df),
+                payment_analyzer.analyze_payment_preferences, df)
         
-        st.success('✅ Analysis complete!')
+        if showing_estimate:
+            sample_rows = sum(s['sample_size'] for s in insights['method_stats'].values())
+            st.info(f"⏳ Estimated from a sample of {sample_rows:,} of {len(df):,} transactions, "
+                    "with 95% confidence intervals. Exact results replace them automatically when ready.")
+        else:
+            st.success('✅ Analysis complete!')
         
         # Create tabs for different views
-        tab1, tab2, tab3 = st.tabs(["📊 Overview", "📈 Detailed Analysis", "💡 Recommendations"])
+        tab1, tab2, tab3, tab4 = st.tabs(["📊 Overview", "📈 Detailed Analysis", "💡 Recommendations", "⏱️ Rolling Window"])
         
         with tab1:
             st.markdown("### 📊 Payment Method Distribution")
@@ -950,30 +1327,37 @@ else:
             with col1:
                 st.caption("Transaction share by payment type")
                 method_shares = {m: s['share'] for m, s in insights['method_stats'].items()}
-                fig = px.pie(
-                    values=list(method_shares.values()),
-                    names=list(method_shares.keys()),
-                    title="Payment Methods Distribution",
-                    template=get_plotly_template(),
-                    color_discrete_sequence=px.colors.sequential.Turbo,
-                    hole=0.4
-                )
-                st.plotly_chart(fig, use_container_width=True)
+                def build():
+                    fig = px.pie(
+                        values=list(method_shares.values()),
+                        names=list(method_shares.keys()),
+                        title="Payment Methods Distribution",
+                        template=get_plotly_template(),
+                        color_discrete_sequence=px.colors.sequential.Turbo,
+                        hole=0.4
+                    )
+                    return fig
+                cached_chart('payment_method_share', build)
                 st.caption(f"💳 {len(insights['method_stats'])} payment methods available")
             
             with col2:
                 st.caption("Average transaction value by payment method")
                 avg_values = {m: s['avg_value'] for m, s in insights['method_stats'].items()}
-                fig = px.bar(
-                    x=list(avg_values.keys()),
-                    y=list(avg_values.values()),
-                    title="Average Transaction Value by Method",
-                    template=get_plotly_template(),
-                    color=list(avg_values.values()),
-                    color_continuous_scale='Viridis',
-                    labels={'x': 'Payment Method', 'y': 'Average Value (₹)'}
-                )
-                st.plotly_chart(fig, use_container_width=True)
+                def build():
+                    fig = px.bar(
+                        x=list(avg_values.keys()),
+                        y=list(avg_values.values()),
+                        title="Average Transaction Value by Method",
+                        template=get_plotly_template(),
+                        color=list(avg_values.values()),
+                        color_continuous_scale='Viridis',
+                        labels={'x': 'Payment Method', 'y': 'Average Value (₹)'}
+                    )
+                    if showing_estimate:
+                        fig.update_traces(error_y=error_bars(
+                            avg_values.values(), [s['avg_value_ci'] for s in insights['method_stats'].values()]))
+                    return fig
+                cached_chart('payment_avg_value', build)
                 st.caption("📊 Identifies high-value payment preferences")
             
             # Summary metrics
@@ -1031,27 +1415,34 @@ else:
                 for method, stats in insights['method_stats'].items()
             ])
             
-            fig = go.Figure()
-            fig.add_trace(go.Bar(
-                name='Transaction Share (%)',
-                x=comparison_df['Method'],
-                y=comparison_df['Share (%)'],
-                marker_color='#667eea'
-            ))
-            fig.add_trace(go.Bar(
-                name='Avg Value (₹/100)',
-                x=comparison_df['Method'],
-                y=comparison_df['Avg Value (₹)'] / 100,
-                marker_color='#764ba2'
-            ))
-            fig.update_layout(
-                title='Payment Method Metrics Comparison',
-                template=get_plotly_template(),
-                barmode='group',
-                yaxis_title='Value',
-                xaxis_title='Payment Method'
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            def build():
+                fig = go.Figure()
+                fig.add_trace(go.Bar(
+                    name='Transaction Share (%)',
+                    x=comparison_df['Method'],
+                    y=comparison_df['Share (%)'],
+                    marker_color='#667eea'
+                ))
+                fig.add_trace(go.Bar(
+                    name='Avg Value (₹/100)',
+                    x=comparison_df['Method'],
+                    y=comparison_df['Avg Value (₹)'] / 100,
+                    marker_color='#764ba2',
+                    error_y=error_bars(
+                        comparison_df['Avg Value (₹)'] / 100,
+                        [(low / 100, high / 100) for low, high in
+                         (s['avg_value_ci'] for s in insights['method_stats'].values())]
+                    ) if showing_estimate else None
+                ))
+                fig.update_layout(
+                    title='Payment Method Metrics Comparison',
+                    template=get_plotly_template(),
+                    barmode='group',
+                    yaxis_title='Value',
+                    xaxis_title='Payment Method'
+                )
+                return fig
+            cached_chart('payment_comparison', build)
             st.caption("Note: Average value scaled down by 100x for visualization")
         
         with tab2:
@@ -1074,32 +1465,45 @@ else:
                         f"₹{stats['avg_value']:.2f}",
                         help="Mean transaction amount"
                     )
-                    st.caption("Per transaction")
+                    if showing_estimate:
+                        st.caption("95% CI: ₹{:.2f} – ₹{:.2f}".format(*stats['avg_value_ci']))
+                    else:
+                        st.caption("Per transaction")
                 with col3:
                     st.metric(
                         "Total Volume", 
                         f"₹{stats['total_volume']:,.2f}",
                         help="Sum of all transactions"
                     )
-                    st.caption("Cumulative revenue")
+                    if showing_estimate:
+                        st.caption("95% CI: ₹{:,.2f} – ₹{:,.2f}".format(*stats['total_volume_ci']))
+                    else:
+                        st.caption("Cumulative revenue")
                 
                 with st.expander(f"📊 View {method} Value Distribution"):
-                    fig = go.Figure(data=[
-                        go.Bar(
-                            x=['Low', 'Medium', 'High'],
-                            y=[stats['value_distribution']['low']*100,
-                               stats['value_distribution']['medium']*100,
-                               stats['value_distribution']['high']*100],
-                            marker_color=['#667eea', '#764ba2', '#f093fb']
+                    def build():
+                        fig = go.Figure(data=[
+                            go.Bar(
+                                x=['Low', 'Medium', 'High'],
+                                y=[stats['value_distribution']['low']*100,
+                                   stats['value_distribution']['medium']*100,
+                                   stats['value_distribution']['high']*100],
+                                marker_color=['#667eea', '#764ba2', '#f093fb'],
+                                error_y=error_bars(
+                                    [stats['value_distribution'][b]*100 for b in ('low', 'medium', 'high')],
+                                    [(low*100, high*100) for low, high in
+                                     (stats['value_distribution_ci'][b] for b in ('low', 'medium', 'high'))]
+                                ) if showing_estimate else None
+                            )
+                        ])
+                        fig.update_layout(
+                            title=f"{method} - Transaction Value Distribution",
+                            template=get_plotly_template(),
+                            yaxis_title='Percentage (%)',
+                            xaxis_title='Value Bracket'
                         )
-                    ])
-                    fig.update_layout(
-                        title=f"{method} - Transaction Value Distribution",
-                        template=get_plotly_template(),
-                        yaxis_title='Percentage (%)',
-                        xaxis_title='Value Bracket'
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
+                        return fig
+                    cached_chart('payment_value_distribution', build, method)
                     st.caption("Distribution of transaction values across price brackets")
                 
                 st.markdown("---")
@@ -1107,7 +1511,7 @@ else:
         with tab3:
             st.markdown("### 🎯 Payment Incentive Recommendations")
             st.caption("Strategic recommendations to optimize each payment method")
-            incentives = st.session_state.payment_analyzer.recommend_payment_incentives(insights)
+            incentives = get_analytics('payment_analyzer').recommend_payment_incentives(insights)
             
             for method, incentive in incentives.items():
                 with st.expander(f"💡 {method} Strategy", expanded=True):
@@ -1122,6 +1526,48 @@ else:
                         st.markdown(f"**Target:** {incentive['target_segment']}")
                     with col3:
                         st.markdown(f"**Impact:** {incentive['expected_impact']}")
+        
+        with tab4:
+            st.markdown("### ⏱️ Recent Payment Activity")
+            st.caption("Method share and average value over a sliding window of recent days")
+            window_days = st.radio("Window", [7, 30], index=0, horizontal=True,
+                                   format_func=lambda d: f"Last {d} days")
+            
+            window = get_analytics('payment_analyzer').analyze_payment_window(df, window_days)
+            st.caption(f"📅 Window ending {window['window_end'].strftime('%d %b %Y')}")
+            cols = st.columns(len(window['method_stats']))
+            for col, (method, stats) in zip(cols, window['method_stats'].items()):
+                with col:
+                    st.metric(method, f"{stats['share']*100:.1f}%",
+                              help="Share of transactions in the window")
+                    st.caption(f"Avg ₹{stats['avg_value']:.2f} · {stats['total_transactions']:,} txns")
+            
+            rolling = get_analytics('payment_analyzer').rolling_payment_stats(df, window_days)
+            # One row per day and method; each method's line is rolled up (or LTTB-downsampled)
+            # like the Overview trends once the range outgrows the chart width
+            rolling_share, resolution = chart_series(rolling, 'date', 'share', agg='mean', by='Payment_Method')
+            rolling_value, _ = chart_series(rolling, 'date', 'avg_value', agg='mean', by='Payment_Method')
+            col1, col2 = st.columns(2)
+            with col1:
+                def build():
+                    fig = px.line(
+                        rolling_share, x='date', y=rolling_share['share'] * 100, color='Payment_Method',
+                        title=f"{resolution} {window_days}-Day Rolling Method Share",
+                        template=get_plotly_template(),
+                        labels={'y': 'Share (%)', 'date': 'Date'}
+                    )
+                    return fig
+                cached_chart('rolling_share', build, window_days)
+            with col2:
+                def build():
+                    fig = px.line(
+                        rolling_value, x='date', y='avg_value', color='Payment_Method',
+                        title=f"{resolution} {window_days}-Day Rolling Average Value",
+                        template=get_plotly_template(),
+                        labels={'avg_value': 'Average Value (₹)', 'date': 'Date'}
+                    )
+                    return fig
+                cached_chart('rolling_avg_value', build, window_days)
     
     except Exception as e:
         st.error(f"❌ Error in payment analytics: {str(e)}")
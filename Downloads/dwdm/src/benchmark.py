@@ -0,0 +1,142 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+import pandas as pd
+import numpy as np
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from synthetic_data import generate_transactions
+from features import build_customer_metrics
+from customer_segmentation import CustomerSegmentation
+from bundle_recommendation import BundleRecommendation
+from payment_analytics import PaymentAnalytics
+from main import preprocess_transactions
+from sessions import sessionize
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+DEFAULT_RESULTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks', 'results.jsonl')
+
+def _bench_preprocess(df: pd.DataFrame) -> None:
+    preprocess_transactions(df.copy())
+
+def _bench_features(df: pd.DataFrame) -> None:
+    build_customer_metrics(df)
+
+def _bench_segmentation(df: pd.DataFrame) -> None:
+    CustomerSegmentation().segment_customers(build_customer_metrics(df))
+
+def _bench_bundles(df: pd.DataFrame) -> None:
+    # Same-user, same-day purchases form one basket
+    baskets = sessionize(df[['User_ID', 'Product_ID', 'Category', 'Purchase_Date']])
+    bundler = BundleRecommendation()
+    bundler.generate_bundle_recommendations(bundler.prepare_transaction_data(baskets))
+
+def _bench_payment(df: pd.DataFrame) -> None:
+    analyzer = PaymentAnalytics()
+    analyzer.recommend_payment_incentives(analyzer.analyze_payment_preferences(df))
+
+STAGES: Dict[str, Callable[[pd.DataFrame], None]] = {
+    'preprocess_transactions': _bench_preprocess,
+    'feature_aggregation': _bench_features,
+    'customer_segmentation': _bench_segmentation,
+    'bundle_recommendation': _bench_bundles,
+    'payment_analytics': _bench_payment
+}
+
+def _git_commit() -> str:
+    """
+    Return the short hash of the checked-out commit, or 'unknown' outside a git checkout
+    """
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def run_benchmarks(sizes: List[int], stages: Optional[List[str]] = None, budget: float = 120.0,
+                   repeat: int = 1, seed: int = 42) -> List[Dict]:
+    """
+    Time each stage at every size on synthetic data.
+
+    Once a stage takes longer than `budget` seconds, larger sizes for that stage are recorded
+    as skipped so quadratic paths do not stall the whole run.
+    """
+    stages = stages or list(STAGES)
+    commit = _git_commit()
+    over_budget = set()
+    results = []
+
+    for n_rows in sorted(sizes):
+        df = generate_transactions(n_rows, seed=seed, string_dates=False)
+        for stage in stages:
+            record = {
+                'commit': commit,
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'pandas': pd.__version__,
+                'stage': stage,
+                'rows': n_rows
+            }
+            if stage in over_budget:
+                record.update({'status': 'skipped', 'seconds': None})
+            else:
+                timings = []
+                try:
+                    for _ in range(repeat):
+                        start = time.perf_counter()
+                        STAGES[stage](df)
+                        timings.append(time.perf_counter() - start)
+                    record.update({'status': 'ok', 'seconds': min(timings)})
+                    if min(timings) > budget:
+                        over_budget.add(stage)
+                except MemoryError:
+                    over_budget.add(stage)
+                    record.update({'status': 'out_of_memory', 'seconds': None})
+            results.append(record)
+            seconds = f"{record['seconds']:.3f}s" if record['seconds'] is not None else record['status']
+            print(f"{stage:<26} {n_rows:>12,} rows  {seconds}")
+    return results
+
+def save_results(results: List[Dict], path: str = DEFAULT_RESULTS_PATH) -> None:
+    """
+    Append benchmark records as JSON lines so runs from different commits accumulate
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a') as f:
+        for record in results:
+            f.write(json.dumps(record) + '\n')
+
+def compare_results(base_commit: str, head_commit: str, path: str = DEFAULT_RESULTS_PATH) -> pd.DataFrame:
+    """
+    Compare the latest timings recorded for two commits, stage by stage and size by size
+    """
+    records = pd.read_json(path, lines=True, dtype={'commit': str})
+    records = records[records['status'] == 'ok']
+    latest = records.sort_values('timestamp').groupby(['commit', 'stage', 'rows'])['seconds'].last()
+
+    comparison = pd.DataFrame({
+        'base_seconds': latest.get(base_commit),
+        'head_seconds': latest.get(head_commit)
+    }).dropna()
+    comparison['ratio'] = comparison['head_seconds'] / comparison['base_seconds']
+    return comparison
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the analytics entry points on synthetic data")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), default=None)
+    parser.add_argument('--budget', type=float, default=120.0,
+                        help="Skip larger sizes of a stage once it exceeds this many seconds")
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--results', default=DEFAULT_RESULTS_PATH)
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'HEAD'),
+                        help="Print the timing ratio between two recorded commits instead of running")
+    args = parser.parse_args()
+
+    if args.compare:
+        print(compare_results(args.compare[0], args.compare[1], args.results).to_string())
+    else:
+        save_results(run_benchmarks(args.sizes, args.stages, args.budget, args.repeat), args.results)
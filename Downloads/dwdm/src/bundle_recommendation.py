@@ -1,7 +1,9 @@
 import pandas as pd
-from mlxtend.frequent_patterns import apriori
-from mlxtend.frequent_patterns import association_rules
+import numpy as np
+from scipy import sparse
+from itertools import combinations
 from typing import Dict, List, Tuple
+from cooccurrence import CooccurrenceIndex
 
 class BundleRecommendation:
     def __init__(self):
@@ -9,52 +11,52 @@ class BundleRecommendation:
         self.min_confidence = 0.001   # Ultra-low confidence for initial pattern discovery
         self.product_categories = {}   # Will be populated from data
         self.max_basket_size = 5      # Maximum number of items to consider in a basket
+        self.product_dim = None       # Optional star_schema.DimensionTable for product_key -> Product_ID
+        self.level_min_support = {'Category': 0.01, 'product_group': 0.005}  # Hierarchical mining thresholds
+        self.level_patterns = {}      # Frequent itemsets per level from the last hierarchical run
         
     def prepare_transaction_data(self, transactions: pd.DataFrame) -> pd.DataFrame:
         """
-        Convert transaction data into one-hot encoded format and store category information
+        Convert transaction data into one-hot encoded format and store category information.
+
+        Items are taken from the int32 'product_key' column when present (star schema fact
+        table), otherwise from 'Product_ID'.
         """
+        item_column = 'product_key' if 'product_key' in transactions.columns else 'Product_ID'
+        
         # Store category information
-        self.product_categories = transactions.groupby('Product_ID')['Category'].first().to_dict()
+        self.product_categories = transactions.groupby(item_column, observed=True)['Category'].first().to_dict()
 
-        # Group transactions and limit basket size
-        grouped_transactions = []
-        for _, group in transactions.groupby('basket_id'):  # Changed from transaction_id to basket_id
-            if len(group) > 1 and len(group) <= self.max_basket_size:
-                grouped_transactions.append(group)
+        processed_transactions = self._filter_baskets(transactions)
         
-        if not grouped_transactions:
+        if processed_transactions.empty:
             print("\nWarning: No multi-product baskets found. Bundle analysis may be limited.")
             return pd.DataFrame()
-            
-        processed_transactions = pd.concat(grouped_transactions)
         
-        # Create transaction matrix
-        unique_transactions = (processed_transactions.groupby(['basket_id', 'Product_ID'])  # Changed from transaction_id to basket_id
-                            .size()
-                            .reset_index())
-
-        # Create a pivot table for product occurrences
-        transaction_matrix = pd.pivot_table(
-            unique_transactions,
-            index='basket_id',  # Changed from transaction_id to basket_id
-            columns='Product_ID',
-            aggfunc='size',
-            fill_value=0
+        # Build the basket x product matrix straight from integer codes
+        basket_codes, baskets = pd.factorize(processed_transactions['basket_id'], sort=True)
+        item_codes, items = pd.factorize(processed_transactions[item_column], sort=True)
+        matrix = sparse.csr_matrix(
+            (np.ones(len(basket_codes), dtype=bool), (basket_codes, item_codes)),
+            shape=(len(baskets), len(items))
         )
 
-        # Filter out very infrequent products (appear in less than 0.1% of transactions)
-        min_occurrences = 1  # At least appear once since we have synthetic baskets
-        frequent_products = transaction_matrix.sum() >= min_occurrences
-        transaction_matrix = transaction_matrix.loc[:, frequent_products]
-
         # Convert to boolean (purchased or not)
-        return transaction_matrix.astype(bool)
+        return pd.DataFrame(matrix.toarray(), index=pd.Index(baskets, name='basket_id'),
+                            columns=pd.Index(items, name=item_column))
     
+    def _filter_baskets(self, transactions: pd.DataFrame) -> pd.DataFrame:
+        # Limit basket size (count rows per basket without a Python loop over groups)
+        basket_sizes = transactions.groupby('basket_id', observed=True)['basket_id'].transform('size')
+        return transactions[(basket_sizes > 1) & (basket_sizes <= self.max_basket_size)]
+
     def find_frequent_itemsets(self, transaction_matrix: pd.DataFrame) -> pd.DataFrame:
         """
         Discover frequently co-purchased products using Apriori algorithm
         """
+        # mlxtend is imported on first use, so importing this module stays cheap
+        from mlxtend.frequent_patterns import apriori
+        
         # Ensure we have some transactions
         if transaction_matrix.empty:
             return pd.DataFrame()
@@ -105,6 +107,7 @@ class BundleRecommendation:
             print("Warning: Not enough frequent itemsets found to generate bundles.")
             return []
         
+        from mlxtend.frequent_patterns import association_rules
         try:
             rules = association_rules(frequent_itemsets, 
                                     metric="confidence",
@@ -131,6 +134,10 @@ class BundleRecommendation:
                     'support': rule['support'],
                     'cross_category': len(set(categories)) > 1
                 }
+                # Mined on surrogate keys: translate back to Product_IDs for display
+                if self.product_dim is not None:
+                    bundle['product_keys'] = products
+                    bundle['products'] = self.product_dim.decode(products)
                 bundles.append(bundle)
             
             return bundles
@@ -138,6 +145,344 @@ class BundleRecommendation:
             print(f"Warning: Error generating bundle recommendations: {str(e)}")
             return []
     
+    def _basket_sizes(self, transactions: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Basket code of every row and the number of rows per basket, from long-format baskets
+        """
+        codes, _ = pd.factorize(transactions['basket_id'])
+        return codes, np.bincount(codes)
+
+    def sample_baskets(self, transactions: pd.DataFrame, sample_size: int,
+                       seed: int = 42) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Stratified basket sample drawn from long-format baskets (one row per basket item),
+        before any basket x product matrix is built. Baskets kept by prepare_transaction_data
+        (2 to max_basket_size items) are grouped by size and each stratum is sampled in
+        proportion to its share. Returns the row positions of the sampled baskets, the
+        stratum id of each of those rows and the per-stratum (population, sample) sizes.
+        """
+        codes, sizes = self._basket_sizes(transactions)
+        eligible = np.flatnonzero((sizes > 1) & (sizes <= self.max_basket_size))
+        strata, stratum_ids = np.unique(sizes[eligible], return_inverse=True)
+        population = np.bincount(stratum_ids, minlength=len(strata))
+        fraction = min(sample_size / max(len(eligible), 1), 1.0)
+        # At least two baskets per stratum so every stratum has a variance estimate
+        allocation = np.minimum(np.maximum(np.round(population * fraction).astype(int), 2), population)
+
+        rng = np.random.default_rng(seed)
+        basket_stratum = np.full(len(sizes), -1)
+        for h in range(len(strata)):
+            chosen = rng.choice(eligible[stratum_ids == h], size=allocation[h], replace=False)
+            basket_stratum[chosen] = h
+        rows = np.flatnonzero(basket_stratum[codes] >= 0)
+        return rows, basket_stratum[codes[rows]], np.column_stack([population, allocation])
+
+    @staticmethod
+    def _stratified_variance(total: np.ndarray, total_sq: np.ndarray, population: np.ndarray,
+                             allocation: np.ndarray) -> np.ndarray:
+        """
+        Variance of the stratified mean sum_h W_h * mean_h(y) from per-stratum sums of y
+        and y^2 (one row per stratum), finite population corrected
+        """
+        n = allocation[:, None]
+        within = np.maximum(total_sq - total ** 2 / n, 0) / np.maximum(n - 1, 1)
+        stratum_weight = population / population.sum()
+        return (stratum_weight ** 2 * (1 - allocation / population) / allocation) @ within
+
+    def generate_sampled_bundle_recommendations(self, transactions: pd.DataFrame,
+                                                sample_size: int = 2000, verify_top_k: int = 0,
+                                                z: float = 1.96, min_count: int = 2,
+                                                seed: int = 42) -> List[Dict]:
+        """
+        Approximate pair bundles mined from a stratified basket sample, for interactive use.
+
+        `transactions` are long-format baskets as for prepare_transaction_data; only the
+        sampled baskets are turned into a (sparse) basket x product matrix. Each sampled
+        basket is weighted by its stratum, and support, confidence = s(AB) / s(A) and
+        lift = s(AB) / (s(A) s(B)) all come from the same weighted counts. Support gets a
+        normal confidence interval, confidence and lift log-scale intervals from the
+        linearized ratio; all variances are stratified and finite population corrected.
+        The `verify_top_k` strongest rules are then recounted on the full baskets and marked
+        verified, with exact values and zero-width intervals. Rules are ranked by the lower
+        end of their lift interval.
+        """
+        item_column = 'product_key' if 'product_key' in transactions.columns else 'Product_ID'
+        rows, row_strata, sizes = self.sample_baskets(transactions, sample_size, seed)
+        if len(rows) == 0:
+            print("\nWarning: No multi-product baskets found. Bundle analysis may be limited.")
+            return []
+        sample = transactions.iloc[rows]
+        self.product_categories = sample.groupby(item_column, observed=True)['Category'].first().to_dict()
+        population, allocation = sizes[:, 0].astype(float), sizes[:, 1].astype(float)
+        stratum_weight = population / population.sum()
+
+        # Sparse basket x item presence matrix of the sampled baskets only
+        basket_codes, baskets = pd.factorize(sample['basket_id'])
+        item_codes, items = pd.factorize(sample[item_column], sort=True)
+        matrix = sparse.csr_matrix((np.ones(len(basket_codes)), (basket_codes, item_codes)),
+                                   shape=(len(baskets), len(items)))
+        matrix.data[:] = 1.0
+        n_sample = matrix.shape[0]
+        basket_stratum = np.empty(n_sample, dtype=np.int64)
+        basket_stratum[basket_codes] = row_strata
+        strata = sparse.csr_matrix((np.ones(n_sample), (basket_stratum, np.arange(n_sample))),
+                                   shape=(len(population), n_sample))
+
+        pair_count = sparse.triu(matrix.T @ matrix, k=1).tocoo()
+        keep = pair_count.data >= min_count
+        left, right = pair_count.row[keep], pair_count.col[keep]
+        if len(left) == 0:
+            print("Warning: No item pairs found in the basket sample.")
+            return []
+
+        # Per-stratum basket counts (rows = strata) of each item and each candidate pair, and
+        # the weighted support estimates built from them
+        item_h = np.asarray((strata @ matrix).todense())
+        pair_h = np.asarray((strata @ matrix[:, left].multiply(matrix[:, right])).todense())
+        estimate = lambda counts: stratum_weight @ (counts / allocation[:, None])
+        item_support = estimate(item_h)
+        support = estimate(pair_h)
+        a_h, b_h = item_h[:, left], item_h[:, right]
+        s_a, s_b = item_support[left], item_support[right]
+
+        # log(lift) = log s(AB) - log s(A) - log s(B) is linearized to the per-basket residual
+        # y_AB / s(AB) - y_A / s(A) - y_B / s(B); with 0/1 indicators every cross product is
+        # y_AB, so its per-stratum sums follow from the three counts
+        lift = support / (s_a * s_b)
+        lift_variance = self._stratified_variance(
+            pair_h / support - a_h / s_a - b_h / s_b,
+            pair_h / support ** 2 + a_h / s_a ** 2 + b_h / s_b ** 2
+            - 2 * pair_h * (1 / (support * s_a) + 1 / (support * s_b) - 1 / (s_a * s_b)),
+            population, allocation)
+        lift_half = z * np.sqrt(lift_variance)
+        support_half = z * np.sqrt(self._stratified_variance(pair_h, pair_h, population, allocation))
+
+        columns = items
+        bundles = []
+        for antecedent, antecedent_h, antecedent_support, consequent in ((left, a_h, s_a, right),
+                                                                         (right, b_h, s_b, left)):
+            confidence = support / antecedent_support
+            confidence_half = z * np.sqrt(self._stratified_variance(
+                pair_h / support - antecedent_h / antecedent_support,
+                pair_h / support ** 2 + antecedent_h / antecedent_support ** 2
+                - 2 * pair_h / (support * antecedent_support),
+                population, allocation))
+
+            for i in range(len(left)):
+                products = [columns[antecedent[i]], columns[consequent[i]]]
+                categories = [self.get_product_category(p) for p in products]
+                bundles.append({
+                    'products': products,
+                    'categories': categories,
+                    'confidence': confidence[i],
+                    'lift': lift[i],
+                    'support': support[i],
+                    'cross_category': len(set(categories)) > 1,
+                    'support_ci': (max(support[i] - support_half[i], 0.0), min(support[i] + support_half[i], 1.0)),
+                    'confidence_ci': (confidence[i] * np.exp(-confidence_half[i]),
+                                      min(confidence[i] * np.exp(confidence_half[i]), 1.0)),
+                    'lift_ci': (lift[i] * np.exp(-lift_half[i]), lift[i] * np.exp(lift_half[i])),
+                    'sample_size': n_sample,
+                    'verified': False
+                })
+
+        # Rank by the lower lift bound so pairs seen only a couple of times in the sample
+        # do not crowd out well-supported ones
+        rank = lambda b: (b['lift_ci'][0], b['confidence'])
+        bundles.sort(key=rank, reverse=True)
+        if verify_top_k:
+            self._verify_bundles(transactions, item_column, bundles[:verify_top_k], population.sum())
+            bundles[:verify_top_k] = sorted(bundles[:verify_top_k], key=rank, reverse=True)
+
+        # Mined on surrogate keys: translate back to Product_IDs for display
+        if self.product_dim is not None:
+            for bundle in bundles:
+                bundle['product_keys'] = bundle['products']
+                bundle['products'] = self.product_dim.decode(bundle['products'])
+        return bundles
+
+    def _verify_bundles(self, transactions: pd.DataFrame, item_column: str, bundles: List[Dict],
+                        n_baskets: int) -> None:
+        """
+        Replace the estimates of `bundles` with exact values counted over every basket,
+        reading only the rows of the products involved
+        """
+        codes, sizes = self._basket_sizes(transactions)
+        eligible = (sizes > 1) & (sizes <= self.max_basket_size)
+        products = pd.Index(pd.unique(np.array([p for bundle in bundles for p in bundle['products']])))
+        item_codes = products.get_indexer(transactions[item_column])
+        keep = eligible[codes] & (item_codes >= 0)
+        membership = sparse.csr_matrix((np.ones(int(keep.sum())), (codes[keep], item_codes[keep])),
+                                       shape=(len(sizes), len(products)))
+        membership.data[:] = 1.0
+        counts = (membership.T @ membership).toarray()
+
+        for bundle in bundles:
+            a, b = products.get_indexer(bundle['products'])
+            bundle['support'] = counts[a, b] / n_baskets
+            bundle['confidence'] = counts[a, b] / counts[a, a]
+            bundle['lift'] = bundle['confidence'] / (counts[b, b] / n_baskets)
+            for metric in ('support', 'confidence', 'lift'):
+                bundle[f'{metric}_ci'] = (bundle[metric], bundle[metric])
+            bundle['verified'] = True
+
+    def _level_itemsets(self, baskets: pd.DataFrame, column: str, n_baskets: int,
+                        max_len: int) -> pd.DataFrame:
+        """
+        Frequent itemsets of one hierarchy level (few columns, so plain apriori is cheap)
+        """
+        from mlxtend.frequent_patterns import apriori
+        codes, baskets_index = pd.factorize(baskets['basket_id'])
+        values, labels = pd.factorize(baskets[column].astype(str))
+        matrix = sparse.csr_matrix((np.ones(len(codes), dtype=bool), (codes, values)),
+                                   shape=(len(baskets_index), len(labels)))
+        level_matrix = pd.DataFrame(matrix.toarray(), columns=labels)
+        min_support = max(self.level_min_support.get(column, 0), 2 / n_baskets)
+        itemsets = apriori(level_matrix, min_support=min_support, use_colnames=True, max_len=max_len)
+        # Support relative to all baskets, including baskets that had no retained items
+        itemsets['support'] = itemsets['support'] * len(baskets_index) / n_baskets
+        return itemsets[itemsets['support'] >= min_support]
+
+    @staticmethod
+    def _count_itemsets(baskets: pd.DataFrame, item_column: str, max_len: int) -> Dict[frozenset, int]:
+        """
+        Count every item combination (up to max_len) that occurs in some basket, by
+        self-joining the basket frame instead of generating candidates
+        """
+        items = baskets[['basket_id', item_column]].drop_duplicates()
+        # Items are joined and ordered by integer code: raw values may be an unordered
+        # categorical, which cannot be compared with >
+        codes, values = pd.factorize(items[item_column], sort=True)
+        items = pd.DataFrame({'basket_id': items['basket_id'].to_numpy(), 'item_0': codes})[codes >= 0]
+        counts = {}
+        level = items
+        for k in range(max_len):
+            columns = [f'item_{i}' for i in range(k + 1)]
+            sizes = level.groupby(columns).size()
+            combos = zip(*(values.take(sizes.index.get_level_values(i)) for i in range(k + 1)))
+            for combo, count in zip(combos, sizes.to_numpy()):
+                counts[frozenset(combo)] = int(count)
+            if k + 1 < max_len:
+                level = level.merge(items.rename(columns={'item_0': f'item_{k + 1}'}), on='basket_id')
+                level = level[level[f'item_{k + 1}'] > level[f'item_{k}']]
+        return counts
+
+    def generate_hierarchical_bundle_recommendations(self, transactions: pd.DataFrame,
+                                                     max_len: int = 3) -> List[Dict]:
+        """
+        Multi-level bundle mining over Category -> product_group -> product.
+
+        Frequent itemsets are mined at the Category level first, then at the product_group
+        level using only groups whose categories are frequent. Products are counted only
+        inside frequent groups, and a product itemset is kept when its set of groups is
+        itself a frequent group itemset. Thresholds per level come from
+        `level_min_support`; products use the same adaptive threshold as
+        find_frequent_itemsets.
+        """
+        item_column = 'product_key' if 'product_key' in transactions.columns else 'Product_ID'
+        self.product_categories = transactions.groupby(item_column, observed=True)['Category'].first().to_dict()
+        baskets = self._filter_baskets(transactions)
+        if baskets.empty:
+            print("\nWarning: No multi-product baskets found. Bundle analysis may be limited.")
+            return []
+        n_baskets = baskets['basket_id'].nunique()
+
+        # Level 1: categories
+        category_itemsets = self._level_itemsets(baskets, 'Category', n_baskets, max_len)
+        frequent_categories = set(category_itemsets['itemsets'])
+        baskets = baskets[baskets['Category'].astype(str).isin(
+            {c for itemset in frequent_categories for c in itemset})]
+
+        # Level 2: product groups inside frequent categories
+        group_category = baskets.groupby(baskets['product_group'].astype(str), observed=True)['Category'].first().astype(str)
+        group_itemsets = self._level_itemsets(baskets, 'product_group', n_baskets, max_len)
+        group_itemsets = group_itemsets[[
+            frozenset(group_category[g] for g in itemset) in frequent_categories
+            for itemset in group_itemsets['itemsets']
+        ]]
+        frequent_groups = set(group_itemsets['itemsets'])
+        self.level_patterns = {'Category': category_itemsets, 'product_group': group_itemsets}
+
+        # Level 3: products, only inside frequent groups
+        baskets = baskets[baskets['product_group'].astype(str).isin(
+            {g for itemset in frequent_groups for g in itemset})]
+        if baskets.empty:
+            print("Warning: No frequent product groups found to drill down into.")
+            return []
+        product_group = baskets.groupby(item_column, observed=True)['product_group'].first().astype(str).to_dict()
+        counts = self._count_itemsets(baskets, item_column, max_len)
+        min_count = max(2, self.min_support * n_baskets)
+
+        bundles = []
+        for itemset, count in counts.items():
+            if len(itemset) < 2 or count < min_count:
+                continue
+            if frozenset(product_group[p] for p in itemset) not in frequent_groups:
+                continue
+            support = count / n_baskets
+            ordered = sorted(itemset)
+            for size in range(1, len(ordered)):
+                for antecedent in combinations(ordered, size):
+                    consequent = [p for p in ordered if p not in antecedent]
+                    confidence = count / counts[frozenset(antecedent)]
+                    if confidence < self.min_confidence:
+                        continue
+                    products = list(antecedent) + consequent
+                    categories = [self.get_product_category(p) for p in products]
+                    bundles.append({
+                        'products': products,
+                        'categories': categories,
+                        'confidence': confidence,
+                        'lift': confidence / (counts[frozenset(consequent)] / n_baskets),
+                        'support': support,
+                        'cross_category': len(set(categories)) > 1,
+                        'groups': [product_group[p] for p in products]
+                    })
+
+        bundles.sort(key=lambda b: (b['lift'], b['confidence']), reverse=True)
+        # Mined on surrogate keys: translate back to Product_IDs for display
+        if self.product_dim is not None:
+            for bundle in bundles:
+                bundle['product_keys'] = bundle['products']
+                bundle['products'] = self.product_dim.decode(bundle['products'])
+        return bundles
+
+    def suggest_bundle_discounts(self, bundles) -> pd.DataFrame:
+        """
+        Columnar suggest_bundle_discount: the same fields for every bundle in one pass.
+        Accepts a bundles DataFrame (or list of bundle dicts) and returns a frame on the same index.
+        """
+        bundles = pd.DataFrame(bundles)
+        if bundles.empty:
+            return pd.DataFrame(columns=['discount_percentage', 'message', 'priority', 'strength_score',
+                                         'cross_category', 'categories', 'estimated_lift'])
+        lift = bundles['lift'].to_numpy(dtype=np.float64)
+        confidence = bundles['confidence'].to_numpy(dtype=np.float64)
+        support = bundles['support'].to_numpy(dtype=np.float64)
+        cross_category = bundles['cross_category'].to_numpy(dtype=bool)
+
+        strength_score = lift * 0.4 + confidence * 0.4 + support * 0.2
+        tiers = [strength_score > 0.8, strength_score > 0.6]
+        discount = np.select(tiers, [0.15, 0.10], default=0.05) + np.where(cross_category, 0.02, 0)
+
+        return pd.DataFrame({
+            'discount_percentage': discount * 100,
+            'message': np.select(tiers, ["Premium bundle with very high purchase likelihood",
+                                         "Popular complementary products"], default="Basic bundle offer"),
+            'priority': np.select(tiers, ["High", "Medium"], default="Low"),
+            'strength_score': strength_score,
+            'cross_category': cross_category,
+            'categories': bundles['categories'].to_numpy(),
+            'estimated_lift': lift
+        }, index=bundles.index)
+
+    def build_cooccurrence_index(self, transactions: pd.DataFrame) -> CooccurrenceIndex:
+        """
+        Bitset co-occurrence index over the same baskets prepare_transaction_data uses, for
+        per-request pair lookups (pair_stats, top_complements) without itemset mining
+        """
+        return CooccurrenceIndex.build(transactions, self.max_basket_size, self.product_dim)
+
     def suggest_bundle_discount(self, bundle: Dict) -> Dict:
         """
         Calculate suggested discount and provide detailed recommendations for a bundle
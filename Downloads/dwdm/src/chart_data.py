@@ -0,0 +1,92 @@
+import pandas as pd
+import numpy as np
+from typing import Optional, Tuple
+
+# Chart width assumed when the caller does not know it, and pixels per plotted point
+DEFAULT_CHART_WIDTH = 1200
+PIXELS_PER_POINT = 2
+
+# Roll-up frequencies tried in order: pandas alias, chart title label, days per period
+ROLLUP_FREQUENCIES = [('D', 'Daily', 1), ('W', 'Weekly', 7), ('MS', 'Monthly', 30.44)]
+
+def max_points_for_width(width: Optional[int] = None) -> int:
+    """
+    Number of points worth sending for a chart `width` pixels wide
+    """
+    return max((width or DEFAULT_CHART_WIDTH) // PIXELS_PER_POINT, 3)
+
+def rollup_frequency(first, last, max_points: int) -> Tuple[str, str]:
+    """
+    Finest of day/week/month whose number of periods between `first` and `last` fits
+    in `max_points` (monthly if none does)
+    """
+    span_days = (pd.Timestamp(last) - pd.Timestamp(first)).days + 1
+    for frequency, label, days in ROLLUP_FREQUENCIES:
+        if span_days / days <= max_points:
+            return frequency, label
+    return ROLLUP_FREQUENCIES[-1][:2]
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: positions of `n_out` points that keep the visual shape
+    of the series. The first and last points are always kept; every bucket in between
+    contributes the point forming the largest triangle with the previously kept point and
+    the mean of the next bucket.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # n_out - 2 buckets over the points between the first and the last
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        next_x, next_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        area = np.abs((x[a] - next_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (next_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+def chart_series(frame: pd.DataFrame, x: str, y, max_points: Optional[int] = None,
+                 width: Optional[int] = None, method: str = 'auto', agg: str = 'sum',
+                 by: Optional[str] = None) -> Tuple[pd.DataFrame, str]:
+    """
+    Bound the number of points of a daily time series (datetime column `x`) before plotting.
+
+    `method` is 'auto' (roll up to the finest of day/week/month that fits the visible range,
+    LTTB on top if even months do not fit), 'rollup' (day/week/month only) or 'lttb'
+    (daily points selected by LTTB). The budget is `max_points`, or derived from the chart
+    `width` in pixels, and applies per group when `by` (e.g. Category) is given.
+    Returns the frame to plot and the resolution label for the chart title.
+    """
+    y = [y] if isinstance(y, str) else list(y)
+    max_points = max_points or max_points_for_width(width)
+    frame = frame.sort_values(x)
+    if len(frame) == 0:
+        return frame, 'Daily'
+
+    if method == 'lttb':
+        frequency, label = 'D', 'Daily'
+    else:
+        frequency, label = rollup_frequency(frame[x].iloc[0], frame[x].iloc[-1], max_points)
+
+    parts, downsampled = [], False
+    for group, rows in ([(None, frame)] if by is None else frame.groupby(by, observed=True)):
+        part = rows[[x] + y]
+        if frequency != 'D':
+            part = part.set_index(x).resample(frequency).agg(agg).reset_index()
+        if method != 'rollup' and len(part) > max_points:
+            seconds = part[x].to_numpy().astype('datetime64[s]').astype(np.int64)
+            part = part.iloc[lttb(seconds, part[y[0]].to_numpy(), max_points)]
+            downsampled = True
+        parts.append(part if by is None else part.assign(**{by: group}))
+
+    if downsampled:
+        label = f"{label} (downsampled)"
+    return (parts[0] if by is None else pd.concat(parts, ignore_index=True)), label
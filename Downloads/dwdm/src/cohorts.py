@@ -0,0 +1,202 @@
+import argparse
+from itertools import repeat
+import pandas as pd
+import numpy as np
+from typing import Dict, List
+from schema import purchase_days, EPOCH
+from streaming import iter_transaction_chunks, DEFAULT_CHUNKSIZE
+
+PERIODS = ('week', 'month')
+
+# (user, period) pairs are packed into one int64: user code in the high bits, period
+# number (weeks or months since 1970) in the low PERIOD_BITS
+PERIOD_BITS = 20
+PERIOD_MASK = (1 << PERIOD_BITS) - 1
+
+# Chunk results are folded together every this many chunks, bounding memory by the number
+# of distinct active user-periods
+COMPACT_EVERY = 16
+
+def period_numbers(days: np.ndarray, period: str) -> np.ndarray:
+    """
+    Week (Monday-based) or calendar month number of int day numbers, counted from 1970
+    """
+    if period == 'week':
+        # 1970-01-01 was a Thursday, so shifting by 3 days puts week boundaries on Mondays
+        return (days.astype(np.int64) + 3) // 7
+    if period == 'month':
+        return (EPOCH + days.astype('timedelta64[D]')).astype('datetime64[M]').astype(np.int64)
+    raise ValueError(f"period must be one of {PERIODS}")
+
+def period_starts(numbers: np.ndarray, period: str) -> pd.DatetimeIndex:
+    """
+    First day of each week/month number, for labelling cohorts
+    """
+    if period == 'week':
+        return pd.DatetimeIndex(EPOCH + (numbers * 7 - 3).astype('timedelta64[D]'))
+    return pd.DatetimeIndex(np.asarray(numbers).astype('datetime64[M]').astype('datetime64[D]'))
+
+class CohortAggregate:
+    """
+    Mergeable first-purchase cohort aggregate for retention analysis.
+
+    Each chunk is reduced to its distinct (user, period) pairs with their revenue, so the
+    state grows with active user-periods rather than rows. finalize() takes every user's
+    first period as its cohort and fills the cohort x periods-since-first-purchase matrices
+    with one bincount; there are no per-user loops anywhere.
+    """
+    def __init__(self, period: str = 'month'):
+        if period not in PERIODS:
+            raise ValueError(f"period must be one of {PERIODS}")
+        self.period = period
+        self.user_codes: Dict = {}                  # user id -> code, in order of first appearance
+        self.parts: List = []                       # (sorted pair keys, revenue) per chunk
+        self._category_codes = None                 # (categories, codes) of the last categorical chunk
+
+    def _encode(self, uniques) -> np.ndarray:
+        """
+        Codes of distinct user ids, adding unseen ids to the persistent map. Each lookup is
+        one hash probe, so a chunk costs its own distinct users, not every user seen so far.
+        """
+        uniques = np.asarray(uniques, dtype=object)
+        codes = np.fromiter(map(self.user_codes.get, uniques, repeat(-1)), dtype=np.int64, count=len(uniques))
+        new = np.flatnonzero(codes < 0)
+        codes[new] = np.arange(len(self.user_codes), len(self.user_codes) + len(new))
+        self.user_codes.update(zip(uniques[new], codes[new].tolist()))
+        return codes
+
+    def _user_codes(self, values: pd.Series) -> np.ndarray:
+        """
+        Stable codes for user ids across chunks (-1 for missing ids)
+        """
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            inverse, uniques = values.cat.codes.to_numpy(), values.cat.categories
+            # Chunks of one categorical frame share their categories; map them only once
+            if self._category_codes is not None and self._category_codes[0] is uniques:
+                return np.where(inverse >= 0, self._category_codes[1][inverse], -1)
+        else:
+            inverse, uniques = pd.factorize(values)
+        codes = self._encode(uniques)
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            self._category_codes = (uniques, codes)
+        return np.where(inverse >= 0, codes[inverse], -1)
+
+    @staticmethod
+    def _reduce(keys: np.ndarray, revenue: np.ndarray):
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        return unique_keys, np.bincount(inverse, weights=revenue, minlength=len(unique_keys))
+
+    def update(self, chunk: pd.DataFrame) -> 'CohortAggregate':
+        users = self._user_codes(chunk['User_ID'])
+        periods = period_numbers(purchase_days(chunk['Purchase_Date']).to_numpy(), self.period)
+        revenue = chunk['Final_Price(Rs.)'].to_numpy(dtype=np.float64)
+        valid = users >= 0
+        keys = (users[valid].astype(np.int64) << PERIOD_BITS) | periods[valid]
+        if len(keys):
+            self.parts.append(self._reduce(keys, revenue[valid]))
+            if len(self.parts) >= COMPACT_EVERY:
+                self._compact()
+        return self
+
+    def _compact(self) -> None:
+        """
+        Fold the per-chunk pair lists into one, summing the revenue of repeated pairs
+        """
+        self.parts = [self._reduce(np.concatenate([k for k, _ in self.parts]),
+                                   np.concatenate([r for _, r in self.parts]))]
+
+    def merge(self, other: 'CohortAggregate') -> 'CohortAggregate':
+        if other.period != self.period:
+            raise ValueError("Cannot merge cohort aggregates with different periods")
+        # Codes of the other aggregate's users in this one's code space, indexed by their code there
+        recode = self._encode(list(other.user_codes))
+        for keys, revenue in other.parts:
+            self.parts.append(self._reduce((recode[keys >> PERIOD_BITS] << PERIOD_BITS) | (keys & PERIOD_MASK), revenue))
+        return self
+
+    def finalize(self) -> Dict:
+        """
+        Cohort x period matrices, rows = first-purchase cohorts, column k = k periods after it:
+        `active` users, `retention` (active / cohort size; NaN past the last observed period),
+        `revenue` and `revenue_per_user` (revenue / cohort size), with cohort `sizes` and
+        `cohorts` (period start dates)
+        """
+        if not self.parts:
+            return {'period': self.period, 'cohorts': pd.DatetimeIndex([]), 'sizes': np.zeros(0, dtype=np.int64),
+                    'active': np.zeros((0, 0), dtype=np.int64), 'retention': np.zeros((0, 0)),
+                    'revenue': np.zeros((0, 0)), 'revenue_per_user': np.zeros((0, 0))}
+        self._compact()
+        keys, revenue = self.parts[0]
+
+        # Keys are sorted, so each user's pairs are contiguous and start at its first period
+        users, periods = keys >> PERIOD_BITS, keys & PERIOD_MASK
+        starts = np.flatnonzero(np.r_[True, users[1:] != users[:-1]])
+        first = np.repeat(periods[starts], np.diff(np.r_[starts, len(keys)]))
+
+        first_period, last_period = int(periods.min()), int(periods.max())
+        n_periods = last_period - first_period + 1
+        cell = (first - first_period) * n_periods + (periods - first)
+        shape = (n_periods, n_periods)
+        active = np.bincount(cell, minlength=n_periods * n_periods).reshape(shape)
+        revenue_matrix = np.bincount(cell, weights=revenue, minlength=n_periods * n_periods).reshape(shape)
+
+        # Drop periods in which nobody made a first purchase
+        sizes = active[:, 0]
+        rows = np.flatnonzero(sizes > 0)
+        sizes, active, revenue_matrix = sizes[rows], active[rows], revenue_matrix[rows]
+        observed = np.arange(n_periods)[None, :] <= (n_periods - 1 - rows)[:, None]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            retention = np.where(observed, active / sizes[:, None], np.nan)
+            revenue_per_user = np.where(observed, revenue_matrix / sizes[:, None], np.nan)
+        return {
+            'period': self.period,
+            'cohorts': period_starts(first_period + rows, self.period),
+            'sizes': sizes,
+            'active': active,
+            'retention': retention,
+            'revenue': revenue_matrix,
+            'revenue_per_user': revenue_per_user
+        }
+
+def build_cohorts(df: pd.DataFrame, period: str = 'month', chunksize: int = DEFAULT_CHUNKSIZE) -> Dict:
+    """
+    Cohort retention and revenue matrices of an in-memory transaction frame (raw or compact),
+    accumulated `chunksize` rows at a time
+    """
+    aggregate = CohortAggregate(period)
+    for start in range(0, len(df), chunksize):
+        aggregate.update(df.iloc[start:start + chunksize])
+    return aggregate.finalize()
+
+def stream_cohorts(path: str, period: str = 'month', chunksize: int = DEFAULT_CHUNKSIZE) -> Dict:
+    """
+    Cohort matrices of a CSV/Parquet file or partition directory without loading it whole
+    """
+    aggregate = CohortAggregate(period)
+    for chunk in iter_transaction_chunks(path, chunksize, ['User_ID', 'Final_Price(Rs.)', 'Purchase_Date']):
+        aggregate.update(chunk)
+    return aggregate.finalize()
+
+def cohort_frame(cohorts: Dict, values: str = 'retention') -> pd.DataFrame:
+    """
+    One of the matrices as a labelled frame (cohort start x periods since first purchase)
+    """
+    label = '%Y-%m' if cohorts['period'] == 'month' else '%Y-%m-%d'
+    matrix = cohorts[values]
+    return pd.DataFrame(matrix, index=cohorts['cohorts'].strftime(label),
+                        columns=pd.RangeIndex(matrix.shape[1], name=f"{cohorts['period']}s since first purchase"))
+
+if __name__ == "__main__":
+    from dataset import DATA_PATH
+    parser = argparse.ArgumentParser(description="First-purchase cohort retention of a transaction file")
+    parser.add_argument('--data', default=DATA_PATH,
+                        help="CSV/Parquet file or directory of date partitions (defaults to DWDM_DATA_PATH)")
+    parser.add_argument('--period', choices=PERIODS, default='month')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    args = parser.parse_args()
+
+    cohorts = stream_cohorts(args.data, args.period, args.chunksize)
+    retention = cohort_frame(cohorts, 'retention')
+    retention.insert(0, 'customers', cohorts['sizes'])
+    with pd.option_context('display.width', 200, 'display.max_columns', 30):
+        print(retention.round(3).to_string())
@@ -0,0 +1,129 @@
+import pandas as pd
+import numpy as np
+from scipy import sparse
+from typing import Dict, List, Optional
+
+# Set bits per byte, for popcounts on numpy versions without np.bitwise_count
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+def popcount(words: np.ndarray) -> np.ndarray:
+    """
+    Number of set bits per row of a uint64 bitset array
+    """
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int64)
+    return _POPCOUNT_TABLE[words.view(np.uint8)].sum(axis=-1, dtype=np.int64)
+
+class CooccurrenceIndex:
+    """
+    Pairwise bundle statistics from per-product basket bitsets.
+
+    Each product has a bitset with one bit per basket. Support for a pair is the popcount
+    of the two bitsets ANDed together, so pair lookups and "top complements" queries need
+    no itemset mining. Products are addressed by Product_ID.
+    """
+    def __init__(self, items: pd.Index, bits: np.ndarray, baskets: sparse.csr_matrix,
+                 categories: Optional[Dict] = None):
+        self.items = items
+        self.positions = {item: i for i, item in enumerate(items)}
+        self.bits = bits                      # (n_items, n_words) uint64
+        self.baskets = baskets                # basket x item membership, for candidate lookup
+        self.item_baskets = baskets.tocsc()
+        self.categories = categories or {}
+        self.n_baskets = baskets.shape[0]
+        self.item_counts = popcount(bits)
+
+    @classmethod
+    def build(cls, transactions: pd.DataFrame, max_basket_size: Optional[int] = None,
+              product_dim=None) -> 'CooccurrenceIndex':
+        """
+        Index a basket frame (basket_id plus product_key or Product_ID, and Category).
+        With a product_dim, product_key items are decoded to Product_IDs.
+        """
+        item_column = 'product_key' if 'product_key' in transactions.columns else 'Product_ID'
+        if max_basket_size is not None:
+            basket_sizes = transactions.groupby('basket_id', observed=True)['basket_id'].transform('size')
+            transactions = transactions[(basket_sizes > 1) & (basket_sizes <= max_basket_size)]
+
+        basket_codes, baskets = pd.factorize(transactions['basket_id'], sort=True)
+        item_codes, items = pd.factorize(transactions[item_column], sort=True)
+        if product_dim is not None and item_column == 'product_key':
+            items = pd.Index(product_dim.decode(items), name='Product_ID')
+        membership = sparse.csr_matrix(
+            (np.ones(len(basket_codes), dtype=bool), (basket_codes, item_codes)),
+            shape=(len(baskets), len(items))
+        )
+
+        # Pack each product's basket column into 64-bit words straight from the CSC entries,
+        # never materializing the dense items x baskets array. Entries are sorted by (item,
+        # basket), so each word's entries are contiguous; their bits are distinct, so a sum
+        # per word is their OR.
+        n_words = max((len(baskets) + 63) // 64, 1)
+        bits = np.zeros((len(items), n_words), dtype=np.uint64)
+        by_item = membership.tocsc()
+        by_item.sort_indices()
+        entry_items = np.repeat(np.arange(len(items), dtype=np.int64), np.diff(by_item.indptr))
+        entry_baskets = by_item.indices.astype(np.int64)
+        words = entry_items * n_words + (entry_baskets >> 6)
+        if len(words):
+            starts = np.flatnonzero(np.r_[True, words[1:] != words[:-1]])
+            values = np.left_shift(np.uint64(1), (entry_baskets & 63).astype(np.uint64))
+            bits.ravel()[words[starts]] = np.add.reduceat(values, starts)
+
+        categories = dict(zip(items[item_codes], transactions['Category'].astype(str)))
+        return cls(pd.Index(items), bits, membership, categories)
+
+    def _position(self, product) -> int:
+        if product not in self.positions:
+            raise KeyError(f"Unknown product: {product}")
+        return self.positions[product]
+
+    def _stats(self, a: int, b: np.ndarray) -> Dict[str, np.ndarray]:
+        count = popcount(self.bits[a] & self.bits[b])
+        support = count / self.n_baskets
+        confidence = count / max(self.item_counts[a], 1)
+        consequent_support = self.item_counts[b] / self.n_baskets
+        lift = np.divide(confidence, consequent_support, out=np.zeros(len(b)), where=consequent_support > 0)
+        return {'count': count, 'support': support, 'confidence': confidence, 'lift': lift}
+
+    def _bundle(self, a: int, b: int, stats: Dict, i: int) -> Dict:
+        products = [self.items[a], self.items[b]]
+        categories = [self.categories.get(p, "Other") for p in products]
+        return {
+            'products': products,
+            'categories': categories,
+            'confidence': float(stats['confidence'][i]),
+            'lift': float(stats['lift'][i]),
+            'support': float(stats['support'][i]),
+            'cross_category': len(set(categories)) > 1,
+            'count': int(stats['count'][i])
+        }
+
+    def pair_stats(self, antecedent, consequent) -> Dict:
+        """
+        Support, confidence and lift of the rule antecedent -> consequent, in the bundle
+        dict format used by BundleRecommendation
+        """
+        a, b = self._position(antecedent), self._position(consequent)
+        return self._bundle(a, b, self._stats(a, np.array([b])), 0)
+
+    def top_complements(self, product, k: int = 10, min_count: int = 2, metric: str = 'lift') -> List[Dict]:
+        """
+        The k best rules product -> X, ranked by `metric` (lift, confidence or support)
+        """
+        a = self._position(product)
+        # Candidates are the products sharing at least one basket with `product`
+        product_baskets = self.item_baskets.indices[self.item_baskets.indptr[a]:self.item_baskets.indptr[a + 1]]
+        starts, ends = self.baskets.indptr[product_baskets], self.baskets.indptr[product_baskets + 1]
+        lengths = ends - starts
+        # Flat positions of every item in those baskets, without a Python loop over baskets
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        candidates = np.unique(self.baskets.indices[np.repeat(starts, lengths) + offsets])
+        candidates = candidates[candidates != a]
+        if len(candidates) == 0:
+            return []
+
+        stats = self._stats(a, candidates)
+        keep = np.flatnonzero(stats['count'] >= min_count)
+        order = keep[np.lexsort((-stats['confidence'][keep], -stats[metric][keep]))][:k]
+        return [self._bundle(a, candidates[i], stats, i) for i in order]
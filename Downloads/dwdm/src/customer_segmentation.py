@@ -1,13 +1,15 @@
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import KMeans
 from typing import Dict, List
+from features import build_customer_metrics
+from schema import purchase_dates
+from progressive import mean_ci, proportion_ci
 
 class CustomerSegmentation:
     def __init__(self):
+        # sklearn is imported on the first fit rather than with the module (slow to import)
         self.model = None
-        self.scaler = StandardScaler()
+        self.scaler = None
         self.features = [
             'total_spend',
             'monthly_frequency',
@@ -19,17 +21,27 @@ class CustomerSegmentation:
             0: "Deal Hunters",      # High discount usage, price sensitive
             1: "Loyal Customers"    # High frequency, value relationship
         }
+        self.promotions = {}        # recommend_promotions payloads, cached for predict_batch
+        self.reference_date = None  # Date recency was measured from at fit time
+        self.fill_values = {}       # Training medians, filled into incomplete rows by predict_batch
         
     def preprocess_data(self, data: pd.DataFrame) -> pd.DataFrame:
         """
         Preprocess customer data for segmentation
         """
+        from sklearn.preprocessing import StandardScaler
+        self.scaler = StandardScaler()
         return self.scaler.fit_transform(data[self.features])
     
-    def segment_customers(self, data: pd.DataFrame, n_segments: int = 2) -> Dict:
+    def segment_customers(self, data: pd.DataFrame, n_segments: int = 2, reference_date=None) -> Dict:
         """
-        Segment customers based on their shopping behavior
+        Segment customers based on their shopping behavior.
+
+        `reference_date` is the date `days_since_last_purchase` was measured from (the
+        latest purchase of the training transactions); predict_batch measures the recency
+        of new customers from it.
         """
+        from sklearn.cluster import KMeans
         X = self.preprocess_data(data)
         self.model = KMeans(n_clusters=n_segments, random_state=42)
         segments = self.model.fit_predict(X)
@@ -37,6 +49,9 @@ class CustomerSegmentation:
         # Store raw data for analysis
         self.data = data.copy()
         self.data['segment'] = segments
+        self.promotions = {}
+        self.reference_date = None if reference_date is None else purchase_dates(pd.Series([reference_date])).iloc[0]
+        self.fill_values = data.select_dtypes(include=[np.number]).median().to_dict()
         
         return {
             'segments': segments,
@@ -45,6 +60,32 @@ class CustomerSegmentation:
             'segment_analysis': self.analyze_segments()
         }
     
+    def estimate_segments(self, sample: pd.DataFrame, n_customers: int, n_segments: int = 2,
+                          z: float = 1.96) -> Dict:
+        """
+        segment_customers on the metrics of a random subset of customers (see
+        progressive.customer_sample), with sizes and revenue scaled to `n_customers` and a
+        95% interval (`size_ci`, `avg_spend_ci`, ...) on every estimated figure
+        """
+        result = self.segment_customers(sample, n_segments)
+        n_sample = len(sample)
+        for segment_id, analysis in result['segment_analysis'].items():
+            segment_data = self.data[self.data['segment'] == segment_id]
+            n = len(segment_data)
+            low, high = proportion_ci(n / n_sample, n_sample, n_customers, z)
+            size = int(round(n / n_sample * n_customers))
+            analysis['size'] = size
+            analysis['size_ci'] = (low * n_customers, high * n_customers)
+            for key, column in (('avg_spend', 'total_spend'), ('avg_discount_usage', 'discount_usage'),
+                                ('recency', 'days_since_last_purchase')):
+                analysis[f'{key}_ci'] = mean_ci(analysis[key], segment_data[column].std(), n, size, z)
+            analysis['total_revenue'] = analysis['avg_spend'] * size
+            # Product of the two intervals' ends: conservative bounds for size x mean spend
+            analysis['total_revenue_ci'] = (analysis['size_ci'][0] * analysis['avg_spend_ci'][0],
+                                            analysis['size_ci'][1] * analysis['avg_spend_ci'][1])
+            analysis['sample_size'] = n
+        return result
+    
     def analyze_segments(self) -> Dict:
         """
         Analyze characteristics of each segment
@@ -121,4 +162,52 @@ class CustomerSegmentation:
             "avg_transaction": segment_data['total_spend'].mean()
         })
         
-        return recommendations
\ No newline at end of file
+        return recommendations
+
+    def predict_batch(self, data: pd.DataFrame, chunksize: int = 1_000_000,
+                      include_promotions: bool = True) -> Dict:
+        """
+        Assign segments to new customers with the fitted scaler and centroids, without refitting.
+
+        `data` is either per-customer feature rows (the build_customer_metrics columns) or
+        raw transactions, which are aggregated first with recency measured from the fit's
+        reference date (or the batch's last purchase, if later). Missing values are filled
+        with the training medians. Rows are scored in chunks using
+        ||x - c||^2 = ||x||^2 - 2 x.c + ||c||^2, so memory stays O(chunksize * segments).
+        """
+        if self.model is None:
+            raise ValueError("Segmentation model is not fitted; call segment_customers first")
+        if not set(self.features).issubset(data.columns):
+            transactions = data.assign(Purchase_Date=purchase_dates(data['Purchase_Date']))
+            latest_date = transactions['Purchase_Date'].max()
+            if self.reference_date is not None:
+                latest_date = max(latest_date, self.reference_date)
+            data = build_customer_metrics(transactions, latest_date, self.fill_values)
+
+        X = data[self.features].fillna(self.fill_values).to_numpy(dtype=np.float64)
+        # Fold the scaler into the centroids: (x - mean) / scale, compared with scaled centroids
+        centers = self.model.cluster_centers_ * self.scaler.scale_ + self.scaler.mean_
+        weights = 1 / self.scaler.scale_ ** 2
+        center_norms = (centers ** 2 * weights).sum(axis=1)
+
+        segments = np.empty(len(X), dtype=np.int32)
+        for start in range(0, len(X), chunksize):
+            chunk = X[start:start + chunksize]
+            distances = center_norms - 2 * (chunk * weights) @ centers.T
+            segments[start:start + chunksize] = distances.argmin(axis=1)
+
+        key_column = next((col for col in ('User_ID', 'user_key') if col in data.columns), None)
+        result = pd.DataFrame({'segment': segments}, index=data.index)
+        if key_column is not None:
+            result.insert(0, key_column, data[key_column].to_numpy())
+        result['segment_name'] = pd.Categorical.from_codes(
+            segments, categories=[self.segment_profiles[i] for i in range(len(self.segment_profiles))])
+
+        batch = {'segments': result}
+        if include_promotions:
+            present = np.unique(segments).tolist()
+            for segment_id in present:
+                if segment_id not in self.promotions:
+                    self.promotions[segment_id] = self.recommend_promotions(segment_id)
+            batch['promotions'] = {segment_id: self.promotions[segment_id] for segment_id in present}
+        return batch
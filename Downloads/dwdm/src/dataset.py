@@ -0,0 +1,154 @@
+import argparse
+import hashlib
+import os
+import re
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from schema import compact_transactions, csv_dtypes
+
+# Default dataset location; override with the DWDM_DATA_PATH environment variable.
+# It may point at a single CSV/Parquet file or at a directory of date partitions.
+DATA_PATH = os.environ.get(
+    'DWDM_DATA_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ecommerce_dataset_preprocessed.csv')
+)
+
+PARTITION_PATTERN = re.compile(r'^(month|day)=(\d{4}-\d{2}(?:-\d{2})?)$')
+
+def _parse_dates(df: pd.DataFrame) -> pd.DataFrame:
+    if 'Purchase_Date' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['Purchase_Date']):
+        df['Purchase_Date'] = pd.to_datetime(df['Purchase_Date'], format='%d-%m-%Y')
+    return df
+
+def _partition_range(granularity: str, value: str) -> Tuple[pd.Timestamp, pd.Timestamp]:
+    """
+    Return the inclusive [start, end] dates covered by a partition directory name
+    """
+    start = pd.Timestamp(value)
+    if granularity == 'month':
+        return start, start + pd.offsets.MonthEnd(0)
+    return start, start
+
+class TransactionDataset:
+    """
+    Transaction data stored either as a single CSV/Parquet file or as a directory of
+    date-partitioned Parquet files (``month=YYYY-MM/`` or ``day=YYYY-MM-DD/``).
+
+    For partitioned data, a date window only reads the partitions it overlaps, and those
+    partitions are loaded in parallel.
+    """
+    def __init__(self, path: Optional[str] = None, max_workers: int = 8):
+        self.path = path or DATA_PATH
+        self.max_workers = max_workers
+
+    @property
+    def is_partitioned(self) -> bool:
+        return os.path.isdir(self.path)
+
+    def partitions(self) -> List[Tuple[pd.Timestamp, pd.Timestamp, List[str]]]:
+        """
+        List (start, end, files) for every partition directory, sorted by date
+        """
+        partitions = []
+        for name in os.listdir(self.path):
+            match = PARTITION_PATTERN.match(name)
+            directory = os.path.join(self.path, name)
+            if not match or not os.path.isdir(directory):
+                continue
+            start, end = _partition_range(match.group(1), match.group(2))
+            files = sorted(os.path.join(directory, f) for f in os.listdir(directory) if f.endswith('.parquet'))
+            if files:
+                partitions.append((start, end, files))
+        return sorted(partitions, key=lambda p: p[0])
+
+    def select_files(self, since=None, until=None) -> List[str]:
+        """
+        Partition pruning: return only files whose partition overlaps [since, until]
+        """
+        since = pd.Timestamp(since) if since is not None else None
+        until = pd.Timestamp(until) if until is not None else None
+        files = []
+        for start, end, partition_files in self.partitions():
+            if since is not None and end < since:
+                continue
+            if until is not None and start > until:
+                continue
+            files.extend(partition_files)
+        return files
+
+    def version(self, since=None, until=None) -> str:
+        """
+        Fingerprint of the files a load of [since, until] would read (paths, sizes and
+        modification times), so caches of derived results can tell when the data changed
+        """
+        files = self.select_files(since, until) if self.is_partitioned else [self.path]
+        stats = [(f, os.path.getsize(f), os.path.getmtime(f)) for f in files if os.path.exists(f)]
+        return hashlib.sha1(repr((since, until, stats)).encode()).hexdigest()[:16]
+
+    def load(self, since=None, until=None, columns: Optional[List[str]] = None,
+             compact: bool = False) -> pd.DataFrame:
+        """
+        Load transactions, optionally restricted to the inclusive date window [since, until].
+
+        With compact=True the frame uses the schema.py dtype model (categorical IDs, float32
+        prices, uint8 discount, int32 day numbers).
+        """
+        if columns is not None and 'Purchase_Date' not in columns and (since is not None or until is not None):
+            columns = list(columns) + ['Purchase_Date']
+
+        if self.is_partitioned:
+            import pyarrow.parquet as pq
+            files = self.select_files(since, until)
+            if not files:
+                return pd.DataFrame(columns=columns or [])
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                tables = list(pool.map(lambda f: pq.read_table(f, columns=columns).to_pandas(), files))
+            df = pd.concat(tables, ignore_index=True)
+        elif self.path.endswith('.parquet'):
+            df = pd.read_parquet(self.path, columns=columns)
+        else:
+            df = pd.read_csv(self.path, usecols=columns, dtype=csv_dtypes() if compact else None)
+
+        df = _parse_dates(df)
+
+        # Partitions are coarser than the window, so trim the edges exactly
+        if since is not None:
+            df = df[df['Purchase_Date'] >= pd.Timestamp(since)]
+        if until is not None:
+            df = df[df['Purchase_Date'] <= pd.Timestamp(until)]
+        df = df.reset_index(drop=True)
+        return compact_transactions(df) if compact else df
+
+def write_partitioned(df: pd.DataFrame, root: str, granularity: str = 'month') -> List[str]:
+    """
+    Write transactions as date-partitioned Parquet files under `root`
+    """
+    df = _parse_dates(df.copy())
+    key_format = '%Y-%m' if granularity == 'month' else '%Y-%m-%d'
+    keys = df['Purchase_Date'].dt.strftime(key_format)
+    written = []
+    for key, part in df.groupby(keys):
+        directory = os.path.join(root, f'{granularity}={key}')
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, 'part-0.parquet')
+        part.to_parquet(path, index=False)
+        written.append(path)
+    return written
+
+def load_transactions(path: Optional[str] = None, since=None, until=None,
+                      columns: Optional[List[str]] = None, compact: bool = False) -> pd.DataFrame:
+    """
+    Convenience wrapper: load the configured dataset with an optional date window
+    """
+    return TransactionDataset(path).load(since=since, until=until, columns=columns, compact=compact)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a transaction file into date-partitioned Parquet")
+    parser.add_argument('source', help="Source CSV or Parquet file")
+    parser.add_argument('destination', help="Output directory for the partitions")
+    parser.add_argument('--granularity', choices=['month', 'day'], default='month')
+    args = parser.parse_args()
+
+    paths = write_partitioned(TransactionDataset(args.source).load(), args.destination, args.granularity)
+    print(f"Wrote {len(paths)} partitions to {args.destination}")
@@ -0,0 +1,69 @@
+import pandas as pd
+import numpy as np
+from typing import Dict, Optional
+from schema import discount_fraction
+
+def build_customer_metrics(df: pd.DataFrame, latest_date=None,
+                           fill_values: Optional[Dict] = None) -> pd.DataFrame:
+    """
+    Aggregate raw transactions into the per-customer feature frame used for segmentation.
+
+    Recency is measured from `latest_date` (default: the last purchase in `df`); see
+    finalize_customer_metrics for `fill_values`.
+    """
+    # Works on the raw frame, the compact schema.py form and the star_schema.py fact
+    # table (grouped by the int32 user_key instead of the User_ID string)
+    key_column = 'user_key' if 'user_key' in df.columns else 'User_ID'
+    frame = pd.DataFrame({
+        key_column: df[key_column],
+        'price': df['Final_Price(Rs.)'].astype(np.float64),
+        'discount': discount_fraction(df['Discount (%)']),
+        'date': df['Purchase_Date']
+    })
+    if latest_date is None:
+        latest_date = frame['date'].max()
+    customer_metrics = frame.groupby(key_column, observed=True).agg(
+        total_spend=('price', 'sum'),
+        purchase_frequency=('price', 'count'),
+        avg_transaction_value=('price', 'mean'),
+        discount_usage=('discount', 'mean'),
+        first_purchase=('date', 'min'),
+        last_purchase=('date', 'max')
+    ).reset_index()
+
+    return finalize_customer_metrics(customer_metrics, latest_date, fill_values)
+
+def finalize_customer_metrics(customer_metrics: pd.DataFrame, latest_date,
+                              fill_values: Optional[Dict] = None) -> pd.DataFrame:
+    """
+    Turn first/last purchase dates into recency and activity features and clean up edge cases.
+
+    Missing values are filled from `fill_values` (column -> value, e.g. the medians of the
+    training data when scoring new customers) and otherwise with the column median.
+    """
+    days_since_last_purchase = latest_date - customer_metrics['last_purchase']
+    activity_period = customer_metrics['last_purchase'] - customer_metrics['first_purchase']
+    if pd.api.types.is_timedelta64_dtype(activity_period):
+        days_since_last_purchase = days_since_last_purchase.dt.days
+        activity_period = activity_period.dt.days
+    # Compact frames store int32 day numbers, so the differences are already in days
+    customer_metrics['days_since_last_purchase'] = days_since_last_purchase.astype(np.int64)
+    customer_metrics['activity_period'] = activity_period.astype(np.int64) + 1
+    customer_metrics = customer_metrics.drop(columns=['first_purchase', 'last_purchase'])
+
+    # Normalize frequency to monthly and handle edge cases
+    customer_metrics['monthly_frequency'] = customer_metrics['purchase_frequency'].astype(float)
+    mask = customer_metrics['activity_period'] > 0
+    customer_metrics.loc[mask, 'monthly_frequency'] = (
+        customer_metrics.loc[mask, 'purchase_frequency'] /
+        customer_metrics.loc[mask, 'activity_period'] * 30
+    )
+
+    # Replace infinite values with NaN and fill with median
+    customer_metrics = customer_metrics.replace([np.inf, -np.inf], np.nan)
+    numeric_columns = customer_metrics.select_dtypes(include=[np.number]).columns
+    fill_values = fill_values or {}
+    for col in numeric_columns:
+        customer_metrics[col] = customer_metrics[col].fillna(fill_values.get(col, customer_metrics[col].median()))
+
+    return customer_metrics
@@ -0,0 +1,63 @@
+import hashlib
+import json
+import threading
+import plotly.graph_objects as go
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+
+def filter_hash(*filters) -> str:
+    """
+    Short stable digest of the active filter values, for use in figure cache keys
+    """
+    return hashlib.sha1(repr(filters).encode()).hexdigest()[:16]
+
+class FigureCache:
+    """
+    Size-bounded LRU store of serialized Plotly figures.
+
+    Keys are tuples such as (page, chart, dataset version, filter hash, template); values
+    are the figure JSON. On a hit the figure is rebuilt from JSON without re-validation
+    (it was produced by Plotly, so it is already valid), which costs a fraction of
+    building it through plotly.express. Thread-safe, so one instance can serve every
+    Streamlit session of the process.
+    """
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[str]:
+        with self._lock:
+            payload = self.entries.get(key)
+            if payload is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def put(self, key: Hashable, payload: str) -> None:
+        with self._lock:
+            if key in self.entries:
+                self.size -= len(self.entries.pop(key))
+            if len(payload) > self.max_bytes:
+                return
+            self.entries[key] = payload
+            self.size += len(payload)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def figure(self, key: Hashable, build: Callable[[], go.Figure]) -> go.Figure:
+        """
+        The cached figure for `key`, calling `build` and storing its JSON on a miss
+        """
+        payload = self.get(key)
+        if payload is not None:
+            return go.Figure(json.loads(payload), _validate=False)
+        fig = build()
+        self.put(key, fig.to_json())
+        return fig
@@ -0,0 +1,121 @@
+import pandas as pd
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+from schema import purchase_days, purchase_dates, day_number
+
+FILTER_COLUMNS = ('Category', 'Payment_Method')
+
+def row_bitmap(mask: np.ndarray) -> np.ndarray:
+    """
+    Pack a boolean row mask into uint64 words; row i is bit i % 64 of word i // 64
+    """
+    n_words = max((len(mask) + 63) // 64, 1)
+    packed = np.zeros(n_words * 8, dtype=np.uint8)
+    row_bytes = np.packbits(mask, bitorder='little')
+    packed[:len(row_bytes)] = row_bytes
+    return packed.view(np.uint64)
+
+class FilterIndex:
+    """
+    Row lookup for the dashboard filter bar.
+
+    Rows are kept in purchase-date order, so a date range is two binary searches into
+    the sorted days. Every Category and Payment_Method value has a row bitmap; a set of
+    selected values is the OR of their bitmaps, and filters on different columns are
+    ANDed. A filter combination therefore resolves to row positions without evaluating
+    a boolean mask over the frame.
+    """
+    def __init__(self, n_rows: int, day_order: np.ndarray, sorted_days: np.ndarray,
+                 bitmaps: Dict[str, Dict[str, np.ndarray]], cache_size: int = 32):
+        self.n_rows = n_rows
+        self.n_words = max((n_rows + 63) // 64, 1)
+        self.day_order = day_order          # row positions sorted by purchase day
+        self.sorted_days = sorted_days      # day numbers in that order
+        self.bitmaps = bitmaps              # column -> value -> uint64 row bitmap
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, columns: Iterable[str] = FILTER_COLUMNS) -> 'FilterIndex':
+        days = purchase_days(df['Purchase_Date']).to_numpy()
+        day_order = np.argsort(days, kind='stable')
+
+        bitmaps = {}
+        for column in columns:
+            values = df[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+            else:
+                codes, uniques = pd.factorize(values, sort=True)
+            present = np.bincount(codes[codes >= 0], minlength=len(uniques)) > 0
+            bitmaps[column] = {str(value): row_bitmap(codes == code)
+                               for code, value in enumerate(uniques) if present[code]}
+        return cls(len(df), day_order, days[day_order], bitmaps)
+
+    def values(self, column: str) -> List[str]:
+        """
+        Filterable values of a column, for populating the filter widgets
+        """
+        return list(self.bitmaps[column])
+
+    def date_bounds(self):
+        """
+        First and last purchase date covered by the index
+        """
+        if self.n_rows == 0:
+            return None, None
+        first, last = purchase_dates(pd.Series(self.sorted_days[[0, -1]])).dt.date
+        return first, last
+
+    def _selection(self, filters: Dict[str, Optional[Iterable[str]]]) -> Optional[np.ndarray]:
+        selection = None
+        for column, values in filters.items():
+            if values is None:
+                continue
+            words = np.zeros(self.n_words, dtype=np.uint64)
+            for value in values:
+                if value in self.bitmaps[column]:
+                    words |= self.bitmaps[column][value]
+            selection = words if selection is None else selection & words
+        return selection
+
+    def select(self, since=None, until=None, categories: Optional[Iterable[str]] = None,
+               payment_methods: Optional[Iterable[str]] = None) -> np.ndarray:
+        """
+        Sorted positions of the rows matching every given filter (None means unfiltered)
+        """
+        key = (since, until,
+               None if categories is None else tuple(sorted(categories)),
+               None if payment_methods is None else tuple(sorted(payment_methods)))
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        selection = self._selection({'Category': key[2], 'Payment_Method': key[3]})
+        if since is None and until is None:
+            if selection is None:
+                rows = np.arange(self.n_rows)
+            else:
+                bits = np.unpackbits(selection.view(np.uint8), bitorder='little')[:self.n_rows]
+                rows = np.flatnonzero(bits)
+        else:
+            lo = 0 if since is None else np.searchsorted(self.sorted_days, day_number(since), side='left')
+            hi = self.n_rows if until is None else np.searchsorted(self.sorted_days, day_number(until), side='right')
+            rows = self.day_order[lo:hi]
+            if selection is not None:
+                rows = rows[(selection[rows >> 6] >> (rows & 63).astype(np.uint64)) & np.uint64(1) == 1]
+            rows = np.sort(rows)
+
+        self._cache[key] = rows
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return rows
+
+    def take(self, df: pd.DataFrame, since=None, until=None, categories: Optional[Iterable[str]] = None,
+             payment_methods: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """
+        The rows of `df` (the frame the index was built from) matching the filters
+        """
+        rows = self.select(since, until, categories, payment_methods)
+        return df if len(rows) == self.n_rows else df.iloc[rows]
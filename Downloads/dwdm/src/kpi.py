@@ -0,0 +1,141 @@
+import pandas as pd
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+from schema import purchase_days, purchase_dates, day_number
+from sketches import DistinctCounter, count_distinct_union
+
+DISTINCT_COLUMNS = ('User_ID', 'Product_ID')
+
+class OverviewCube:
+    """
+    Day x category summary behind the Overview pages: order counts and revenue per cell,
+    plus per-category distinct-count sketches for customers and products.
+
+    Building it is a single pass over the transactions (one bincount per measure on a
+    combined day/category code). After that every KPI query only touches the cube, so
+    its cost depends on days x categories, not on the number of transactions. Results
+    are memoized per filter in an LRU of `cache_size` entries; `version` identifies the
+    data the cube was built from.
+    """
+    def __init__(self, first_day: int, categories: pd.Index, orders: np.ndarray, revenue: np.ndarray,
+                 distinct: Optional[Dict[str, Dict[str, DistinctCounter]]] = None, version=None,
+                 cache_size: int = 32):
+        self.first_day = first_day
+        self.categories = categories
+        self.orders = orders            # (n_days, n_categories) int64
+        self.revenue = revenue          # (n_days, n_categories) float64
+        self.distinct = distinct or {}
+        self.version = version
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, version=None,
+              distinct_columns: Iterable[str] = DISTINCT_COLUMNS) -> 'OverviewCube':
+        days = purchase_days(df['Purchase_Date']).to_numpy()
+        if isinstance(df['Category'].dtype, pd.CategoricalDtype):
+            category_codes, categories = df['Category'].cat.codes.to_numpy(), df['Category'].cat.categories
+        else:
+            category_codes, categories = pd.factorize(df['Category'], sort=True)
+        # Rows without a category (code -1) would land in the previous category's cell
+        valid = category_codes >= 0
+        if not valid.all():
+            df, days, category_codes = df[valid], days[valid], category_codes[valid]
+        first_day = int(days.min()) if len(days) else 0
+        n_days = int(days.max()) - first_day + 1 if len(days) else 0
+        shape = (n_days, len(categories))
+
+        cell = (days - first_day).astype(np.int64) * len(categories) + category_codes
+        orders = np.bincount(cell, minlength=n_days * len(categories)).reshape(shape)
+        revenue = np.bincount(cell, weights=df['Final_Price(Rs.)'].to_numpy(dtype=np.float64),
+                              minlength=n_days * len(categories)).reshape(shape)
+
+        distinct = {}
+        for column in distinct_columns:
+            if column not in df.columns:
+                continue
+            distinct[column] = {}
+            for code, group in df[['Purchase_Date', column]].groupby(category_codes):
+                distinct[column][str(categories[code])] = DistinctCounter.build(group, column)
+        return cls(first_day, pd.Index(categories.astype(str)), orders, revenue, distinct, version)
+
+    @classmethod
+    def from_category_days(cls, totals: pd.DataFrame,
+                           distinct: Optional[Dict[str, Dict[str, DistinctCounter]]] = None,
+                           version=None) -> 'OverviewCube':
+        """
+        Build from pre-aggregated (Category, Purchase_Date, count, revenue) rows, e.g.
+        streaming.CategoryDayAggregate.finalize(), without touching the transactions
+        """
+        days = purchase_days(totals['Purchase_Date']).to_numpy()
+        day_codes = days - days.min()
+        codes, categories = pd.factorize(totals['Category'].astype(str), sort=True)
+        shape = (int(day_codes.max()) + 1, len(categories))
+        orders = np.zeros(shape, dtype=np.int64)
+        revenue = np.zeros(shape, dtype=np.float64)
+        np.add.at(orders, (day_codes, codes), totals['count'].to_numpy(dtype=np.int64))
+        np.add.at(revenue, (day_codes, codes), totals['revenue'].to_numpy(dtype=np.float64))
+        return cls(int(days.min()), pd.Index(categories), orders, revenue, distinct, version)
+
+    def _day_range(self, since=None, until=None) -> Tuple[int, int]:
+        n_days = len(self.orders)
+        lo = 0 if since is None else day_number(since) - self.first_day
+        hi = n_days if until is None else day_number(until) - self.first_day + 1
+        return max(lo, 0), min(hi, n_days)
+
+    def _distinct(self, column: str, categories, since, until) -> Optional[int]:
+        """
+        Distinct `column` values over the selection; None when the column was not tracked
+        """
+        counters = self.distinct.get(column)
+        if counters is None:
+            return None
+        selected = [counters[c] for c in categories if c in counters]
+        return count_distinct_union(selected, since, until) if selected else 0
+
+    def kpis(self, since=None, until=None, categories: Optional[Iterable[str]] = None) -> Dict:
+        """
+        Overview KPIs, daily series and category distribution for an optional date window
+        and category subset
+        """
+        key = (since, until, None if categories is None else tuple(sorted(categories)))
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        lo, hi = self._day_range(since, until)
+        selected = self.categories if categories is None else self.categories.intersection(list(categories))
+        columns = self.categories.get_indexer(selected)
+        orders = self.orders[lo:hi][:, columns]
+        revenue = self.revenue[lo:hi][:, columns]
+
+        total_orders = int(orders.sum())
+        total_revenue = float(revenue.sum())
+        daily_orders, daily_revenue = orders.sum(axis=1), revenue.sum(axis=1)
+        active = daily_orders > 0
+        dates = purchase_dates(pd.Series(np.arange(lo, hi)[active] + self.first_day))
+        category_orders = pd.Series(orders.sum(axis=0), index=selected, name='count')
+        category_orders = category_orders[category_orders > 0].sort_values(ascending=False, kind='stable')
+
+        result = {
+            'total_customers': self._distinct('User_ID', selected, since, until),
+            'total_products': self._distinct('Product_ID', selected, since, until),
+            'total_orders': total_orders,
+            'total_revenue': total_revenue,
+            'avg_order_value': total_revenue / total_orders if total_orders else 0.0,
+            'daily': pd.DataFrame({'Purchase_Date': dates.to_numpy(), 'orders': daily_orders[active],
+                                   'revenue': daily_revenue[active]}),
+            'categories': category_orders
+        }
+        self._cache[key] = result
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return result
+
+def overview_kpis(source, since=None, until=None, categories: Optional[Iterable[str]] = None) -> Dict:
+    """
+    Overview KPIs from either a transaction frame or a prebuilt OverviewCube
+    """
+    cube = source if isinstance(source, OverviewCube) else OverviewCube.build(source)
+    return cube.kpis(since, until, categories)
@@ -0,0 +1,94 @@
+import argparse
+import json
+import random
+import threading
+import time
+import numpy as np
+from typing import Dict, List
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+from serving import ARTIFACTS_DIR, RecommendationService
+
+def _request_paths(service: RecommendationService, n: int, hot_fraction: float, seed: int) -> List[str]:
+    """
+    A mix of product bundle, segment and top-bundle lookups where `hot_fraction` of the requests
+    go to a small set of popular keys (so the cache hit rate is realistic)
+    """
+    rng = random.Random(seed)
+    products = [str(p) for p in service.index.items]
+    users = list(service.user_segments)
+    hot_products, hot_users = products[:20], users[:20]
+    paths = []
+    for _ in range(n):
+        hot = rng.random() < hot_fraction
+        kind = rng.random()
+        if kind < 0.5:
+            product = rng.choice(hot_products if hot else products)
+            paths.append("/bundles/product?" + urlencode({'product': product, 'k': 5}))
+        elif kind < 0.9:
+            user = rng.choice(hot_users if hot else users)
+            paths.append("/segment?" + urlencode({'user': user}))
+        else:
+            paths.append("/bundles/top?k=10")
+    return paths
+
+def run_load_test(base_url: str, paths: List[str], concurrency: int, duration: float,
+                  timeout: float = 10.0) -> Dict:
+    """
+    Hit the service from `concurrency` threads for `duration` seconds and report client-side
+    throughput and latency. Error responses, refused or reset connections and requests that
+    take longer than `timeout` seconds count as errors.
+    """
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(offset: int):
+        local, failed, i = [], 0, offset
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                with urlopen(base_url + paths[i % len(paths)], timeout=timeout) as response:
+                    response.read()
+            except (HTTPError, URLError, OSError):
+                failed += 1
+            local.append(time.perf_counter() - start)
+            i += concurrency
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'throughput_rps': len(latencies) / elapsed,
+        'p50_ms': float(np.percentile(latencies_ms, 50)),
+        'p99_ms': float(np.percentile(latencies_ms, 99))
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test for serving.py")
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--artifacts', default=ARTIFACTS_DIR, help="Artifacts the service was started with")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds to run")
+    parser.add_argument('--hot-fraction', type=float, default=0.8)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--timeout', type=float, default=10.0, help="Seconds before a request counts as failed")
+    args = parser.parse_args()
+
+    paths = _request_paths(RecommendationService(args.artifacts), 10_000, args.hot_fraction, args.seed)
+    result = run_load_test(args.url, paths, args.concurrency, args.duration, args.timeout)
+    print(json.dumps(result, indent=2))
+    with urlopen(Request(args.url + '/metrics')) as response:
+        print(json.dumps(json.loads(response.read()), indent=2))
@@ -1,18 +1,38 @@
+import argparse
+import os
 import pandas as pd
 import numpy as np
-from customer_segmentation import CustomerSegmentation
-from bundle_recommendation import BundleRecommendation
-from payment_analytics import PaymentAnalytics
+from features import build_customer_metrics
+from dataset import TransactionDataset
+from schema import purchase_dates
+from star_schema import StarSchema
+from sketches import DistinctCounter, QuantileSketch
+from streaming import stream_price_sketch
+from sessions import sessionize
+from typing import Optional
 
-def preprocess_transactions(df: pd.DataFrame) -> pd.DataFrame:
+PRICE_RANGE_LABELS = ['very_low', 'low', 'medium', 'high', 'very_high']
+
+def add_product_groups(df: pd.DataFrame, price_sketch: Optional[QuantileSketch] = None) -> pd.DataFrame:
     """
-    Preprocess transaction data to create meaningful baskets based on product relationships
+    Add the price_range and product_group (Category_priceRange) columns
     """
-    # Create price ranges
-    df['price_range'] = pd.qcut(df['Final_Price(Rs.)'], q=5, labels=['very_low', 'low', 'medium', 'high', 'very_high'])
+    # Create price ranges from quintile edges. Pass a persisted or streamed sketch to bin
+    # new data against the same edges; otherwise the edges come from this frame.
+    if price_sketch is None:
+        price_sketch = QuantileSketch().update(df['Final_Price(Rs.)'])
+    df['price_range'] = pd.cut(df['Final_Price(Rs.)'], bins=price_sketch.bin_edges(len(PRICE_RANGE_LABELS)),
+                               labels=PRICE_RANGE_LABELS)
     
     # Create product groups based on category and price range
-    df['product_group'] = df['Category'] + '_' + df['price_range'].astype(str)
+    df['product_group'] = df['Category'].astype(str) + '_' + df['price_range'].astype(str)
+    return df
+
+def preprocess_transactions(df: pd.DataFrame, price_sketch: Optional[QuantileSketch] = None) -> pd.DataFrame:
+    """
+    Preprocess transaction data to create meaningful baskets based on product relationships
+    """
+    df = add_product_groups(df, price_sketch)
     
     # Calculate category affinities based on price range overlap
     category_affinity = {}
@@ -106,62 +126,99 @@ def preprocess_transactions(df: pd.DataFrame) -> pd.DataFrame:
         print("\nWarning: Could not create meaningful product relationships")
         return df_sorted
 
-def load_real_data():
+def load_real_data(dataset: TransactionDataset = None, since=None, until=None,
+                   price_sketch: Optional[QuantileSketch] = None, baskets: str = 'auto', session_gap: int = 0,
+                   customer_metrics: bool = True):
     """
-    Load and prepare real e-commerce data for analysis
+    Load and prepare real e-commerce data for analysis.
+
+    With `customer_metrics=False` the per-customer features are not built (None is
+    returned in their place), e.g. when they come from the SQL warehouse instead.
+
+    `baskets` is 'sessions' (a user's purchases on the same day, or within `session_gap`
+    days), 'affinity' (baskets paired by category affinity and price similarity) or 'auto'
+    (sessions, falling back to affinity when no session has more than one purchase).
     """
-    # Read the dataset
-    df = pd.read_csv('/Users/saaralvarunie/Downloads/dwdm/ecommerce_dataset_preprocessed.csv')
+    # Read the dataset (only the partitions overlapping the window for partitioned data)
+    # in the compact dtype model: categorical IDs, float32 prices, int32 day numbers
+    dataset = dataset or TransactionDataset()
+    df = dataset.load(since=since, until=until, compact=True)
     
-    # Convert Purchase_Date to datetime
-    df['Purchase_Date'] = pd.to_datetime(df['Purchase_Date'], format='%d-%m-%Y')
+    # Star schema: int32 user/product surrogate keys plus dimension tables for display
+    star = StarSchema.from_transactions(df)
     
-    # Preprocess transactions to create baskets
-    processed_df = preprocess_transactions(df)
+    # Build baskets
+    processed_df = None
+    if baskets in ('auto', 'sessions'):
+        processed_df = sessionize(add_product_groups(df, price_sketch), session_gap)
+        if baskets == 'auto' and not (np.bincount(processed_df['basket_id']) > 1).any():
+            print("\nWarning: No multi-purchase sessions found; using affinity baskets instead")
+            processed_df = None
+    if processed_df is None:
+        processed_df = preprocess_transactions(df, price_sketch)
+    processed_df['product_key'] = star.products.encode(processed_df['Product_ID'])
     
-    # Calculate customer metrics
-    latest_date = df['Purchase_Date'].max()
-    customer_metrics = df.groupby('User_ID').agg({
-        'Final_Price(Rs.)': ['sum', 'count', 'mean'],
-        'Discount (%)': 'mean',
-        'Purchase_Date': [
-            lambda x: (latest_date - x.max()).days,  # Days since last purchase
-            lambda x: (x.max() - x.min()).days + 1   # Activity period in days
-        ]
-    }).reset_index()
+    # Calculate customer metrics on the integer user keys
+    customer_metrics = build_customer_metrics(star.fact) if customer_metrics else None
     
-    # Flatten column names
-    customer_metrics.columns = ['User_ID', 'total_spend', 'purchase_frequency', 'avg_transaction_value',
-                              'discount_usage', 'days_since_last_purchase', 'activity_period']
+    return customer_metrics, processed_df, star
+
+def main():
+    parser = argparse.ArgumentParser(description="E-commerce analytics report")
+    parser.add_argument('--data', default=None,
+                        help="CSV/Parquet file or directory of date partitions (defaults to DWDM_DATA_PATH)")
+    parser.add_argument('--since', default=None, help="Only analyze transactions on or after this date")
+    parser.add_argument('--until', default=None, help="Only analyze transactions on or before this date")
+    parser.add_argument('--price-sketch', default=None,
+                        help="JSON price quantile sketch; reused if it exists, otherwise built from the data and saved")
+    parser.add_argument('--sample-baskets', type=int, default=None,
+                        help="Mine bundles from a stratified sample of this many baskets (approximate, with CIs)")
+    parser.add_argument('--baskets', choices=['auto', 'sessions', 'affinity'], default='auto',
+                        help="Basket construction: real user sessions, category-affinity pairing, or sessions with fallback")
+    parser.add_argument('--session-gap', type=int, default=0,
+                        help="Days between a user's purchases that still count as one session")
+    parser.add_argument('--apriori', action='store_true',
+                        help="Mine bundles with flat product-level apriori instead of hierarchical mining")
+    parser.add_argument('--warehouse', nargs='?', const='', default=None,
+                        help="Compute customer features and payment statistics in the embedded SQL warehouse "
+                             "(database file, defaults to DWDM_WAREHOUSE_PATH; loaded when out of date)")
+    args = parser.parse_args()
+    dataset = TransactionDataset(args.data)
     
-    # Normalize frequency to monthly and handle edge cases
-    customer_metrics['monthly_frequency'] = customer_metrics['purchase_frequency'].copy()
-    mask = customer_metrics['activity_period'] > 0
-    customer_metrics.loc[mask, 'monthly_frequency'] = (
-        customer_metrics.loc[mask, 'purchase_frequency'] / 
-        customer_metrics.loc[mask, 'activity_period'] * 30
-    )
+    # Aggregations pushed down to the SQL warehouse, (re)loaded only when the data changed
+    warehouse = None
+    if args.warehouse is not None:
+        from warehouse import Warehouse
+        warehouse = Warehouse(args.warehouse or None)
+        warehouse.sync(dataset)
     
-    # Replace infinite values with NaN and fill with median
-    customer_metrics = customer_metrics.replace([np.inf, -np.inf], np.nan)
-    numeric_columns = customer_metrics.select_dtypes(include=[np.number]).columns
-    for col in numeric_columns:
-        customer_metrics[col] = customer_metrics[col].fillna(customer_metrics[col].median())
+    # Price-range edges from a persisted sketch keep the bins stable between runs
+    price_sketch = None
+    if args.price_sketch and os.path.exists(args.price_sketch):
+        price_sketch = QuantileSketch.load(args.price_sketch)
+    elif args.price_sketch:
+        price_sketch = stream_price_sketch(dataset.path)
+        price_sketch.save(args.price_sketch)
     
-    return customer_metrics, processed_df
-
-def main():
     # Load real e-commerce data
-    customer_metrics, transaction_data = load_real_data()
+    # With the warehouse, customer features are aggregated in SQL instead of in memory
+    customer_metrics, transaction_data, star = load_real_data(dataset, args.since, args.until, price_sketch,
+                                                              args.baskets, args.session_gap,
+                                                              customer_metrics=warehouse is None)
+    if warehouse is not None:
+        customer_metrics = warehouse.customer_metrics(args.since, args.until)
     
     # Print data summary
     print("\nData Summary:")
     print(f"Total Customers: {len(customer_metrics)}")
     print(f"Total Transactions: {len(transaction_data)}")
-    print(f"Unique Products: {transaction_data['Product_ID'].nunique()}")
-    print(f"Date Range: {transaction_data['Purchase_Date'].min().strftime('%Y-%m-%d')} to {transaction_data['Purchase_Date'].max().strftime('%Y-%m-%d')}")
+    print(f"Unique Products: {DistinctCounter.build(transaction_data, 'Product_ID').count()}")
+    purchase_date_range = purchase_dates(transaction_data['Purchase_Date'])
+    print(f"Date Range: {purchase_date_range.min().strftime('%Y-%m-%d')} to {purchase_date_range.max().strftime('%Y-%m-%d')}")
 
     # 1. Customer Segmentation
+    # Analytics modules are imported per stage so `import main` (serving, benchmarks) stays cheap
+    from customer_segmentation import CustomerSegmentation
     segmentation = CustomerSegmentation()
     segment_results = segmentation.segment_customers(customer_metrics)
 
@@ -199,7 +256,7 @@ def main():
     
     # Prepare basket data for bundle analysis
     if 'basket_id' in transaction_data.columns:
-        basket_data = transaction_data[['basket_id', 'Product_ID', 'Category', 'product_group']].copy()
+        basket_data = transaction_data[['basket_id', 'product_key', 'Category', 'product_group']].copy()
         
         # Count baskets and average size
         unique_baskets = basket_data['basket_id'].nunique()
@@ -208,9 +265,17 @@ def main():
         print(f"Total Baskets: {unique_baskets}")
         print(f"Average Basket Size: {avg_basket_size:.2f} items")
         
+        from bundle_recommendation import BundleRecommendation
         bundler = BundleRecommendation()
-        transaction_matrix = bundler.prepare_transaction_data(basket_data)
-        bundles = bundler.generate_bundle_recommendations(transaction_matrix)
+        bundler.product_dim = star.products
+        if args.sample_baskets:
+            bundles = bundler.generate_sampled_bundle_recommendations(
+                basket_data, sample_size=args.sample_baskets, verify_top_k=5)
+        elif args.apriori:
+            bundles = bundler.generate_bundle_recommendations(bundler.prepare_transaction_data(basket_data))
+        else:
+            # Category -> product_group -> product, drilling down only into frequent groups
+            bundles = bundler.generate_hierarchical_bundle_recommendations(basket_data)
         
         print("\nTop Product Bundle Recommendations:")
         print("==================================")
@@ -226,6 +291,9 @@ def main():
                 print(f"Confidence: {bundle['confidence']*100:.1f}%")
                 print(f"Purchase Lift: {bundle['lift']:.2f}x")
                 print(f"Support: {bundle['support']*100:.1f}% of transactions")
+                if 'support_ci' in bundle and not bundle['verified']:
+                    low, high = bundle['support_ci']
+                    print(f"Support 95% CI: {low*100:.1f}% - {high*100:.1f}% (sample of {bundle['sample_size']} baskets)")
                 print(f"Recommended Discount: {recommendations['discount_percentage']:.1f}%")
                 print(f"Bundle Strength: {recommendations['strength_score']:.2f}")
                 print(f"Priority: {recommendations['priority']}")
@@ -235,9 +303,13 @@ def main():
         print("\nNo basket data available for bundle analysis")
     
     # 3. Payment Analytics
-    original_df = pd.read_csv('/Users/saaralvarunie/Downloads/dwdm/ecommerce_dataset_preprocessed.csv')
+    from payment_analytics import PaymentAnalytics
     payment_analyzer = PaymentAnalytics()
-    payment_insights = payment_analyzer.analyze_payment_preferences(original_df)
+    if warehouse is not None:
+        payment_insights = payment_analyzer.analyze_payment_warehouse(warehouse, args.since, args.until)
+    else:
+        original_df = dataset.load(since=args.since, until=args.until, compact=True)
+        payment_insights = payment_analyzer.analyze_payment_preferences(original_df)
     incentives = payment_analyzer.recommend_payment_incentives(payment_insights)
     
     print("\nPayment Method Analysis:")
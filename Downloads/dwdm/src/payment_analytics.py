@@ -1,68 +1,221 @@
 import pandas as pd
 import numpy as np
-from typing import Dict
+from typing import Dict, List
 from datetime import datetime
+from streaming import PaymentAggregate, stream_payment_aggregate, DEFAULT_CHUNKSIZE
+from schema import purchase_days, purchase_dates
+from progressive import stratified_sample, mean_ci, proportion_ci, DEFAULT_SAMPLE_ROWS
+
+class PaymentWindow:
+    """
+    Sliding window of the last `window_days` days of per-method transaction counts and sums.
+
+    Each day occupies one slot of a ring buffer, so advancing the window adds the new day
+    and evicts the oldest one in O(number of methods), independent of history length.
+    """
+    def __init__(self, methods: List[str], window_days: int = 7):
+        self.methods = list(methods)
+        self.window_days = window_days
+        self.counts = np.zeros((window_days, len(self.methods)), dtype=np.int64)
+        self.sums = np.zeros((window_days, len(self.methods)))
+        self.total_counts = np.zeros(len(self.methods), dtype=np.int64)
+        self.total_sums = np.zeros(len(self.methods))
+        self.last_day = None
+
+    def _advance(self, day: int) -> None:
+        """
+        Move the window end to `day`, evicting every slot that falls out of the window
+        """
+        if self.last_day is None:
+            self.last_day = day
+            return
+        for _ in range(min(day - self.last_day, self.window_days)):
+            self.last_day += 1
+            slot = self.last_day % self.window_days
+            self.total_counts -= self.counts[slot]
+            self.total_sums -= self.sums[slot]
+            self.counts[slot] = 0
+            self.sums[slot] = 0
+        self.last_day = max(self.last_day, day)
+
+    def push_day(self, day: int, counts: np.ndarray, sums: np.ndarray) -> bool:
+        """
+        Add one day's per-method counts and value sums (day is an int day number).
+
+        A late day still inside the window goes to its own slot; a day that already fell
+        out of the window is dropped, since its slot now holds a newer day. Returns whether
+        the day was added.
+        """
+        if self.last_day is not None and day <= self.last_day - self.window_days:
+            return False
+        self._advance(day)
+        slot = day % self.window_days
+        self.counts[slot] += counts
+        self.sums[slot] += sums
+        self.total_counts += counts
+        self.total_sums += sums
+        return True
+
+    def method_stats(self) -> Dict:
+        grand_total = self.total_counts.sum()
+        stats = {}
+        for i, method in enumerate(self.methods):
+            count = int(self.total_counts[i])
+            stats[method] = {
+                'share': count / grand_total if grand_total else 0.0,
+                'avg_value': self.total_sums[i] / count if count else 0.0,
+                'total_volume': self.total_sums[i],
+                'total_transactions': count
+            }
+        return stats
 
 class PaymentAnalytics:
     def analyze_payment_preferences(self, df):
         """
         Analyze payment method preferences and patterns
         """
-        # Distribution of payment methods and key metrics
+        # PaymentAggregate accepts raw, datetime or compact (int32 day) dates directly
+        return self.analyze_payment_aggregate(PaymentAggregate().update(df))
+    
+    def estimate_payment_preferences(self, df: pd.DataFrame, sample_size: int = DEFAULT_SAMPLE_ROWS,
+                                     z: float = 1.96, seed: int = 42) -> Dict:
+        """
+        analyze_payment_preferences on a row sample, for a quick first answer on large data.
+
+        The sample is post-stratified by payment method: transaction counts and shares are
+        exact, while average value, volume and value brackets are estimated from the sampled
+        rows of each method and carry `avg_value_ci`, `total_volume_ci` and
+        `value_distribution_ci` (95% by default, finite population corrected).
+        """
+        sample, population = stratified_sample(df, 'Payment_Method', sample_size, seed)
+        insights = self.analyze_payment_aggregate(PaymentAggregate().update(sample))
+        values = sample['Final_Price(Rs.)'].astype(np.float64)
+        spread = values.groupby(sample['Payment_Method'], observed=True).std()
+        grand_total = population.sum()
+
+        for method, stats in insights['method_stats'].items():
+            n, total = stats['total_transactions'], int(population[method])
+            scale = total / n
+            stats['share'] = total / grand_total
+            stats['total_transactions'] = total
+            stats['total_volume'] = stats['avg_value'] * total
+            for pattern in stats['time_patterns'].values():
+                pattern['count'] = {key: int(round(count * scale)) for key, count in pattern['count'].items()}
+
+            low, high = mean_ci(stats['avg_value'], spread[method], n, total, z)
+            stats['avg_value_ci'] = (low, high)
+            stats['total_volume_ci'] = (low * total, high * total)
+            stats['value_distribution_ci'] = {
+                bracket: proportion_ci(p, n, total, z) for bracket, p in stats['value_distribution'].items()
+            }
+            stats['sample_size'] = n
+        return insights
+    
+    def analyze_payment_file(self, path: str, chunksize: int = DEFAULT_CHUNKSIZE) -> Dict:
+        """
+        Analyze payment preferences by streaming a CSV/Parquet file in chunks
+        """
+        return self.analyze_payment_aggregate(stream_payment_aggregate(path, chunksize))
+    
+    def analyze_payment_warehouse(self, warehouse, since=None, until=None) -> Dict:
+        """
+        Analyze payment preferences with the group-bys pushed down to a warehouse.Warehouse
+        """
+        return self.analyze_payment_aggregate(warehouse.payment_aggregate(since, until))
+    
+    def analyze_payment_aggregate(self, aggregate: PaymentAggregate) -> Dict:
+        """
+        Build payment method statistics from (possibly merged) partial aggregates
+        """
         method_stats = {}
+        totals = aggregate.method_totals
+        grand_total = totals['count'].sum()
         
-        for method in df['Payment_Method'].unique():
-            method_data = df[df['Payment_Method'] == method]
-            total_transactions = len(method_data)
+        for method, row in totals.iterrows():
+            total_transactions = int(row['count'])
             
             # Calculate metrics
             stats = {
-                'share': total_transactions / len(df),
-                'avg_value': method_data['Final_Price(Rs.)'].mean(),
-                'total_volume': method_data['Final_Price(Rs.)'].sum(),
+                'share': total_transactions / grand_total,
+                'avg_value': row['total'] / total_transactions,
+                'total_volume': row['total'],
                 'total_transactions': total_transactions
             }
             
             # Transaction value distribution
-            values = method_data['Final_Price(Rs.)']
-            value_dist = {
-                'low': len(values[values < 0.3]) / len(values),
-                'medium': len(values[(values >= 0.3) & (values <= 0.6)]) / len(values),
-                'high': len(values[values > 0.6]) / len(values)
+            stats['value_distribution'] = {
+                'low': row['low'] / total_transactions,
+                'medium': row['medium'] / total_transactions,
+                'high': row['high'] / total_transactions
             }
-            stats['value_distribution'] = value_dist
             
             # Time-based patterns
-            stats['time_patterns'] = self._analyze_time_patterns(method_data)
+            stats['time_patterns'] = {
+                pattern: aggregate.time_pattern(method, pattern)
+                for pattern in aggregate.TIME_PATTERNS
+            }
             
             method_stats[method] = stats
         
         return {'method_stats': method_stats}
     
-    def _analyze_time_patterns(self, transactions: pd.DataFrame) -> Dict:
+    def daily_method_totals(self, df: pd.DataFrame):
         """
-        Analyze payment method usage patterns over time
+        Per-day, per-method transaction counts and value sums as dense arrays.
+
+        Returns (day numbers, methods, counts[day, method], sums[day, method]) covering every
+        calendar day between the first and last purchase. Rows without a payment method are
+        left out.
         """
-        # Convert to datetime if needed
-        if not pd.api.types.is_datetime64_any_dtype(transactions['Purchase_Date']):
-            transactions = transactions.copy()
-            transactions['Purchase_Date'] = pd.to_datetime(transactions['Purchase_Date'], format='%d-%m-%Y')
-        else:
-            transactions = transactions.copy()
-        
-        # Extract time components
-        transactions['hour'] = transactions['Purchase_Date'].dt.hour
-        transactions['day_of_week'] = transactions['Purchase_Date'].dt.day_name()
-        transactions['month'] = transactions['Purchase_Date'].dt.month
-        
-        # Analyze patterns
-        patterns = {
-            'hourly': transactions.groupby('hour')['Final_Price(Rs.)'].agg(['count', 'mean']).to_dict(),
-            'daily': transactions.groupby('day_of_week')['Final_Price(Rs.)'].agg(['count', 'mean']).to_dict(),
-            'monthly': transactions.groupby('month')['Final_Price(Rs.)'].agg(['count', 'mean']).to_dict()
-        }
-        
-        return patterns
+        method_codes, methods = pd.factorize(df['Payment_Method'], sort=True)
+        valid = method_codes >= 0
+        if not valid.any():
+            return (np.zeros(0, dtype=np.int32), list(methods),
+                    np.zeros((0, len(methods)), dtype=np.int64), np.zeros((0, len(methods))))
+        days = purchase_days(df['Purchase_Date']).to_numpy()[valid]
+        method_codes = method_codes[valid]
+        first_day = days.min()
+        n_days = days.max() - first_day + 1
+        flat = (days - first_day) * len(methods) + method_codes
+        size = n_days * len(methods)
+        counts = np.bincount(flat, minlength=size).reshape(n_days, len(methods))
+        sums = np.bincount(flat, weights=df['Final_Price(Rs.)'].to_numpy(dtype=np.float64)[valid],
+                           minlength=size).reshape(n_days, len(methods))
+        return np.arange(first_day, first_day + n_days), list(methods), counts, sums
+    
+    def analyze_payment_window(self, df: pd.DataFrame, window_days: int = 7) -> Dict:
+        """
+        Method share and average value over the most recent `window_days` days
+        """
+        days, methods, counts, sums = self.daily_method_totals(df)
+        window = PaymentWindow(methods, window_days)
+        for i in range(max(0, len(days) - window_days), len(days)):
+            window.push_day(days[i], counts[i], sums[i])
+        return {'method_stats': window.method_stats(), 'window_days': window_days,
+                'window_end': purchase_dates(pd.Series([days[-1]])).iloc[0] if len(days) else None}
+    
+    def rolling_payment_stats(self, df: pd.DataFrame, window_days: int = 7) -> pd.DataFrame:
+        """
+        Slide a `window_days` window over the history one day at a time and record each
+        method's share and average value at every step
+        """
+        days, methods, counts, sums = self.daily_method_totals(df)
+        window = PaymentWindow(methods, window_days)
+        records = []
+        for i, day in enumerate(days):
+            window.push_day(day, counts[i], sums[i])
+            grand_total = window.total_counts.sum()
+            for j, method in enumerate(methods):
+                count = window.total_counts[j]
+                records.append({
+                    'day': day,
+                    'Payment_Method': method,
+                    'share': count / grand_total if grand_total else 0.0,
+                    'avg_value': window.total_sums[j] / count if count else 0.0
+                })
+        rolling = pd.DataFrame(records, columns=['day', 'Payment_Method', 'share', 'avg_value'])
+        rolling['date'] = purchase_dates(rolling.pop('day'))
+        return rolling
     
     def recommend_payment_incentives(self, payment_insights):
         """
@@ -0,0 +1,113 @@
+import threading
+import pandas as pd
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Hashable, Optional, Tuple
+
+# Filtered row count from which the dashboard shows a sample estimate while the exact
+# result is computed in the background; smaller selections are computed directly
+PROGRESSIVE_MIN_ROWS = 500_000
+
+# Sample sizes behind the estimates. Besides one bincount for the exact stratum counts, an
+# estimate only touches its sample, so it renders within roughly the same latency budget
+# whatever the number of transactions.
+DEFAULT_SAMPLE_ROWS = 200_000
+DEFAULT_SAMPLE_CUSTOMERS = 20_000
+
+def _codes(values: pd.Series) -> Tuple[np.ndarray, pd.Index]:
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(), values.cat.categories
+    return pd.factorize(values, sort=True)
+
+def _fpc(n: int, population: Optional[int]) -> float:
+    """
+    Finite population correction (zero once the whole population is sampled)
+    """
+    if population is None:
+        return 1.0
+    return float(np.sqrt(max(population - n, 0) / (population - 1))) if population > 1 else 0.0
+
+def mean_ci(mean: float, std: float, n: int, population: Optional[int] = None,
+            z: float = 1.96) -> Tuple[float, float]:
+    """
+    Normal confidence interval for a sample mean of `n` values out of `population`
+    """
+    if n < 2 or not np.isfinite(std):
+        return mean, mean
+    half = z * std / np.sqrt(n) * _fpc(n, population)
+    return mean - half, mean + half
+
+def proportion_ci(p: float, n: int, population: Optional[int] = None,
+                  z: float = 1.96) -> Tuple[float, float]:
+    """
+    Normal confidence interval for a proportion observed on `n` sampled units, clipped to [0, 1]
+    """
+    if n < 1:
+        return 0.0, 1.0
+    half = z * np.sqrt(p * (1 - p) / n) * _fpc(n, population)
+    return max(p - half, 0.0), min(p + half, 1.0)
+
+def stratified_sample(df: pd.DataFrame, column: str, size: int = DEFAULT_SAMPLE_ROWS,
+                      seed: int = 42) -> Tuple[pd.DataFrame, pd.Series]:
+    """
+    Uniform sample of `size` rows, post-stratified on `column`.
+
+    Returns the sampled rows (in their original order) and the exact number of rows per
+    value of `column` in `df`, so stratum shares and totals are exact and only the
+    within-stratum statistics are estimated.
+    """
+    codes, strata = _codes(df[column])
+    valid = codes >= 0
+    population = pd.Series(np.bincount(codes[valid], minlength=len(strata)), index=strata)
+    population = population[population > 0]
+    if size >= len(df):
+        return df, population
+    rng = np.random.default_rng(seed)
+    rows = np.sort(rng.choice(len(df), size=size, replace=False))
+    return df.iloc[rows], population
+
+def customer_sample(df: pd.DataFrame, column: str = 'User_ID', size: int = DEFAULT_SAMPLE_CUSTOMERS,
+                    seed: int = 42) -> Tuple[pd.DataFrame, int]:
+    """
+    Every transaction of a random subset of about `size` customers, and the number of
+    distinct customers in `df`. Sampling whole customers keeps per-customer features
+    (spend, frequency, recency) exact for the customers in the sample.
+    """
+    codes, customers = _codes(df[column])
+    present = np.bincount(codes[codes >= 0], minlength=len(customers)) > 0
+    n_customers = int(present.sum())
+    if size >= n_customers:
+        return df, n_customers
+    rng = np.random.default_rng(seed)
+    chosen = np.zeros(len(customers) + 1, dtype=bool)
+    chosen[rng.choice(np.flatnonzero(present), size=size, replace=False)] = True
+    # Missing customer ids (code -1) map to the trailing False slot
+    return df[chosen[codes]], n_customers
+
+class BackgroundResults:
+    """
+    Exact results computed on worker threads while the page shows an estimate.
+
+    Tasks are keyed like figure cache entries, e.g. (page, dataset version, filter hash),
+    and submitting a key that is already running or finished returns the same future.
+    The most recent `max_entries` results are kept. Thread-safe, so one instance can serve
+    every Streamlit session of the process; submitted functions must not call Streamlit.
+    """
+    def __init__(self, max_workers: int = 2, max_entries: int = 16):
+        self.max_entries = max_entries
+        self.futures = OrderedDict()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='progressive')
+        self._lock = threading.Lock()
+
+    def submit(self, key: Hashable, fn: Callable, *args) -> Future:
+        with self._lock:
+            future = self.futures.get(key)
+            # A failed task is retried on the next request instead of caching the error
+            if future is None or (future.done() and future.exception() is not None):
+                future = self._executor.submit(fn, *args)
+                self.futures[key] = future
+            self.futures.move_to_end(key)
+            while len(self.futures) > self.max_entries:
+                self.futures.popitem(last=False)
+            return future
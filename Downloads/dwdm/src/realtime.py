@@ -0,0 +1,229 @@
+import argparse
+import asyncio
+import csv
+import json
+import os
+import time
+import pandas as pd
+import numpy as np
+from datetime import datetime
+from typing import Dict, List, Optional
+from streaming import CustomerAggregate, PaymentAggregate
+from payment_analytics import PaymentAnalytics
+
+# Where the consumer publishes its snapshots and where the dashboard looks for them
+LIVE_DIR = os.environ.get(
+    'DWDM_LIVE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'live')
+)
+SNAPSHOT_FILE = 'snapshot.json'
+CUSTOMER_FEATURES_FILE = 'customer_features.parquet'
+
+TRANSACTION_COLUMNS = ['User_ID', 'Product_ID', 'Category', 'Price (Rs.)', 'Discount (%)',
+                       'Final_Price(Rs.)', 'Payment_Method', 'Purchase_Date']
+NUMERIC_COLUMNS = ['Price (Rs.)', 'Discount (%)', 'Final_Price(Rs.)']
+
+def _json_default(value):
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    if isinstance(value, (pd.Timestamp, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+def _write_atomic(path: str, write) -> None:
+    """
+    Write to a temporary file and rename it, so readers never see a partial snapshot
+    """
+    tmp_path = f"{path}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+def events_to_frame(events: List[Dict]) -> pd.DataFrame:
+    """
+    Turn a micro-batch of event dicts into a transaction frame with parsed types
+    """
+    batch = pd.DataFrame.from_records(events, columns=TRANSACTION_COLUMNS)
+    for col in NUMERIC_COLUMNS:
+        batch[col] = pd.to_numeric(batch[col], errors='coerce')
+    batch['Purchase_Date'] = pd.to_datetime(batch['Purchase_Date'], format='%d-%m-%Y', errors='coerce')
+    return batch.dropna(subset=['Final_Price(Rs.)', 'Purchase_Date'])
+
+def parse_event(line) -> Optional[Dict]:
+    """
+    Decode one JSON-lines event, or None when the line is not a JSON object
+    """
+    try:
+        event = json.loads(line)
+    except json.JSONDecodeError:
+        return None
+    return event if isinstance(event, dict) else None
+
+def read_snapshot(live_dir: str = LIVE_DIR) -> Optional[Dict]:
+    """
+    Load the latest published snapshot, or None when no consumer has run yet
+    """
+    path = os.path.join(live_dir, SNAPSHOT_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+class LiveAggregates:
+    """
+    Incremental aggregates behind PaymentAnalytics and the customer segmentation features
+    """
+    def __init__(self):
+        self.payments = PaymentAggregate()
+        self.customers = CustomerAggregate()
+        self.events_processed = 0
+        self.batches_processed = 0
+        self.last_event_time = None
+
+    def apply(self, batch: pd.DataFrame) -> None:
+        if batch.empty:
+            return
+        self.payments.update(batch)
+        self.customers.update(batch)
+        self.events_processed += len(batch)
+        self.batches_processed += 1
+        self.last_event_time = batch['Purchase_Date'].max()
+
+    def snapshot(self) -> Dict:
+        insights = PaymentAnalytics().analyze_payment_aggregate(self.payments) if self.events_processed else {'method_stats': {}}
+        return {
+            'updated_at': datetime.now().isoformat(timespec='seconds'),
+            'events_processed': self.events_processed,
+            'batches_processed': self.batches_processed,
+            'customers': len(self.customers.users),
+            'last_event_date': self.last_event_time,
+            'payment_insights': insights
+        }
+
+class TransactionEventConsumer:
+    """
+    Consume transaction events, micro-batch them and fold each batch into LiveAggregates.
+
+    A batch is flushed when it reaches `max_batch` events or when its oldest event has
+    waited `max_latency` seconds, which bounds how stale the published numbers can be.
+    """
+    def __init__(self, aggregates: Optional[LiveAggregates] = None, max_batch: int = 5000,
+                 max_latency: float = 1.0, live_dir: str = LIVE_DIR, customer_snapshot_interval: float = 30.0):
+        self.aggregates = aggregates or LiveAggregates()
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self.live_dir = live_dir
+        self.customer_snapshot_interval = customer_snapshot_interval
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self._last_customer_snapshot = 0.0
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        # One JSON object per line
+        while line := await reader.readline():
+            if (event := parse_event(line)) is not None:
+                await self.queue.put(event)
+        writer.close()
+
+    async def serve_socket(self, host: str = '127.0.0.1', port: int = 8765) -> None:
+        """
+        Accept JSON-lines transaction events over TCP
+        """
+        server = await asyncio.start_server(self._handle_connection, host, port)
+        async with server:
+            await server.serve_forever()
+
+    async def tail_file(self, path: str, poll_interval: float = 0.5) -> None:
+        """
+        Follow a growing .csv (with header) or .jsonl file, like `tail -f`.
+
+        A trailing line without its newline stays buffered until the rest arrives, and
+        lines that are not JSON objects are skipped. When the file shrinks (truncated or rotated)
+        it is read again from the start.
+        """
+        header = None
+        position = 0
+        pending = ''
+        while True:
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            if size < position:
+                header, position, pending = None, 0, ''
+            if size > position:
+                with open(path) as f:
+                    f.seek(position)
+                    pending += f.read()
+                    position = f.tell()
+                *lines, pending = pending.split('\n')
+                for line in filter(None, lines):
+                    if path.endswith('.jsonl'):
+                        if (event := parse_event(line)) is not None:
+                            await self.queue.put(event)
+                    elif header is None:
+                        header = next(csv.reader([line]))
+                    else:
+                        await self.queue.put(dict(zip(header, next(csv.reader([line])))))
+            await asyncio.sleep(poll_interval)
+
+    async def run_batches(self) -> None:
+        """
+        Drain the queue in micro-batches and publish a snapshot after each one
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            events = [await self.queue.get()]
+            deadline = loop.time() + self.max_latency
+            while len(events) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    events.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Aggregation is pandas work, keep it off the event loop. A batch that fails
+            # is dropped so that ingestion carries on with the next one.
+            try:
+                await loop.run_in_executor(None, self.flush, events)
+            except Exception as e:
+                print(f"Warning: Dropped a batch of {len(events)} events: {str(e)}")
+
+    def flush(self, events: List[Dict]) -> None:
+        self.aggregates.apply(events_to_frame(events))
+        os.makedirs(self.live_dir, exist_ok=True)
+
+        snapshot = self.aggregates.snapshot()
+        def write_snapshot(path):
+            with open(path, 'w') as f:
+                json.dump(snapshot, f, default=_json_default)
+        _write_atomic(os.path.join(self.live_dir, SNAPSHOT_FILE), write_snapshot)
+
+        # Customer features are O(users) to finalize, so publish them less often
+        now = time.monotonic()
+        if now - self._last_customer_snapshot >= self.customer_snapshot_interval:
+            features = self.aggregates.customers.finalize()
+            _write_atomic(os.path.join(self.live_dir, CUSTOMER_FEATURES_FILE),
+                          lambda path: features.to_parquet(path, index=False))
+            self._last_customer_snapshot = now
+
+    async def run(self, host: Optional[str] = None, port: Optional[int] = None, tail: Optional[str] = None) -> None:
+        sources = [self.run_batches()]
+        if port is not None:
+            sources.append(self.serve_socket(host or '127.0.0.1', port))
+        if tail is not None:
+            sources.append(self.tail_file(tail))
+        await asyncio.gather(*sources)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Real-time transaction ingestion")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=None, help="Listen for JSON-lines events on this TCP port")
+    parser.add_argument('--tail', default=None, help="Follow a growing .csv or .jsonl file")
+    parser.add_argument('--max-batch', type=int, default=5000)
+    parser.add_argument('--max-latency', type=float, default=1.0, help="Seconds before a partial batch is flushed")
+    parser.add_argument('--live-dir', default=LIVE_DIR)
+    args = parser.parse_args()
+
+    if args.port is None and args.tail is None:
+        parser.error("specify --port and/or --tail")
+    consumer = TransactionEventConsumer(max_batch=args.max_batch, max_latency=args.max_latency, live_dir=args.live_dir)
+    asyncio.run(consumer.run(args.host, args.port, args.tail))
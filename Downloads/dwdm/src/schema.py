@@ -0,0 +1,95 @@
+import pandas as pd
+import numpy as np
+
+# Compact in-memory representation of the transaction frame:
+#   User_ID, Product_ID, Category, Payment_Method -> dictionary-encoded categoricals
+#   Price (Rs.), Final_Price(Rs.)                -> float32
+#   Discount (%)                                 -> uint8 hundredths (0.3 -> 30)
+#   Purchase_Date                                -> int32 days since 1970-01-01
+CATEGORICAL_COLUMNS = ['User_ID', 'Product_ID', 'Category', 'Payment_Method']
+PRICE_COLUMNS = ['Price (Rs.)', 'Final_Price(Rs.)']
+DISCOUNT_COLUMN = 'Discount (%)'
+DATE_COLUMN = 'Purchase_Date'
+DISCOUNT_SCALE = 100
+EPOCH = np.datetime64('1970-01-01', 'D')
+
+def purchase_days(dates: pd.Series) -> pd.Series:
+    """
+    Return purchase dates as int32 day numbers, whatever their current representation
+    """
+    if pd.api.types.is_integer_dtype(dates):
+        return dates.astype(np.int32)
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates, format='%d-%m-%Y')
+    days = (dates.to_numpy().astype('datetime64[D]') - EPOCH).astype(np.int32)
+    return pd.Series(days, index=dates.index, name=dates.name)
+
+def day_number(date) -> int:
+    """
+    Day number of a single date-like value (string, datetime or Timestamp)
+    """
+    return int((np.datetime64(pd.Timestamp(date).date(), 'D') - EPOCH).astype(np.int64))
+
+def purchase_dates(dates: pd.Series) -> pd.Series:
+    """
+    Return purchase dates as datetime64, whatever their current representation
+    """
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        return dates
+    if pd.api.types.is_integer_dtype(dates):
+        values = (EPOCH + dates.to_numpy().astype('timedelta64[D]')).astype('datetime64[ns]')
+        return pd.Series(values, index=dates.index, name=dates.name)
+    return pd.to_datetime(dates, format='%d-%m-%Y')
+
+def discount_fraction(discount: pd.Series) -> pd.Series:
+    """
+    Return discounts as fractions (0.3), decoding the uint8 compact form if needed
+    """
+    if discount.dtype == np.uint8:
+        return discount / DISCOUNT_SCALE
+    return discount
+
+def is_compact(df: pd.DataFrame) -> bool:
+    return DATE_COLUMN in df.columns and pd.api.types.is_integer_dtype(df[DATE_COLUMN])
+
+def compact_transactions(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert a transaction frame to the compact dtype model
+    """
+    compact = df.copy()
+    for col in CATEGORICAL_COLUMNS:
+        if col in compact.columns and not isinstance(compact[col].dtype, pd.CategoricalDtype):
+            compact[col] = compact[col].astype('category')
+    for col in PRICE_COLUMNS:
+        if col in compact.columns:
+            compact[col] = compact[col].astype(np.float32)
+    if DISCOUNT_COLUMN in compact.columns and compact[DISCOUNT_COLUMN].dtype != np.uint8:
+        compact[DISCOUNT_COLUMN] = (compact[DISCOUNT_COLUMN] * DISCOUNT_SCALE).round().clip(0, 255).astype(np.uint8)
+    if DATE_COLUMN in compact.columns:
+        compact[DATE_COLUMN] = purchase_days(compact[DATE_COLUMN])
+    return compact
+
+def expand_transactions(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert a compact frame back to the display form (strings, float64 prices, datetime dates)
+    """
+    expanded = df.copy()
+    for col in CATEGORICAL_COLUMNS:
+        if col in expanded.columns and isinstance(expanded[col].dtype, pd.CategoricalDtype):
+            expanded[col] = expanded[col].astype(str)
+    for col in PRICE_COLUMNS:
+        if col in expanded.columns:
+            expanded[col] = expanded[col].astype(np.float64)
+    if DISCOUNT_COLUMN in expanded.columns:
+        expanded[DISCOUNT_COLUMN] = discount_fraction(expanded[DISCOUNT_COLUMN])
+    if DATE_COLUMN in expanded.columns:
+        expanded[DATE_COLUMN] = purchase_dates(expanded[DATE_COLUMN])
+    return expanded
+
+def csv_dtypes() -> dict:
+    """
+    read_csv dtypes that load the ID columns straight into categoricals
+    """
+    dtypes = {col: 'category' for col in CATEGORICAL_COLUMNS}
+    dtypes.update({col: np.float32 for col in PRICE_COLUMNS})
+    return dtypes
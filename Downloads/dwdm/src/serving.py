@@ -0,0 +1,312 @@
+import argparse
+import json
+import os
+import pickle
+import threading
+import time
+import pandas as pd
+import numpy as np
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+from bundle_recommendation import BundleRecommendation
+
+# Where `python serving.py build` writes the precomputed artifacts the service reads
+ARTIFACTS_DIR = os.environ.get(
+    'DWDM_ARTIFACTS_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'artifacts')
+)
+BUNDLES_FILE = 'bundles.json'
+SEGMENTS_FILE = 'segments.json'
+INDEX_FILE = 'cooccurrence.pkl'
+SEGMENTATION_FILE = 'segmentation.pkl'
+
+def _json_default(value):
+    if isinstance(value, (np.integer, np.floating, np.bool_)):
+        return value.item()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+def build_artifacts(out_dir: str = ARTIFACTS_DIR, data: Optional[str] = None, top_bundles: int = 100) -> None:
+    """
+    Run the batch pipeline once and save what the service needs: the top mined bundles,
+    user -> segment assignments with segment promotions, and the co-occurrence index
+    """
+    from main import load_real_data
+    from customer_segmentation import CustomerSegmentation
+    from dataset import TransactionDataset
+
+    customer_metrics, transaction_data, star = load_real_data(TransactionDataset(data))
+    os.makedirs(out_dir, exist_ok=True)
+
+    segmentation = CustomerSegmentation()
+    segment_results = segmentation.segment_customers(customer_metrics,
+                                                     reference_date=star.fact['Purchase_Date'].max())
+    segments = {
+        'users': dict(zip(star.users.decode(customer_metrics['user_key']),
+                          segment_results['segments'].tolist())),
+        'promotions': {str(segment_id): segmentation.recommend_promotions(segment_id)
+                       for segment_id in segment_results['profiles']}
+    }
+    with open(os.path.join(out_dir, SEGMENTS_FILE), 'w') as f:
+        json.dump(segments, f, default=_json_default)
+    # The fitted model scores customers that were not in the batch run
+    with open(os.path.join(out_dir, SEGMENTATION_FILE), 'wb') as f:
+        pickle.dump(segmentation, f)
+
+    bundler = BundleRecommendation()
+    bundler.product_dim = star.products
+    basket_data = transaction_data[['basket_id', 'product_key', 'Category', 'product_group']]
+    bundles = bundler.generate_hierarchical_bundle_recommendations(basket_data)[:top_bundles]
+    for bundle, discount in zip(bundles, bundler.suggest_bundle_discounts(bundles).to_dict('records')):
+        bundle['discount'] = discount
+    with open(os.path.join(out_dir, BUNDLES_FILE), 'w') as f:
+        json.dump(bundles, f, default=_json_default)
+
+    with open(os.path.join(out_dir, INDEX_FILE), 'wb') as f:
+        pickle.dump(bundler.build_cooccurrence_index(basket_data), f)
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries also expire `ttl` seconds after they were stored
+    """
+    def __init__(self, maxsize: int = 10_000, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self.entries[key] = (time.monotonic(), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+class LatencyTracker:
+    """
+    Rolling latency samples per endpoint, summarised as p50/p99 in milliseconds
+    """
+    def __init__(self, window: int = 10_000):
+        self.samples = {}
+        self.counts = {}
+        self.window = window
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, seconds: float) -> None:
+        with self._lock:
+            self.samples.setdefault(endpoint, deque(maxlen=self.window)).append(seconds)
+            self.counts[endpoint] = self.counts.get(endpoint, 0) + 1
+
+    def summary(self) -> Dict:
+        with self._lock:
+            snapshot = {endpoint: np.array(samples) * 1000 for endpoint, samples in self.samples.items()}
+            counts = dict(self.counts)
+        return {
+            endpoint: {
+                'requests': counts[endpoint],
+                'p50_ms': float(np.percentile(samples, 50)),
+                'p99_ms': float(np.percentile(samples, 99))
+            }
+            for endpoint, samples in snapshot.items()
+        }
+
+class RecommendationService:
+    """
+    Answers bundle, segment and discount lookups from precomputed artifacts.
+
+    Responses are cached per (endpoint, parameters) in a TTL LRU cache, so hot products
+    and users are served without touching the index.
+    """
+    def __init__(self, artifacts_dir: str = ARTIFACTS_DIR, cache_size: int = 10_000, ttl: float = 300.0):
+        with open(os.path.join(artifacts_dir, BUNDLES_FILE)) as f:
+            self.bundles = json.load(f)
+        with open(os.path.join(artifacts_dir, SEGMENTS_FILE)) as f:
+            segments = json.load(f)
+        self.user_segments = segments['users']
+        self.promotions = segments['promotions']
+        with open(os.path.join(artifacts_dir, INDEX_FILE), 'rb') as f:
+            self.index = pickle.load(f)
+        with open(os.path.join(artifacts_dir, SEGMENTATION_FILE), 'rb') as f:
+            self.segmentation = pickle.load(f)
+        self.bundler = BundleRecommendation()
+        self.cache = TTLCache(cache_size, ttl)
+        self.latency = LatencyTracker()
+        self.routes: Dict[str, Callable[[Dict], Dict]] = {
+            '/bundles/top': self.top_bundles,
+            '/bundles/product': self.product_bundles,
+            '/segment': self.user_segment,
+            '/discount': self.bundle_discount
+        }
+
+    @staticmethod
+    def _param(params: Dict, name: str) -> str:
+        """
+        A required query parameter; a missing one is a bad request (ValueError), not an
+        unknown id (KeyError)
+        """
+        if name not in params:
+            raise ValueError(f"Missing parameter: {name}")
+        return params[name]
+
+    @staticmethod
+    def _count(params: Dict, name: str, default: int) -> int:
+        """
+        A non-negative integer query parameter; a negative one would slice from the end
+        """
+        value = int(params.get(name, default))
+        if value < 0:
+            raise ValueError(f"{name} must be non-negative")
+        return value
+
+    def top_bundles(self, params: Dict) -> Dict:
+        k = self._count(params, 'k', 10)
+        return {'bundles': self.bundles[:k]}
+
+    def product_bundles(self, params: Dict) -> Dict:
+        product = self._param(params, 'product')
+        bundles = self.index.top_complements(product, k=self._count(params, 'k', 5),
+                                             min_count=int(params.get('min_count', 1)))
+        for bundle, discount in zip(bundles, self.bundler.suggest_bundle_discounts(bundles).to_dict('records')):
+            bundle['discount'] = discount
+        return {'product': product, 'bundles': bundles}
+
+    def user_segment(self, params: Dict) -> Dict:
+        user = self._param(params, 'user')
+        segment_id = self.user_segments[user]
+        return {'user': user, 'segment': segment_id, 'promotions': self.promotions[str(segment_id)]}
+
+    def bundle_discount(self, params: Dict) -> Dict:
+        products = self._param(params, 'products').split(',')
+        if len(products) != 2:
+            raise ValueError("products must be two comma-separated product ids")
+        antecedent, consequent = products
+        bundle = self.index.pair_stats(antecedent, consequent)
+        return {'bundle': bundle, 'discount': self.bundler.suggest_bundle_discount(bundle)}
+
+    def handle(self, path: str, params: Dict) -> Dict:
+        """
+        Serve one lookup; raises KeyError for unknown routes, products or users and
+        ValueError for missing or malformed parameters
+        """
+        if path not in self.routes:
+            raise KeyError(f"Unknown endpoint: {path}")
+        key = (path, tuple(sorted(params.items())))
+        result = self.cache.get(key)
+        if result is None:
+            result = self.routes[path](params)
+            self.cache.put(key, result)
+        return result
+
+    def handle_batch(self, requests: List[Dict]) -> List[Dict]:
+        """
+        Serve several lookups in one round trip; failures are reported per item, with the
+        status the same GET request would get (404 unknown id, 400 bad parameter)
+        """
+        results = []
+        for request in requests:
+            try:
+                results.append({'ok': True, 'result': self.handle(request['path'], request.get('params', {}))})
+            except KeyError as e:
+                results.append({'ok': False, 'status': 404, 'error': str(e)})
+            except ValueError as e:
+                results.append({'ok': False, 'status': 400, 'error': str(e)})
+        return results
+
+    def score(self, customers: List[Dict]) -> Dict:
+        """
+        Segment new customers from their feature rows (or raw transactions) with the fitted model
+        """
+        batch = self.segmentation.predict_batch(pd.DataFrame.from_records(customers))
+        segments = batch['segments'].astype({'segment_name': str})
+        return {'segments': segments.to_dict('records'), 'promotions': batch['promotions']}
+
+    def metrics(self) -> Dict:
+        return {
+            'latency': self.latency.summary(),
+            'cache': {'size': len(self.cache.entries), 'hits': self.cache.hits, 'misses': self.cache.misses}
+        }
+
+def make_handler(service: RecommendationService):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status: int, body: Dict) -> None:
+            payload = json.dumps(body, default=_json_default).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == '/metrics':
+                return self._send(200, service.metrics())
+            start = time.perf_counter()
+            params = {name: values[0] for name, values in parse_qs(url.query).items()}
+            try:
+                self._send(200, service.handle(url.path, params))
+            except KeyError as e:
+                self._send(404, {'error': str(e)})
+            except ValueError as e:
+                self._send(400, {'error': str(e)})
+            service.latency.record(url.path, time.perf_counter() - start)
+
+        def do_POST(self):
+            if self.path not in ('/batch', '/score'):
+                return self._send(404, {'error': f"Unknown endpoint: {self.path}"})
+            start = time.perf_counter()
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                if self.path == '/batch':
+                    self._send(200, {'results': service.handle_batch(body['requests'])})
+                else:
+                    self._send(200, service.score(body['customers']))
+            except (ValueError, KeyError, TypeError) as e:
+                self._send(400, {'error': str(e)})
+            service.latency.record(self.path, time.perf_counter() - start)
+
+        def log_message(self, format, *args):
+            # Per-request logging costs more than the lookups themselves
+            pass
+
+    return Handler
+
+def serve(host: str = '127.0.0.1', port: int = 8000, artifacts_dir: str = ARTIFACTS_DIR,
+          cache_size: int = 10_000, ttl: float = 300.0) -> None:
+    service = RecommendationService(artifacts_dir, cache_size, ttl)
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    print(f"Serving recommendations on http://{host}:{port}")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bundle and segment recommendation service")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build_parser = subparsers.add_parser('build', help="Precompute artifacts from the dataset")
+    build_parser.add_argument('--data', default=None)
+    build_parser.add_argument('--out', default=ARTIFACTS_DIR)
+    serve_parser = subparsers.add_parser('serve', help="Serve recommendations over HTTP/JSON")
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=8000)
+    serve_parser.add_argument('--artifacts', default=ARTIFACTS_DIR)
+    serve_parser.add_argument('--cache-size', type=int, default=10_000)
+    serve_parser.add_argument('--ttl', type=float, default=300.0, help="Seconds a cached response stays valid")
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        build_artifacts(args.out, args.data)
+    else:
+        serve(args.host, args.port, args.artifacts, args.cache_size, args.ttl)
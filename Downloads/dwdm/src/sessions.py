@@ -0,0 +1,50 @@
+import pandas as pd
+import numpy as np
+from typing import Optional
+from schema import purchase_days
+
+def session_ids(users, days, gap_days: int = 0) -> np.ndarray:
+    """
+    Basket ids for integer (user, day) arrays: one sort, then a diff/cumsum over the sorted rows.
+
+    A new basket starts whenever the user changes or more than `gap_days` days passed since
+    the user's previous purchase (0 = one basket per user per day). Ids are dense and
+    ordered by user, then time.
+    """
+    users = np.asarray(users)
+    days = np.asarray(days)
+    if len(users) == 0:
+        return np.empty(0, dtype=np.int64)
+    # Sort on one int64 (user, day offset) key; several times faster than np.lexsort
+    day_offset = (days - days.min()).astype(np.int64)
+    key = (users.astype(np.int64) << 32) | day_offset
+    order = np.argsort(key)
+    sorted_users, sorted_days = key[order] >> 32, day_offset[order]
+
+    new_session = np.empty(len(order), dtype=bool)
+    new_session[0] = True
+    new_session[1:] = (sorted_users[1:] != sorted_users[:-1]) | (np.diff(sorted_days) > gap_days)
+
+    ids = np.empty(len(order), dtype=np.int64)
+    ids[order] = np.cumsum(new_session) - 1
+    return ids
+
+def sessionize(df: pd.DataFrame, gap_days: int = 0, user_column: Optional[str] = None) -> pd.DataFrame:
+    """
+    Add a basket_id column grouping each user's purchases into shopping sessions.
+
+    Works on the raw frame, the compact frame and the star schema fact table (user_key).
+    The result can be passed straight to BundleRecommendation.prepare_transaction_data.
+    """
+    user_column = user_column or ('user_key' if 'user_key' in df.columns else 'User_ID')
+    users = df[user_column]
+    if isinstance(users.dtype, pd.CategoricalDtype):
+        user_codes = users.cat.codes.to_numpy()
+    elif pd.api.types.is_integer_dtype(users):
+        user_codes = users.to_numpy()
+    else:
+        user_codes = pd.factorize(users)[0]
+
+    sessions = df.copy()
+    sessions['basket_id'] = session_ids(user_codes, purchase_days(df['Purchase_Date']).to_numpy(), gap_days)
+    return sessions
@@ -0,0 +1,274 @@
+import json
+import pandas as pd
+import numpy as np
+from typing import Dict, List, Optional
+from schema import purchase_days, day_number
+
+def hash_values(values) -> np.ndarray:
+    """
+    64-bit hashes of a column; categoricals hash their values, not their codes
+    """
+    return pd.util.hash_pandas_object(pd.Series(values), index=False).to_numpy()
+
+def _register_updates(hashes: np.ndarray, precision: int):
+    """
+    Split hashes into a register index (top `precision` bits) and the HyperLogLog rank
+    (position of the first set bit in the next 32 bits)
+    """
+    index = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+    # 32 bits are exact in float64, so log2 gives the true bit length
+    w = ((hashes << np.uint64(precision)) >> np.uint64(32)).astype(np.float64)
+    bit_length = np.zeros(len(w), dtype=np.int64)
+    nonzero = w > 0
+    bit_length[nonzero] = np.floor(np.log2(w[nonzero])).astype(np.int64) + 1
+    rank = (33 - bit_length).astype(np.uint8)
+    return index, rank
+
+def _estimate(registers: np.ndarray) -> float:
+    """
+    HyperLogLog cardinality estimate with linear counting for small cardinalities
+    """
+    m = registers.shape[-1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.sum(np.power(2.0, -registers.astype(np.float64)))
+    zeros = np.count_nonzero(registers == 0)
+    if raw <= 2.5 * m and zeros:
+        return m * np.log(m / zeros)
+    return raw
+
+class HyperLogLog:
+    """
+    Mergeable distinct-count sketch (relative standard error ~1.04 / sqrt(2**precision))
+    """
+    def __init__(self, precision: int = 12):
+        self.precision = precision
+        self.registers = np.zeros(2 ** precision, dtype=np.uint8)
+
+    def add(self, values) -> 'HyperLogLog':
+        index, rank = _register_updates(hash_values(values), self.precision)
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def merge(self, other: 'HyperLogLog') -> 'HyperLogLog':
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self) -> int:
+        return int(round(_estimate(self.registers)))
+
+    def to_bytes(self) -> bytes:
+        return bytes([self.precision]) + self.registers.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'HyperLogLog':
+        sketch = cls(data[0])
+        sketch.registers = np.frombuffer(data[1:], dtype=np.uint8).copy()
+        return sketch
+
+class DistinctCounter:
+    """
+    Distinct counts of one column for any date range, from per-day partitions.
+
+    Large data keeps one HyperLogLog register row per day, so a range query is a max over
+    those rows plus one estimate. Data with at most `exact_threshold` rows keeps each day's
+    distinct hashes instead and answers exactly.
+    """
+    def __init__(self, column: str, precision: int = 12, exact_threshold: int = 100_000):
+        self.column = column
+        self.precision = precision
+        self.exact_threshold = exact_threshold
+        self.first_day = 0
+        self.registers = None       # (n_days, 2**precision) uint8 in sketch mode
+        self.day_hashes = None      # list of per-day unique hash arrays in exact mode
+
+    @property
+    def exact(self) -> bool:
+        return self.day_hashes is not None
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, column: str, precision: int = 12,
+              exact_threshold: int = 100_000) -> 'DistinctCounter':
+        counter = cls(column, precision, exact_threshold)
+        if df.empty:
+            counter.day_hashes = []
+            return counter
+        days = purchase_days(df['Purchase_Date']).to_numpy()
+        hashes = hash_values(df[column])
+        counter.first_day = int(days.min())
+        day_offset = days - counter.first_day
+        n_days = int(day_offset.max()) + 1
+
+        if len(df) <= exact_threshold:
+            order = np.argsort(day_offset, kind='stable')
+            bounds = np.searchsorted(day_offset[order], np.arange(n_days + 1))
+            sorted_hashes = hashes[order]
+            counter.day_hashes = [np.unique(sorted_hashes[bounds[d]:bounds[d + 1]]) for d in range(n_days)]
+        else:
+            index, rank = _register_updates(hashes, precision)
+            counter.registers = np.zeros((n_days, 2 ** precision), dtype=np.uint8)
+            np.maximum.at(counter.registers, (day_offset, index), rank)
+        return counter
+
+    def _day_range(self, since=None, until=None):
+        n_days = len(self.day_hashes) if self.exact else len(self.registers)
+        lo = 0 if since is None else day_number(since) - self.first_day
+        hi = n_days if until is None else day_number(until) - self.first_day + 1
+        return max(lo, 0), min(hi, n_days)
+
+    def count(self, since=None, until=None) -> int:
+        """
+        Number of distinct values with a purchase in the inclusive window [since, until]
+        """
+        lo, hi = self._day_range(since, until)
+        if hi <= lo:
+            return 0
+        if self.exact:
+            return len(np.unique(np.concatenate(self.day_hashes[lo:hi])))
+        return int(round(_estimate(self.registers[lo:hi].max(axis=0))))
+
+    def sketch(self, since=None, until=None) -> Optional[HyperLogLog]:
+        """
+        Merged HyperLogLog for a window, e.g. to combine with other counters (sketch mode only)
+        """
+        if self.exact:
+            return None
+        lo, hi = self._day_range(since, until)
+        merged = HyperLogLog(self.precision)
+        if hi > lo:
+            merged.registers = self.registers[lo:hi].max(axis=0)
+        return merged
+
+def count_distinct_union(counters: List[DistinctCounter], since=None, until=None) -> int:
+    """
+    Distinct values across several counters of the same column (e.g. one per category) in a
+    window. Exact when every counter is exact, otherwise a merged HyperLogLog estimate.
+    """
+    if all(counter.exact for counter in counters):
+        hashes = [np.concatenate(c.day_hashes[lo:hi]) for c in counters
+                  for lo, hi in [c._day_range(since, until)] if hi > lo]
+        return len(np.unique(np.concatenate(hashes))) if hashes else 0
+    precisions = {c.precision for c in counters if not c.exact}
+    if len(precisions) > 1:
+        raise ValueError("Counters in a union must use the same precision")
+    merged = HyperLogLog(precisions.pop())
+    for counter in counters:
+        lo, hi = counter._day_range(since, until)
+        if hi <= lo:
+            continue
+        if counter.exact:
+            # Exact counters keep their hashes, so they can be registered directly
+            index, rank = _register_updates(np.concatenate(counter.day_hashes[lo:hi]), merged.precision)
+            np.maximum.at(merged.registers, index, rank)
+        else:
+            np.maximum(merged.registers, counter.registers[lo:hi].max(axis=0), out=merged.registers)
+    return merged.count()
+
+class QuantileSketch:
+    """
+    Mergeable KLL quantile sketch over a numeric column.
+
+    Level h holds items that each stand for 2**h inputs. Until `exact_limit` values have
+    been seen everything stays in level 0 and quantiles are exact (linear interpolation,
+    as in pandas); after that full levels are compacted by keeping every other sorted
+    item, which bounds memory at roughly 3 * k items with rank error ~1.7 / k. The
+    compaction offsets come from a seeded generator, so the same input gives the same
+    edges on every run.
+    """
+    def __init__(self, k: int = 200, exact_limit: int = 100_000, seed: int = 0):
+        self.k = k
+        self.exact_limit = exact_limit
+        self.seed = seed
+        self.n = 0
+        self.levels = [np.empty(0, dtype=np.float64)]
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def exact(self) -> bool:
+        return len(self.levels) == 1 and self.n <= self.exact_limit
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(int(np.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def _compress(self) -> None:
+        if self.n <= self.exact_limit:
+            return
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0, dtype=np.float64))
+                items = np.sort(items)
+                # An odd item out stays behind so that total weight is preserved
+                keep = items[-1:] if len(items) % 2 else items[:0]
+                paired = items[:len(items) - len(keep)]
+                promoted = paired[self._rng.integers(2)::2]
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def update(self, values) -> 'QuantileSketch':
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.n += len(values)
+        self._compress()
+        return self
+
+    def merge(self, other: 'QuantileSketch') -> 'QuantileSketch':
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0, dtype=np.float64))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def quantiles(self, qs) -> np.ndarray:
+        qs = np.asarray(qs, dtype=np.float64)
+        if self.n == 0:
+            return np.full(len(qs), np.nan)
+        if len(self.levels) == 1:
+            return np.quantile(self.levels[0], qs)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** h) for h, items in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        items, weights = items[order], weights[order]
+        # Each item sits at the midpoint of the rank interval it represents
+        ranks = (np.cumsum(weights) - weights / 2) / weights.sum()
+        return np.interp(qs, ranks, items)
+
+    def bin_edges(self, bins: int = 5) -> np.ndarray:
+        """
+        Equal-frequency bin edges with open outer edges, so values outside the sketched
+        range still land in the first or last bin
+        """
+        edges = self.quantiles(np.linspace(0, 1, bins + 1))
+        edges[0], edges[-1] = -np.inf, np.inf
+        return edges
+
+    def to_dict(self) -> Dict:
+        return {
+            'k': self.k,
+            'exact_limit': self.exact_limit,
+            'seed': self.seed,
+            'n': self.n,
+            'levels': [items.tolist() for items in self.levels]
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict) -> 'QuantileSketch':
+        sketch = cls(state['k'], state['exact_limit'], state['seed'])
+        sketch.n = state['n']
+        sketch.levels = [np.asarray(items, dtype=np.float64) for items in state['levels']]
+        return sketch
+
+    def save(self, path: str) -> None:
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path: str) -> 'QuantileSketch':
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
@@ -0,0 +1,85 @@
+import pandas as pd
+import numpy as np
+from typing import Optional
+
+class DimensionTable:
+    """
+    Maps string business keys (User_ID, Product_ID) to dense int32 surrogate keys.
+
+    Key k is the row position in `labels`, so encoding is an index lookup and decoding
+    is an array take.
+    """
+    def __init__(self, name: str, labels, attributes: Optional[pd.DataFrame] = None):
+        self.name = name
+        self.labels = pd.Index(labels, name=name)
+        self.attributes = attributes.reset_index(drop=True) if attributes is not None else None
+
+    @classmethod
+    def from_values(cls, name: str, values: pd.Series):
+        """
+        Build a dimension from a column and return it with the int32 keys for that column
+        """
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Reuse the dictionary the categorical already carries
+            codes, labels = values.cat.codes.to_numpy(), values.cat.categories
+        else:
+            codes, labels = pd.factorize(values, sort=True)
+        return cls(name, labels), codes.astype(np.int32)
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def encode(self, values) -> np.ndarray:
+        """
+        Translate business keys to surrogate keys (-1 for values not in the dimension)
+        """
+        return self.labels.get_indexer(pd.Index(values)).astype(np.int32)
+
+    def decode(self, keys) -> list:
+        """
+        Translate surrogate keys back to business keys, for display
+        """
+        return self.labels.take(np.asarray(keys, dtype=np.int64)).tolist()
+
+    def attribute(self, column: str) -> np.ndarray:
+        return self.attributes[column].to_numpy()
+
+    def to_frame(self) -> pd.DataFrame:
+        frame = pd.DataFrame({'key': np.arange(len(self), dtype=np.int32), self.name: self.labels})
+        if self.attributes is not None:
+            frame = pd.concat([frame, self.attributes], axis=1)
+        return frame
+
+class StarSchema:
+    """
+    Transaction fact table keyed by int32 user_key/product_key plus the user and product
+    dimension tables that translate those keys back to the original IDs
+    """
+    def __init__(self, fact: pd.DataFrame, users: DimensionTable, products: DimensionTable):
+        self.fact = fact
+        self.users = users
+        self.products = products
+
+    @classmethod
+    def from_transactions(cls, df: pd.DataFrame) -> 'StarSchema':
+        users, user_keys = DimensionTable.from_values('User_ID', df['User_ID'])
+        products, product_keys = DimensionTable.from_values('Product_ID', df['Product_ID'])
+
+        # Each product belongs to one category, so it is a product attribute
+        category = pd.Series(df['Category'].to_numpy(), index=product_keys)
+        category = category[~category.index.duplicated()].sort_index()
+        products.attributes = pd.DataFrame({'Category': category.reindex(range(len(products))).to_numpy()})
+
+        fact = df.drop(columns=['User_ID', 'Product_ID'])
+        fact.insert(0, 'user_key', user_keys)
+        fact.insert(1, 'product_key', product_keys)
+        return cls(fact.reset_index(drop=True), users, products)
+
+    def to_transactions(self) -> pd.DataFrame:
+        """
+        Join the dimensions back onto the fact table (the original wide transaction frame)
+        """
+        df = self.fact.drop(columns=['user_key', 'product_key'])
+        df.insert(0, 'User_ID', self.users.labels.take(self.fact['user_key'].to_numpy()))
+        df.insert(1, 'Product_ID', self.products.labels.take(self.fact['product_key'].to_numpy()))
+        return df
@@ -0,0 +1,93 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_RESULTS_PATH = os.path.join(SRC_DIR, '..', 'benchmarks', 'startup.jsonl')
+
+# What a cold start of each entry point has to do before it is useful: the Streamlit apps
+# render their first page (Overview), main.py is imported up to the point where the
+# pipeline starts
+TARGETS = {
+    'app': "from streamlit.testing.v1 import AppTest\n"
+           "AppTest.from_file({path!r}, default_timeout=300).run()",
+    'web_app': "from streamlit.testing.v1 import AppTest\n"
+               "AppTest.from_file({path!r}, default_timeout=300).run()",
+    'main': "import main"
+}
+
+def _import_seconds(importtime_log: str) -> float:
+    """
+    Total import time from `python -X importtime` output: the cumulative time of every
+    top-level import (nested imports are already included in their parent)
+    """
+    total = 0
+    for line in importtime_log.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not name.startswith('  '):
+            total += int(cumulative)
+    return total / 1e6
+
+def measure_cold_start(target: str, src_dir: str = SRC_DIR) -> Dict:
+    """
+    Start a fresh interpreter for one entry point and report wall time to first render
+    and the part of it spent importing modules
+    """
+    code = TARGETS[target].format(path=os.path.join(src_dir, f'{target}.py'))
+    start = time.perf_counter()
+    run = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=src_dir,
+                         capture_output=True, text=True)
+    seconds = time.perf_counter() - start
+    if run.returncode != 0:
+        raise RuntimeError(f"{target} failed to start:\n{run.stderr[-2000:]}")
+    return {'first_render_seconds': seconds, 'import_seconds': _import_seconds(run.stderr)}
+
+def _git_commit(src_dir: str) -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=src_dir, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def run_startup_benchmark(targets: Optional[List[str]] = None, repeat: int = 3,
+                          src_dir: str = SRC_DIR) -> List[Dict]:
+    """
+    Cold-start each target `repeat` times and keep the fastest run
+    """
+    commit = _git_commit(src_dir)
+    results = []
+    for target in targets or list(TARGETS):
+        runs = [measure_cold_start(target, src_dir) for _ in range(repeat)]
+        best = min(runs, key=lambda r: r['first_render_seconds'])
+        results.append({
+            'commit': commit,
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'target': target,
+            **best
+        })
+        print(f"{target:<8} first render {best['first_render_seconds']:.2f}s  "
+              f"imports {best['import_seconds']:.2f}s")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold-start time of app.py, web_app.py and main.py")
+    parser.add_argument('--targets', nargs='+', choices=list(TARGETS), default=None)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--src', default=SRC_DIR, help="Source tree to measure, e.g. a checkout of an older commit")
+    parser.add_argument('--results', default=DEFAULT_RESULTS_PATH)
+    args = parser.parse_args()
+
+    results = run_startup_benchmark(args.targets, args.repeat, args.src)
+    os.makedirs(os.path.dirname(args.results), exist_ok=True)
+    with open(args.results, 'a') as f:
+        for record in results:
+            f.write(json.dumps(record) + '\n')
@@ -0,0 +1,244 @@
+import os
+import pandas as pd
+import numpy as np
+from typing import Dict, Iterable, Iterator, List, Optional
+from features import finalize_customer_metrics
+from dataset import TransactionDataset, _parse_dates
+from schema import discount_fraction, purchase_dates
+from sketches import QuantileSketch
+
+DEFAULT_CHUNKSIZE = 500_000
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+def iter_transaction_chunks(path: str, chunksize: int = DEFAULT_CHUNKSIZE,
+                            columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+    """
+    Yield a CSV or Parquet transaction file (or a partitioned directory) in fixed-size chunks
+    with parsed dates
+    """
+    if os.path.isdir(path):
+        for file_path in TransactionDataset(path).select_files():
+            yield from iter_transaction_chunks(file_path, chunksize, columns)
+    elif os.path.splitext(path)[1].lower() == '.parquet':
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns):
+            yield _parse_dates(batch.to_pandas())
+    else:
+        for chunk in pd.read_csv(path, chunksize=chunksize, usecols=columns):
+            yield _parse_dates(chunk)
+
+class CustomerAggregate:
+    """
+    Mergeable per-user partial aggregate behind the customer segmentation features.
+
+    Chunk partials are buffered and folded into the accumulated one only once they hold as
+    many rows as it does, so an update costs its own chunk (amortized) rather than every
+    user seen so far, and the buffer never outgrows the accumulated partial.
+    """
+    COLUMNS = ['total_spend', 'purchase_frequency', 'discount_total', 'first_purchase', 'last_purchase']
+
+    def __init__(self):
+        self.parts: List[pd.DataFrame] = []        # the accumulated partial, then buffered chunk partials
+        self.users = set()                         # distinct users, kept so counting them needs no fold
+        self._buffered = 0                         # rows in the buffered chunk partials
+
+    @staticmethod
+    def _combine(frames: List[pd.DataFrame]) -> pd.DataFrame:
+        if len(frames) == 1:
+            return frames[0]
+        return pd.concat(frames).groupby(level=0).agg({
+            'total_spend': 'sum',
+            'purchase_frequency': 'sum',
+            'discount_total': 'sum',
+            'first_purchase': 'min',
+            'last_purchase': 'max'
+        })
+
+    def _compact(self) -> None:
+        if len(self.parts) > 1:
+            self.parts = [self._combine(self.parts)]
+        self._buffered = 0
+
+    def _append(self, part: pd.DataFrame) -> None:
+        if part.empty:
+            return
+        self.parts.append(part)
+        self.users.update(part.index.to_numpy(dtype=object))
+        self._buffered += len(part)
+        if self._buffered >= len(self.parts[0]):
+            self._compact()
+
+    @property
+    def partial(self) -> pd.DataFrame:
+        """
+        The per-user partial aggregate with every buffered chunk folded in
+        """
+        self._compact()
+        return self.parts[0] if self.parts else pd.DataFrame(columns=self.COLUMNS)
+
+    def update(self, chunk: pd.DataFrame) -> 'CustomerAggregate':
+        frame = pd.DataFrame({
+            'User_ID': chunk['User_ID'],
+            'price': chunk['Final_Price(Rs.)'].astype(np.float64),
+            'discount': discount_fraction(chunk['Discount (%)']),
+            'date': chunk['Purchase_Date']
+        })
+        self._append(frame.groupby('User_ID', observed=True).agg(
+            total_spend=('price', 'sum'),
+            purchase_frequency=('price', 'count'),
+            discount_total=('discount', 'sum'),
+            first_purchase=('date', 'min'),
+            last_purchase=('date', 'max')
+        ))
+        return self
+
+    def merge(self, other: 'CustomerAggregate') -> 'CustomerAggregate':
+        for part in other.parts:
+            self._append(part)
+        return self
+
+    def finalize(self) -> pd.DataFrame:
+        """
+        Produce the same feature frame as features.build_customer_metrics
+        """
+        customer_metrics = self.partial.copy()
+        customer_metrics['avg_transaction_value'] = customer_metrics['total_spend'] / customer_metrics['purchase_frequency']
+        customer_metrics['discount_usage'] = customer_metrics['discount_total'] / customer_metrics['purchase_frequency']
+        customer_metrics = customer_metrics.rename_axis('User_ID').reset_index()
+        customer_metrics = customer_metrics[['User_ID', 'total_spend', 'purchase_frequency', 'avg_transaction_value',
+                                             'discount_usage', 'first_purchase', 'last_purchase']]
+        return finalize_customer_metrics(customer_metrics, customer_metrics['last_purchase'].max())
+
+class PaymentAggregate:
+    """
+    Mergeable per-payment-method partial aggregate behind PaymentAnalytics.
+
+    Holds counts and sums only, so chunks (or whole files) can be folded in any order.
+    """
+    TIME_PATTERNS = ['hourly', 'daily', 'monthly']
+
+    def __init__(self):
+        self.method_totals = pd.DataFrame(columns=['count', 'total', 'low', 'medium', 'high'])
+        self.time_totals = {pattern: pd.DataFrame(columns=['count', 'total']) for pattern in self.TIME_PATTERNS}
+
+    @staticmethod
+    def _add(left: pd.DataFrame, right: pd.DataFrame) -> pd.DataFrame:
+        if left.empty:
+            return right
+        if right.empty:
+            return left
+        combined = left.add(right, fill_value=0)
+        # Keep methods in first-seen order, like df['Payment_Method'].unique()
+        order = left.index.append(right.index[~right.index.isin(left.index)])
+        return combined.reindex(order)
+
+    def update(self, chunk: pd.DataFrame) -> 'PaymentAggregate':
+        # Accumulate in float64 even when the chunk uses the float32 compact prices
+        values = chunk['Final_Price(Rs.)'].astype(np.float64)
+        frame = pd.DataFrame({
+            'method': chunk['Payment_Method'],
+            'value': values,
+            'low': values < 0.3,
+            'medium': (values >= 0.3) & (values <= 0.6),
+            'high': values > 0.6
+        })
+        totals = frame.groupby('method', sort=False, observed=True).agg(
+            count=('value', 'size'),
+            total=('value', 'sum'),
+            low=('low', 'sum'),
+            medium=('medium', 'sum'),
+            high=('high', 'sum')
+        )
+        self.method_totals = self._add(self.method_totals, totals)
+
+        dates = purchase_dates(chunk['Purchase_Date'])
+        time_keys = {
+            'hourly': dates.dt.hour,
+            'daily': dates.dt.dayofweek,
+            'monthly': dates.dt.month
+        }
+        for pattern, key in time_keys.items():
+            part = frame['value'].groupby([frame['method'], key.rename('key')], observed=True).agg(['count', 'sum'])
+            self.time_totals[pattern] = self._add(self.time_totals[pattern], part.rename(columns={'sum': 'total'}))
+        return self
+
+    def merge(self, other: 'PaymentAggregate') -> 'PaymentAggregate':
+        self.method_totals = self._add(self.method_totals, other.method_totals)
+        for pattern in self.TIME_PATTERNS:
+            self.time_totals[pattern] = self._add(self.time_totals[pattern], other.time_totals[pattern])
+        return self
+
+    def time_pattern(self, method, pattern: str) -> Dict:
+        """
+        Return {'count': {key: n}, 'mean': {key: avg}} for one method, matching groupby().agg().to_dict()
+        """
+        totals = self.time_totals[pattern]
+        if totals.empty or method not in totals.index.get_level_values(0):
+            return {'count': {}, 'mean': {}}
+        rows = totals.xs(method, level=0).sort_index()
+        if pattern == 'daily':
+            rows.index = [DAY_NAMES[int(day)] for day in rows.index]
+            rows = rows.sort_index()
+        return {
+            'count': rows['count'].astype(int).to_dict(),
+            'mean': (rows['total'] / rows['count']).to_dict()
+        }
+
+class CategoryDayAggregate:
+    """
+    Mergeable per (Category, day) transaction count and revenue
+    """
+    def __init__(self):
+        self.totals = pd.DataFrame(columns=['count', 'revenue'])
+
+    def update(self, chunk: pd.DataFrame) -> 'CategoryDayAggregate':
+        dates = purchase_dates(chunk['Purchase_Date']).dt.normalize()
+        part = chunk['Final_Price(Rs.)'].astype(np.float64).groupby([chunk['Category'], dates], observed=True).agg(
+            count='count', revenue='sum'
+        )
+        self.totals = part if self.totals.empty else self.totals.add(part, fill_value=0)
+        return self
+
+    def merge(self, other: 'CategoryDayAggregate') -> 'CategoryDayAggregate':
+        if not other.totals.empty:
+            self.totals = other.totals if self.totals.empty else self.totals.add(other.totals, fill_value=0)
+        return self
+
+    def finalize(self) -> pd.DataFrame:
+        return self.totals.sort_index().reset_index()
+
+def fold_chunks(chunks: Iterable[pd.DataFrame], aggregates: Iterable) -> List:
+    """
+    Feed every chunk through each aggregate once and return the aggregates
+    """
+    aggregates = list(aggregates)
+    for chunk in chunks:
+        for aggregate in aggregates:
+            aggregate.update(chunk)
+    return aggregates
+
+def stream_customer_metrics(path: str, chunksize: int = DEFAULT_CHUNKSIZE) -> pd.DataFrame:
+    """
+    Build the load_real_data customer feature frame without loading the whole file
+    """
+    columns = ['User_ID', 'Final_Price(Rs.)', 'Discount (%)', 'Purchase_Date']
+    customers, = fold_chunks(iter_transaction_chunks(path, chunksize, columns), [CustomerAggregate()])
+    return customers.finalize()
+
+def stream_payment_aggregate(path: str, chunksize: int = DEFAULT_CHUNKSIZE) -> PaymentAggregate:
+    """
+    Fold a transaction file into a PaymentAggregate for PaymentAnalytics.analyze_payment_aggregate
+    """
+    columns = ['Payment_Method', 'Final_Price(Rs.)', 'Purchase_Date']
+    payments, = fold_chunks(iter_transaction_chunks(path, chunksize, columns), [PaymentAggregate()])
+    return payments
+
+def stream_price_sketch(path: str, chunksize: int = DEFAULT_CHUNKSIZE) -> QuantileSketch:
+    """
+    Quantile sketch of Final_Price(Rs.) for preprocess_transactions price ranges, one chunk at a time
+    """
+    sketch = QuantileSketch()
+    for chunk in iter_transaction_chunks(path, chunksize, ['Final_Price(Rs.)', 'Purchase_Date']):
+        sketch.update(chunk['Final_Price(Rs.)'])
+    return sketch
@@ -0,0 +1,110 @@
+import argparse
+import pandas as pd
+import numpy as np
+from typing import List, Optional
+
+DEFAULT_CATEGORIES = ['Sports', 'Clothing', 'Toys', 'Beauty', 'Books', 'Home & Kitchen', 'Electronics']
+DEFAULT_PAYMENT_METHODS = ['Net Banking', 'Credit Card', 'UPI', 'Cash on Delivery', 'Debit Card']
+DISCOUNT_LEVELS = np.array([0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 1.0])
+DISCOUNT_WEIGHTS = np.array([0.2, 0.15, 0.15, 0.15, 0.12, 0.1, 0.08, 0.05])
+
+def _zipf_sample(rng: np.random.Generator, n_items: int, size: int, skew: float) -> np.ndarray:
+    """
+    Draw item indices with Zipf-like popularity (skew=0 gives a uniform draw)
+    """
+    weights = 1.0 / np.arange(1, n_items + 1) ** skew
+    cumulative = np.cumsum(weights)
+    cumulative /= cumulative[-1]
+    return np.searchsorted(cumulative, rng.random(size), side='right').clip(max=n_items - 1)
+
+def _random_ids(rng: np.random.Generator, n: int, product_style: bool = False) -> np.ndarray:
+    """
+    Generate unique hex IDs shaped like the dataset ('337c166f' users, 'f414122f-e' products)
+    """
+    values = rng.permutation(np.unique(rng.integers(0, 2**32, size=int(n * 1.1) + 16)))[:n]
+    ids = pd.Series(values).map('{:08x}'.format)
+    if product_style:
+        suffix = pd.Series(rng.integers(0, 16, size=n)).map('{:x}'.format)
+        ids = ids + '-' + suffix
+    return ids.to_numpy()
+
+def generate_transactions(n_rows: int,
+                          n_users: Optional[int] = None,
+                          n_products: Optional[int] = None,
+                          categories: Optional[List[str]] = None,
+                          payment_methods: Optional[List[str]] = None,
+                          start_date: str = '2024-01-01',
+                          end_date: str = '2024-11-21',
+                          skew: float = 0.8,
+                          seed: int = 42,
+                          string_dates: bool = True) -> pd.DataFrame:
+    """
+    Generate a synthetic transaction frame with the ecommerce_dataset_preprocessed.csv schema.
+
+    Users and products are drawn with Zipf-like popularity controlled by `skew`, so repeat
+    buyers and best-selling products appear the way they do in production data. Prices stay
+    normalized to [0, 1] like the source dataset.
+    """
+    rng = np.random.default_rng(seed)
+    categories = categories or DEFAULT_CATEGORIES
+    payment_methods = payment_methods or DEFAULT_PAYMENT_METHODS
+    n_users = n_users or max(1, n_rows // 4)
+    n_products = n_products or max(1, n_rows // 10)
+
+    # Product catalogue: fixed category and base price per product
+    product_ids = _random_ids(rng, n_products, product_style=True)
+    product_category = rng.integers(0, len(categories), size=n_products)
+    product_price = rng.beta(2, 3, size=n_products)
+    user_ids = _random_ids(rng, n_users)
+
+    # Each user has a preferred payment method used most of the time
+    user_method = rng.integers(0, len(payment_methods), size=n_users)
+
+    user_idx = _zipf_sample(rng, n_users, n_rows, skew)
+    product_idx = _zipf_sample(rng, n_products, n_rows, skew)
+    method_idx = np.where(rng.random(n_rows) < 0.7,
+                          user_method[user_idx],
+                          rng.integers(0, len(payment_methods), size=n_rows))
+
+    discount = rng.choice(DISCOUNT_LEVELS, size=n_rows, p=DISCOUNT_WEIGHTS / DISCOUNT_WEIGHTS.sum())
+    price = product_price[product_idx]
+    final_price = price * (1 - discount * 0.25)
+
+    # Draw day offsets and format each calendar day once rather than once per row
+    dates = pd.date_range(start_date, end_date, freq='D')
+    if string_dates:
+        dates = dates.strftime('%d-%m-%Y').to_numpy(dtype=object)
+    purchase_date = dates[rng.integers(0, len(dates), size=n_rows)]
+
+    df = pd.DataFrame({
+        'User_ID': user_ids[user_idx],
+        'Product_ID': product_ids[product_idx],
+        'Category': np.asarray(categories, dtype=object)[product_category[product_idx]],
+        'Price (Rs.)': price,
+        'Discount (%)': discount,
+        'Final_Price(Rs.)': final_price,
+        'Payment_Method': np.asarray(payment_methods, dtype=object)[method_idx],
+        'Purchase_Date': purchase_date
+    })
+    return df
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic e-commerce transactions")
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--users', type=int, default=None)
+    parser.add_argument('--products', type=int, default=None)
+    parser.add_argument('--start-date', default='2024-01-01')
+    parser.add_argument('--end-date', default='2024-11-21')
+    parser.add_argument('--skew', type=float, default=0.8)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--out', required=True, help="Output .csv or .parquet path")
+    args = parser.parse_args()
+
+    data = generate_transactions(args.rows, n_users=args.users, n_products=args.products,
+                                 start_date=args.start_date, end_date=args.end_date,
+                                 skew=args.skew, seed=args.seed)
+    if args.out.endswith('.parquet'):
+        data.to_parquet(args.out, index=False)
+    else:
+        data.to_csv(args.out, index=False)
+    print(f"Wrote {len(data):,} rows to {args.out}")
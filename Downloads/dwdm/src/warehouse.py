@@ -0,0 +1,298 @@
+import argparse
+import importlib.util
+import os
+import sqlite3
+import pandas as pd
+import numpy as np
+from typing import Dict, Iterable, Optional, Tuple
+from dataset import TransactionDataset
+from features import finalize_customer_metrics
+from kpi import OverviewCube
+from schema import discount_fraction, purchase_days, day_number
+from streaming import PaymentAggregate, iter_transaction_chunks, DEFAULT_CHUNKSIZE
+
+# DuckDB (columnar, parallel, spills to disk) when it is installed, otherwise SQLite from
+# the standard library. Override the file with DWDM_WAREHOUSE_PATH; the backend follows
+# its extension (.duckdb or .sqlite/.db).
+DEFAULT_BACKEND = 'duckdb' if importlib.util.find_spec('duckdb') else 'sqlite'
+WAREHOUSE_PATH = os.environ.get(
+    'DWDM_WAREHOUSE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', f'warehouse.{DEFAULT_BACKEND}')
+)
+
+# Backend-specific DDL; every query below is plain SQL understood by both engines
+SCHEMA = {
+    'sqlite': [
+        "CREATE TABLE IF NOT EXISTS dim_user (user_key INTEGER PRIMARY KEY, User_ID TEXT UNIQUE)",
+        "CREATE TABLE IF NOT EXISTS dim_product (product_key INTEGER PRIMARY KEY, Product_ID TEXT UNIQUE, Category TEXT)",
+        "CREATE TABLE IF NOT EXISTS fact_transactions (txn_id INTEGER, user_key INTEGER, product_key INTEGER, "
+        "category TEXT, payment_method TEXT, price REAL, discount REAL, final_price REAL, purchase_day INTEGER)",
+        "CREATE INDEX IF NOT EXISTS fact_purchase_day ON fact_transactions (purchase_day)",
+        "CREATE TABLE IF NOT EXISTS warehouse_meta (key TEXT PRIMARY KEY, value TEXT)"
+    ],
+    'duckdb': [
+        "CREATE SEQUENCE IF NOT EXISTS user_key_seq START 0 MINVALUE 0",
+        "CREATE SEQUENCE IF NOT EXISTS product_key_seq START 0 MINVALUE 0",
+        "CREATE TABLE IF NOT EXISTS dim_user (user_key INTEGER DEFAULT nextval('user_key_seq') PRIMARY KEY, "
+        "User_ID VARCHAR UNIQUE)",
+        "CREATE TABLE IF NOT EXISTS dim_product (product_key INTEGER DEFAULT nextval('product_key_seq') PRIMARY KEY, "
+        "Product_ID VARCHAR UNIQUE, Category VARCHAR)",
+        "CREATE TABLE IF NOT EXISTS fact_transactions (txn_id BIGINT, user_key INTEGER, product_key INTEGER, "
+        "category VARCHAR, payment_method VARCHAR, price DOUBLE, discount DOUBLE, final_price DOUBLE, "
+        "purchase_day INTEGER)",
+        "CREATE TABLE IF NOT EXISTS warehouse_meta (key VARCHAR PRIMARY KEY, value VARCHAR)"
+    ]
+}
+
+# Month of an int day number (days since 1970-01-01)
+MONTH_SQL = {
+    'sqlite': "CAST(strftime('%m', purchase_day * 86400, 'unixepoch') AS INTEGER)",
+    'duckdb': "month(DATE '1970-01-01' + purchase_day)"
+}
+
+class Warehouse:
+    """
+    Transactions as a star schema in an embedded database: fact_transactions keyed by
+    user_key/product_key, plus dim_user and dim_product for the business IDs.
+
+    The dashboard aggregations (payment method totals, per-customer features, category x
+    day totals, distinct counts) run as SQL GROUP BYs and only their results come back to
+    pandas, in the same shapes the in-memory code produces. Loading streams the source in
+    chunks, so the data never has to fit in memory; with DuckDB the queries run on a
+    compressed column store that spills to disk when needed.
+    """
+    def __init__(self, path: Optional[str] = None, backend: Optional[str] = None):
+        self.path = path or WAREHOUSE_PATH
+        if backend is None:
+            extension = os.path.splitext(self.path)[1].lower()
+            backend = 'duckdb' if extension == '.duckdb' else 'sqlite' if extension in ('.sqlite', '.db') else DEFAULT_BACKEND
+        self.backend = backend
+        if backend == 'duckdb':
+            import duckdb
+            self.con = duckdb.connect(self.path)
+        else:
+            self.con = sqlite3.connect(self.path)
+        for statement in SCHEMA[backend]:
+            self.con.execute(statement)
+
+    def close(self) -> None:
+        self.con.close()
+
+    def query(self, sql: str, params: Iterable = ()) -> pd.DataFrame:
+        if self.backend == 'duckdb':
+            return self.con.execute(sql, list(params)).df()
+        return pd.read_sql_query(sql, self.con, params=list(params))
+
+    def _execute(self, sql: str, params: Iterable = ()) -> None:
+        self.con.execute(sql, list(params))
+
+    def _commit(self) -> None:
+        if self.backend == 'sqlite':
+            self.con.commit()
+
+    # Loading
+
+    def _stage(self, chunk: pd.DataFrame, first_txn: int) -> None:
+        """
+        Put one chunk, in the warehouse column layout, into the staging table
+        """
+        staging = pd.DataFrame({
+            'txn_id': np.arange(first_txn, first_txn + len(chunk), dtype=np.int64),
+            'User_ID': chunk['User_ID'].astype(str).to_numpy(),
+            'Product_ID': chunk['Product_ID'].astype(str).to_numpy(),
+            'category': chunk['Category'].astype(str).to_numpy(),
+            'payment_method': chunk['Payment_Method'].astype(str).to_numpy(),
+            'price': chunk['Price (Rs.)'].to_numpy(dtype=np.float64),
+            'discount': discount_fraction(chunk['Discount (%)']).to_numpy(dtype=np.float64),
+            'final_price': chunk['Final_Price(Rs.)'].to_numpy(dtype=np.float64),
+            'purchase_day': purchase_days(chunk['Purchase_Date']).to_numpy()
+        })
+        if self.backend == 'duckdb':
+            self.con.register('staging_chunk', staging)
+            self._execute("CREATE OR REPLACE TEMP TABLE staging AS SELECT * FROM staging_chunk")
+            self.con.unregister('staging_chunk')
+        else:
+            staging.to_sql('staging', self.con, if_exists='replace', index=False)
+
+    def _append_staged(self) -> None:
+        """
+        Add new users/products to the dimensions and the staged rows to the fact table
+        """
+        self._execute("""
+            INSERT INTO dim_user (User_ID)
+            SELECT DISTINCT s.User_ID FROM staging s
+            LEFT JOIN dim_user u ON u.User_ID = s.User_ID
+            WHERE u.User_ID IS NULL ORDER BY s.User_ID""")
+        self._execute("""
+            INSERT INTO dim_product (Product_ID, Category)
+            SELECT s.Product_ID, MIN(s.category) FROM staging s
+            LEFT JOIN dim_product p ON p.Product_ID = s.Product_ID
+            WHERE p.Product_ID IS NULL GROUP BY s.Product_ID ORDER BY s.Product_ID""")
+        self._execute("""
+            INSERT INTO fact_transactions
+            SELECT s.txn_id, u.user_key, p.product_key, s.category, s.payment_method,
+                   s.price, s.discount, s.final_price, s.purchase_day
+            FROM staging s
+            JOIN dim_user u ON u.User_ID = s.User_ID
+            JOIN dim_product p ON p.Product_ID = s.Product_ID
+            ORDER BY s.txn_id""")
+
+    def load(self, source, chunksize: int = DEFAULT_CHUNKSIZE, version: Optional[str] = None) -> int:
+        """
+        Replace the warehouse contents with `source`: a transaction frame (raw or compact)
+        or a CSV/Parquet file or partition directory, which is streamed in chunks.
+        Returns the number of fact rows.
+        """
+        for table in ('fact_transactions', 'dim_user', 'dim_product', 'warehouse_meta'):
+            self._execute(f"DELETE FROM {table}")
+        if isinstance(source, pd.DataFrame):
+            chunks = (source.iloc[start:start + chunksize] for start in range(0, len(source), chunksize))
+        else:
+            chunks = iter_transaction_chunks(source, chunksize)
+
+        n_rows = 0
+        for chunk in chunks:
+            self._stage(chunk, n_rows)
+            self._append_staged()
+            n_rows += len(chunk)
+        self._execute("DROP TABLE IF EXISTS staging")
+        if version is not None:
+            self._execute("INSERT INTO warehouse_meta VALUES ('source_version', ?)", [version])
+        self._commit()
+        return n_rows
+
+    def sync(self, dataset: Optional[TransactionDataset] = None, chunksize: int = DEFAULT_CHUNKSIZE) -> bool:
+        """
+        Load `dataset` unless the warehouse already holds this version of it. Returns True
+        when the data was (re)loaded.
+        """
+        dataset = dataset or TransactionDataset()
+        version = dataset.version()
+        stored = self.query("SELECT value FROM warehouse_meta WHERE key = 'source_version'")
+        if len(stored) and stored['value'].iloc[0] == version:
+            return False
+        self.load(dataset.path, chunksize, version)
+        return True
+
+    # Aggregations pushed down as SQL
+
+    def _where(self, since=None, until=None, categories: Optional[Iterable[str]] = None,
+               payment_methods: Optional[Iterable[str]] = None) -> Tuple[str, list]:
+        clauses, params = [], []
+        if since is not None:
+            clauses.append("purchase_day >= ?")
+            params.append(day_number(since))
+        if until is not None:
+            clauses.append("purchase_day <= ?")
+            params.append(day_number(until))
+        for column, values in (('category', categories), ('payment_method', payment_methods)):
+            if values is not None:
+                values = list(values)
+                clauses.append(f"{column} IN ({', '.join('?' * len(values))})" if values else "0 = 1")
+                params.extend(values)
+        return ("WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def row_count(self, since=None, until=None) -> int:
+        where, params = self._where(since, until)
+        return int(self.query(f"SELECT COUNT(*) AS n FROM fact_transactions {where}", params)['n'].iloc[0])
+
+    def payment_aggregate(self, since=None, until=None, categories: Optional[Iterable[str]] = None) -> PaymentAggregate:
+        """
+        PaymentAggregate filled from SQL, for PaymentAnalytics.analyze_payment_aggregate
+        """
+        where, params = self._where(since, until, categories)
+        totals = self.query(f"""
+            SELECT payment_method AS method, COUNT(*) AS count, SUM(final_price) AS total,
+                   SUM(CASE WHEN final_price < 0.3 THEN 1 ELSE 0 END) AS low,
+                   SUM(CASE WHEN final_price >= 0.3 AND final_price <= 0.6 THEN 1 ELSE 0 END) AS medium,
+                   SUM(CASE WHEN final_price > 0.6 THEN 1 ELSE 0 END) AS high
+            FROM fact_transactions {where}
+            GROUP BY payment_method
+            ORDER BY MIN(txn_id)""", params)
+
+        aggregate = PaymentAggregate()
+        aggregate.method_totals = totals.set_index('method')
+        # Purchase dates have no time of day, so every transaction falls in hour 0
+        time_keys = {'hourly': "0", 'daily': "(purchase_day + 3) % 7", 'monthly': MONTH_SQL[self.backend]}
+        for pattern, key in time_keys.items():
+            part = self.query(f"""
+                SELECT payment_method AS method, {key} AS time_key, COUNT(*) AS count, SUM(final_price) AS total
+                FROM fact_transactions {where}
+                GROUP BY payment_method, time_key""", params)
+            aggregate.time_totals[pattern] = part.set_index(['method', 'time_key']).rename_axis(['method', 'key'])
+        return aggregate
+
+    def customer_metrics(self, since=None, until=None, categories: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """
+        The features.build_customer_metrics frame, aggregated per customer in SQL
+        """
+        where, params = self._where(since, until, categories)
+        customers = self.query(f"""
+            SELECT u.User_ID, c.total_spend, c.purchase_frequency, c.avg_transaction_value,
+                   c.discount_usage, c.first_purchase, c.last_purchase
+            FROM (
+                SELECT user_key, SUM(final_price) AS total_spend, COUNT(*) AS purchase_frequency,
+                       AVG(final_price) AS avg_transaction_value, AVG(discount) AS discount_usage,
+                       MIN(purchase_day) AS first_purchase, MAX(purchase_day) AS last_purchase
+                FROM fact_transactions {where}
+                GROUP BY user_key
+            ) c
+            JOIN dim_user u ON u.user_key = c.user_key
+            ORDER BY u.User_ID""", params)
+        return finalize_customer_metrics(customers, customers['last_purchase'].max())
+
+    def category_day_totals(self, since=None, until=None, categories: Optional[Iterable[str]] = None,
+                            payment_methods: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """
+        (Category, Purchase_Date, count, revenue) rows, for OverviewCube.from_category_days
+        """
+        where, params = self._where(since, until, categories, payment_methods)
+        return self.query(f"""
+            SELECT category AS Category, purchase_day AS Purchase_Date,
+                   COUNT(*) AS count, SUM(final_price) AS revenue
+            FROM fact_transactions {where}
+            GROUP BY category, purchase_day
+            ORDER BY category, purchase_day""", params)
+
+    def distinct_counts(self, since=None, until=None, categories: Optional[Iterable[str]] = None,
+                        payment_methods: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        where, params = self._where(since, until, categories, payment_methods)
+        counts = self.query(f"""
+            SELECT COUNT(DISTINCT user_key) AS customers, COUNT(DISTINCT product_key) AS products
+            FROM fact_transactions {where}""", params)
+        return {'User_ID': int(counts['customers'].iloc[0]), 'Product_ID': int(counts['products'].iloc[0])}
+
+    def overview_kpis(self, since=None, until=None, categories: Optional[Iterable[str]] = None,
+                      payment_methods: Optional[Iterable[str]] = None) -> Dict:
+        """
+        Same result as OverviewCube.kpis, with the filters applied in SQL and exact distinct counts
+        """
+        totals = self.category_day_totals(since, until, categories, payment_methods)
+        distinct = self.distinct_counts(since, until, categories, payment_methods)
+        if totals.empty:
+            return {
+                'total_customers': 0, 'total_products': 0, 'total_orders': 0, 'total_revenue': 0.0,
+                'avg_order_value': 0.0,
+                'daily': pd.DataFrame(columns=['Purchase_Date', 'orders', 'revenue']),
+                'categories': pd.Series(dtype=np.int64, name='count')
+            }
+        result = dict(OverviewCube.from_category_days(totals).kpis())
+        result['total_customers'] = distinct['User_ID']
+        result['total_products'] = distinct['Product_ID']
+        return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load the transaction data into the embedded SQL warehouse")
+    parser.add_argument('--data', default=None,
+                        help="CSV/Parquet file or directory of date partitions (defaults to DWDM_DATA_PATH)")
+    parser.add_argument('--warehouse', default=None, help="Database file (defaults to DWDM_WAREHOUSE_PATH)")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    args = parser.parse_args()
+
+    warehouse = Warehouse(args.warehouse)
+    dataset = TransactionDataset(args.data)
+    if warehouse.sync(dataset, args.chunksize):
+        print(f"Loaded {warehouse.row_count():,} transactions into {warehouse.path} ({warehouse.backend})")
+    else:
+        print(f"{warehouse.path} is already up to date ({warehouse.row_count():,} transactions)")
+    warehouse.close()
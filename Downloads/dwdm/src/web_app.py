@@ -1,11 +1,12 @@
+import os
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from streamlit_option_menu import option_menu
-from customer_segmentation import CustomerSegmentation
-from bundle_recommendation import BundleRecommendation
-from payment_analytics import PaymentAnalytics
+from dataset import load_transactions
+from kpi import OverviewCube
+from chart_data import chart_series
 
 # Set page configuration
 st.set_page_config(
@@ -66,23 +67,44 @@ st.markdown("""
 
 # Load data
 @st.cache_data
-def load_data():
-    df = pd.read_csv('/Users/saaralvarunie/Downloads/dwdm/ecommerce_dataset_preprocessed.csv')
-    df['Purchase_Date'] = pd.to_datetime(df['Purchase_Date'], format='%d-%m-%Y')
-    return df
+def load_data(since=None, until=None):
+    return load_transactions(since=since, until=until)
 
-# Initialize analytics classes
+# Day x category KPI cube, built once per loaded window
 @st.cache_resource
-def init_analytics():
-    return {
-        'segmentation': CustomerSegmentation(),
-        'bundle': BundleRecommendation(),
-        'payment': PaymentAnalytics()
-    }
+def overview_cube(since=None, until=None):
+    return OverviewCube.build(load_data(since, until), version=(since, until))
+
+# With DWDM_WAREHOUSE_PATH set, the Overview KPIs are aggregated by SQL in the warehouse
+# (loaded or refreshed first when the data changed) instead of the in-memory cube
+USE_WAREHOUSE = 'DWDM_WAREHOUSE_PATH' in os.environ
+
+@st.cache_data
+def warehouse_kpis(since=None, until=None):
+    from warehouse import Warehouse
+    warehouse = Warehouse()
+    try:
+        warehouse.sync()
+        return warehouse.overview_kpis(since, until)
+    finally:
+        warehouse.close()
 
-# Load data and initialize analytics
-df = load_data()
-analytics = init_analytics()
+# Analytics classes, imported and created on the first page that needs each one
+@st.cache_resource
+def get_analytics(name):
+    if name == 'segmentation':
+        from customer_segmentation import CustomerSegmentation
+        return CustomerSegmentation()
+    if name == 'bundle':
+        from bundle_recommendation import BundleRecommendation
+        return BundleRecommendation()
+    from payment_analytics import PaymentAnalytics
+    return PaymentAnalytics()
+
+# Load data
+df = load_data(st.query_params.get('since'), st.query_params.get('until'))
+if not USE_WAREHOUSE:
+    cube = overview_cube(st.query_params.get('since'), st.query_params.get('until'))
 
 # Navigation
 selected = option_menu(
@@ -109,15 +131,19 @@ if selected == "Overview":
     st.title("E-commerce Analytics Dashboard")
     
     # Key Metrics
+    if USE_WAREHOUSE:
+        overview = warehouse_kpis(st.query_params.get('since'), st.query_params.get('until'))
+    else:
+        overview = cube.kpis()
     col1, col2, col3, col4 = st.columns(4)
     with col1:
-        st.metric("Total Customers", len(df['User_ID'].unique()))
+        st.metric("Total Customers", overview['total_customers'])
     with col2:
-        st.metric("Total Transactions", len(df))
+        st.metric("Total Transactions", overview['total_orders'])
     with col3:
-        st.metric("Total Products", len(df['Product_ID'].unique()))
+        st.metric("Total Products", overview['total_products'])
     with col4:
-        st.metric("Avg. Transaction Value", f"₹{df['Final_Price(Rs.)'].mean():.2f}")
+        st.metric("Avg. Transaction Value", f"₹{overview['avg_order_value']:.2f}")
     
     # Data Preview
     st.subheader("Recent Transactions")
@@ -125,17 +151,18 @@ if selected == "Overview":
     
     # Category Distribution
     st.subheader("Product Category Distribution")
-    fig = px.pie(df['Category'].value_counts().reset_index(), 
+    fig = px.pie(overview['categories'].rename_axis('Category').reset_index(), 
                  values='count', names='Category',
                  template="plotly_dark")
     st.plotly_chart(fig, use_container_width=True)
     
     # Transaction Trends
-    st.subheader("Daily Transaction Trends")
-    daily_trends = df.groupby('Purchase_Date')['Final_Price(Rs.)'].agg(['count', 'sum']).reset_index()
+    # Bounded number of points: day/week/month roll-up, LTTB beyond that
+    daily_trends, resolution = chart_series(overview['daily'], 'Purchase_Date', 'orders')
+    st.subheader(f"{resolution} Transaction Trends")
     fig = go.Figure()
     fig.add_trace(go.Scatter(x=daily_trends['Purchase_Date'], 
-                            y=daily_trends['count'],
+                            y=daily_trends['orders'],
                             name='Number of Transactions'))
     fig.update_layout(template="plotly_dark")
     st.plotly_chart(fig, use_container_width=True)
@@ -152,7 +179,7 @@ elif selected == "Customer Segments":
         customer_metrics.columns = ['User_ID', 'total_spend', 'purchase_frequency', 
                                   'avg_transaction_value', 'discount_usage']
         
-        segment_results = analytics['segmentation'].segment_customers(customer_metrics)
+        segment_results = get_analytics('segmentation').segment_customers(customer_metrics)
     
     # Display segments
     for segment_id, profile in segment_results['profiles'].items():
@@ -169,7 +196,7 @@ elif selected == "Customer Segments":
         
         # Promotion recommendations
         st.markdown("### Recommended Promotions")
-        recommendations = analytics['segmentation'].recommend_promotions(segment_id)
+        recommendations = get_analytics('segmentation').recommend_promotions(segment_id)
         st.info(f"""
         - Discount Range: {recommendations['discount_range']}
         - Type: {recommendations['promotion_type']}
@@ -182,14 +209,15 @@ elif selected == "Bundle Analysis":
     
     # Process data for bundle analysis
     with st.spinner("Analyzing product bundles..."):
-        processed_df = analytics['bundle'].prepare_transaction_data(df)
-        bundles = analytics['bundle'].generate_bundle_recommendations(processed_df)
+        processed_df = get_analytics('bundle').prepare_transaction_data(df)
+        bundles = get_analytics('bundle').generate_bundle_recommendations(processed_df)
     
     if bundles:
         # Display top bundles
-        for i, bundle in enumerate(bundles[:5], 1):
+        top_bundles = bundles[:5]
+        discounts = get_analytics('bundle').suggest_bundle_discounts(top_bundles).to_dict('records')
+        for i, (bundle, recommendations) in enumerate(zip(top_bundles, discounts), 1):
             st.subheader(f"Bundle {i}")
-            recommendations = analytics['bundle'].suggest_bundle_discount(bundle)
             
             col1, col2, col3 = st.columns(3)
             with col1:
@@ -215,8 +243,8 @@ elif selected == "Payment Analytics":
     
     # Process payment data
     with st.spinner("Analyzing payment patterns..."):
-        payment_insights = analytics['payment'].analyze_payment_preferences(df)
-        incentives = analytics['payment'].recommend_payment_incentives(payment_insights)
+        payment_insights = get_analytics('payment').analyze_payment_preferences(df)
+        incentives = get_analytics('payment').recommend_payment_incentives(payment_insights)
     
     # Payment method distribution
     st.subheader("Payment Method Distribution")